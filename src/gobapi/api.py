@@ -9,6 +9,7 @@ The only public method is get_app() which returns a Flask application object.
 The API can be started by get_app().run()
 
 """
+import functools
 import json
 
 from flask_graphql import GraphQLView
@@ -23,7 +24,9 @@ from gobcore.views import GOBViews
 
 from gobapi.config import API_BASE_PATH, API_SECURE_BASE_PATH
 from gobapi.fat_file import fat_file
-from gobapi.response import hal_response, not_found, get_page_ref, ndjson_entities, stream_entities
+from gobapi.response import hal_response, not_found, bad_request, get_page_ref, get_cursor_ref, encode_cursor, \
+    decode_cursor, ndjson_entities, stream_entities, get_etag, is_not_modified, not_modified, add_etag
+from gobapi.dump import parquet
 from gobapi.dump.csv import csv_entities
 from gobapi.dump.sql import sql_entities
 from gobapi.dump.to_db import dump_to_db
@@ -33,14 +36,18 @@ from gobapi.worker.response import WorkerResponse
 from gobapi.worker.api import worker_result, worker_status, worker_end
 
 from gobapi.states import get_states
-from gobapi.storage import connect, get_entities, get_entity, query_entities, dump_entities, query_reference_entities,\
-    clear_test_dbs
+from gobapi.storage import connect, get_entities, get_entities_after, get_entity, entity_exists, query_entities, \
+    dump_entities, query_reference_entities, streaming_query, clear_test_dbs, get_version, COUNT_EXACT, \
+    COUNT_MODES, get_response_fields
 from gobapi.dbinfo.api import get_db_info
+from gobapi.utils import to_snake, prepopulate_camelcase
 
 from gobapi.graphql.schema import schema
 from gobapi.session import shutdown_session
 from gobapi.graphql_streaming.api import GraphQLStreamingApi
 
+import gobapi.response_cache as response_cache
+
 
 def _catalogs():
     """Returns the GOB catalogs
@@ -99,7 +106,35 @@ def _catalog(catalog_name):
         return not_found(f"Catalog {catalog_name} not found")
 
 
-def _entities(catalog_name, collection_name, page, page_size, view=None):
+def _fields(catalog_name, collection_name, view_name=None, entity=False):
+    """Returns the fields that are requested by the fields parameter, e.g. ?fields=identificatie,ligtInBuurt
+
+    Field names may be given in camelCase or snake_case.
+    Only fields that can be included in the response are accepted.
+
+    :param catalog_name: e.g. meetbouten
+    :param collection_name: e.g. meting
+    :param view_name: the name of the requested view, if any
+    :param entity: True if the fields are requested for a single entity
+    :return: list of (snake_case) field names or None if no fields are requested
+    :raises ValueError: if any of the requested fields does not exist or if fields are requested for a view
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    elif view_name:
+        raise ValueError('Field selection is not supported for views')
+
+    fields = [to_snake(field.strip()) for field in fields.split(',') if field.strip()]
+
+    response_fields = get_response_fields(catalog_name, collection_name, entity)
+    unknown_fields = [field for field in fields if field not in response_fields]
+    if unknown_fields:
+        raise ValueError(f"Unknown field(s) {', '.join(unknown_fields)}")
+    return fields
+
+
+def _entities(catalog_name, collection_name, page, page_size, view=None, count=COUNT_EXACT, fields=None):
     """Returns the entities in the specified catalog collection
 
     The page and page_size are used to calculate the offset and number of entities to return
@@ -113,6 +148,8 @@ def _entities(catalog_name, collection_name, page, page_size, view=None):
     :param page: any page number, page numbering starts at 1
     :param page_size: the number of entities per page
     :param view: the database view that's being used to get the entities, defaults to the entity table
+    :param count: total count mode, exact (default), estimate or none
+    :param fields: optional list of fields to return, defaults to all fields
     :return: (result, links)
     """
     assert (GOBModel().get_collection(catalog_name, collection_name))
@@ -121,10 +158,12 @@ def _entities(catalog_name, collection_name, page, page_size, view=None):
 
     offset = (page - 1) * page_size
 
-    entities, total_count = get_entities(catalog_name, collection_name, offset=offset, limit=page_size, view=view)
+    entities, total_count = get_entities(catalog_name, collection_name, offset=offset, limit=page_size, view=view,
+                                         count=count, fields=fields)
 
-    if view:
-        # For views always show next page unless no results are returned. Count is slow on large views
+    if view or total_count is None:
+        # For views or without count always show next page unless no results are returned.
+        # Count is slow on large views
         num_pages = page + 1 if len(entities) > 0 else page
     else:
         num_pages = (total_count + page_size - 1) // page_size
@@ -140,6 +179,59 @@ def _entities(catalog_name, collection_name, page, page_size, view=None):
            }
 
 
+def _entities_after(catalog_name, collection_name, after, page_size, fields=None):
+    """Returns the entities in the specified catalog collection that follow the entity with gobid <after>
+
+    This is the keyset (cursor) pagination variant of _entities.
+    Each page is retrieved by an index range scan so every page is served equally fast, no matter how deep.
+    Only a link to the next page is provided and no total count is given.
+
+    A result, links tuple is returned.
+
+    :param catalog_name: e.g. meetbouten
+    :param collection_name: e.g. meting
+    :param after: the gobid after which the page starts, None to start at the first entity
+    :param page_size: the number of entities per page
+    :param fields: optional list of fields to return, defaults to all fields
+    :return: (result, links)
+    """
+    assert (GOBModel().get_collection(catalog_name, collection_name))
+    assert (page_size >= 1)
+
+    entities, next_after = get_entities_after(catalog_name, collection_name, after=after, limit=page_size,
+                                              fields=fields)
+
+    return {
+               'page_size': page_size,
+               'results': entities
+           }, {
+               'next': get_cursor_ref(encode_cursor(next_after))
+           }
+
+
+def _collection_after(catalog_name, collection_name, after, page_size, view_name, fields=None):
+    """Returns the page of entities within the specified collection that follows the given cursor
+
+    :param catalog_name: e.g. meetbouten
+    :param collection_name: e.g. meting
+    :param after: opaque cursor, empty to start at the first entity
+    :param page_size: the number of entities per page
+    :param view_name: the name of the requested view, if any
+    :param fields: optional list of fields to return, defaults to all fields
+    :return:
+    """
+    if view_name:
+        return bad_request('Cursor pagination is not supported for views')
+
+    try:
+        after = decode_cursor(after)
+    except ValueError as e:
+        return bad_request(str(e))
+
+    result, links = _entities_after(catalog_name, collection_name, after, page_size, fields)
+    return hal_response(data=result, links=links)
+
+
 def _clear_tests():
     clear_test_dbs()
     return "", 200
@@ -184,30 +276,44 @@ def _reference_entities(src_catalog_name, src_collection_name, reference_name, s
            }
 
 
+def _dump_collection(catalog_name, collection_name):
+    """
+    Dump all entities in the requested format: csv, parquet or sql
+
+    :param catalog_name:
+    :param collection_name:
+    :return: Streaming response of all entities in the requested format
+    """
+    format = request.args.get('format')
+    exclude_deleted = request.args.get('exclude_deleted') == 'true'
+
+    filter = (lambda table: getattr(table, FIELD.DATE_DELETED).is_(None)) if exclude_deleted else None
+    entities, model = dump_entities(catalog_name, collection_name, filter=filter)
+
+    if format == "csv":
+        result = csv_entities(entities, model)
+        return WorkerResponse.stream_with_context(result, mimetype='text/csv')
+    elif format == "parquet" and parquet.is_available():
+        result = parquet.parquet_entities(entities, model)
+        return WorkerResponse.stream_with_context(result, mimetype='application/vnd.apache.parquet')
+    elif format == "sql":
+        return Response(sql_entities(catalog_name, collection_name, model), mimetype='application/sql')
+    else:
+        return f"Unrecognised format parameter '{format}'" if format else "Format parameter not set", 400
+
+
 def _dump(catalog_name, collection_name):
     """
-    Dump all entities in the requested format. Currently only csv
+    Dump all entities in the requested format (GET) or dump all entities to another database (POST)
 
     :param catalog_name:
     :param collection_name:
-    :return: Streaming response of all entities in csv format with header
+    :return: Streaming response of all entities in the requested format or of the progress of the dump
     """
     method = request.method
 
     if method == 'GET':
-        format = request.args.get('format')
-        exclude_deleted = request.args.get('exclude_deleted') == 'true'
-
-        filter = (lambda table: getattr(table, FIELD.DATE_DELETED).is_(None)) if exclude_deleted else None
-        entities, model = dump_entities(catalog_name, collection_name, filter=filter)
-
-        if format == "csv":
-            result = csv_entities(entities, model)
-            return WorkerResponse.stream_with_context(result, mimetype='text/csv')
-        elif format == "sql":
-            return Response(sql_entities(catalog_name, collection_name, model), mimetype='application/sql')
-        else:
-            return f"Unrecognised format parameter '{format}'" if format else "Format parameter not set", 400
+        return _dump_collection(catalog_name, collection_name)
     elif method == 'POST':
         content_type = request.content_type
         if content_type == 'application/json':
@@ -218,10 +324,57 @@ def _dump(catalog_name, collection_name):
             return f"Unrecognised content type '{content_type}'", 400
 
 
+def _stream_collection(catalog_name, collection_name, view_name, fields, ndjson):
+    """Returns all entities within the specified collection as a streaming response
+
+    :param catalog_name: e.g. meetbouten
+    :param collection_name: e.g. meting
+    :param view_name: the name of the requested view, if any
+    :param fields: optional list of fields to return, defaults to all fields
+    :param ndjson: stream newline delimited json instead of a json list
+    :return:
+    """
+    entities, convert = query_entities(catalog_name, collection_name, view_name, fields)
+    entities = streaming_query(entities)
+    if ndjson:
+        result = ndjson_entities(entities, convert)
+        return WorkerResponse.stream_with_context(result, mimetype='application/x-ndjson')
+    else:
+        result = stream_entities(entities, convert)
+        return WorkerResponse.stream_with_context(result, mimetype='application/json')
+
+
+def _paged_collection(catalog_name, collection_name, view_name, fields):
+    """Returns a page of entities within the specified collection
+
+    :param catalog_name: e.g. meetbouten
+    :param collection_name: e.g. meting
+    :param view_name: the name of the requested view, if any
+    :param fields: optional list of fields to return, defaults to all fields
+    :return:
+    """
+    page = int(request.args.get('page', 1))
+    page_size = int(request.args.get('page_size', 100))
+    after = request.args.get('after', None)
+    count = request.args.get('count', COUNT_EXACT)
+
+    if count not in COUNT_MODES:
+        return bad_request(f"Invalid count '{count}', use one of {', '.join(COUNT_MODES)}")
+
+    if after is not None:
+        return _collection_after(catalog_name, collection_name, after, page_size, view_name, fields)
+
+    result, links = _entities(catalog_name, collection_name, page, page_size, view_name, count, fields)
+    return hal_response(data=result, links=links)
+
+
 def _collection(catalog_name, collection_name):
     """Returns the list of entities within the specified collection
 
     A list of entities is returned. This output is paged, default page 1 page size 100
+    When an after parameter is supplied keyset (cursor) pagination is used instead of page numbers
+    The total count can be skipped (count=false) or estimated (count=estimate)
+    The fields parameter restricts the returned fields, e.g. fields=identificatie,naam
 
     :param catalog_name: e.g. meetbouten
     :param collection_name: e.g. meting
@@ -229,9 +382,6 @@ def _collection(catalog_name, collection_name):
     """
 
     if GOBModel().get_collection(catalog_name, collection_name):
-        page = int(request.args.get('page', 1))
-        page_size = int(request.args.get('page_size', 100))
-
         view = request.args.get('view', None)
 
         stream = request.args.get('stream', None) == "true"
@@ -243,17 +393,15 @@ def _collection(catalog_name, collection_name):
 
         view_name = GOBViews().get_view(catalog_name, collection_name, view)['name'] if view else None
 
-        if stream:
-            entities, convert = query_entities(catalog_name, collection_name, view_name)
-            result = stream_entities(entities, convert)
-            return WorkerResponse.stream_with_context(result, mimetype='application/json')
-        elif ndjson:
-            entities, convert = query_entities(catalog_name, collection_name, view_name)
-            result = ndjson_entities(entities, convert)
-            return WorkerResponse.stream_with_context(result, mimetype='application/x-ndjson')
+        try:
+            fields = _fields(catalog_name, collection_name, view_name)
+        except ValueError as e:
+            return bad_request(str(e))
+
+        if stream or ndjson:
+            return _stream_collection(catalog_name, collection_name, view_name, fields, ndjson)
         else:
-            result, links = _entities(catalog_name, collection_name, page, page_size, view_name)
-            return hal_response(data=result, links=links)
+            return _paged_collection(catalog_name, collection_name, view_name, fields)
     else:
         return not_found(f'{catalog_name}.{collection_name} not found')
 
@@ -278,7 +426,12 @@ def _entity(catalog_name, collection_name, entity_id, view=None):
 
         view_name = GOBViews().get_view(catalog_name, collection_name, view)['name'] if view else None
 
-        result = get_entity(catalog_name, collection_name, entity_id, view_name)
+        try:
+            fields = _fields(catalog_name, collection_name, view_name, entity=True)
+        except ValueError as e:
+            return bad_request(str(e))
+
+        result = get_entity(catalog_name, collection_name, entity_id, view_name, fields)
         return hal_response(result) if result is not None else not_found(
             f'{catalog_name}.{collection_name}:{entity_id} not found')
     else:
@@ -306,9 +459,12 @@ def _reference_collection(catalog_name, collection_name, entity_id, reference_pa
         reference_name = reference_path.replace('-', '_')
         reference = model.get_collection(catalog_name, collection_name)['references'].get(reference_name)
         # Check if the source entity exists
-        entity = get_entity(catalog_name, collection_name, entity_id)
+        entity = entity_exists(catalog_name, collection_name, entity_id)
 
         if entity and reference:
+            if request.args.get('after') is not None:
+                return bad_request('Cursor pagination is not supported for reference collections')
+
             page = int(request.args.get('page', 1))
             page_size = int(request.args.get('page_size', 100))
 
@@ -317,10 +473,10 @@ def _reference_collection(catalog_name, collection_name, entity_id, reference_pa
 
             if stream:
                 entities, convert = query_reference_entities(catalog_name, collection_name, reference_name, entity_id)
-                return Response(stream_entities(entities, convert), mimetype='application/json')
+                return Response(stream_entities(streaming_query(entities), convert), mimetype='application/json')
             elif ndjson:
                 entities, convert = query_reference_entities(catalog_name, collection_name, reference_name, entity_id)
-                return Response(ndjson_entities(entities, convert), mimetype='application/x-ndjson')
+                return Response(ndjson_entities(streaming_query(entities), convert), mimetype='application/x-ndjson')
             else:
                 result, links = _reference_entities(catalog_name, collection_name, reference_name, entity_id,
                                                     page, page_size)
@@ -376,6 +532,53 @@ def _health():
     return 'Connectivity OK'
 
 
+def _etag_route(func):
+    """
+    Validate and cache the responses of a catalog collection endpoint by an ETag
+
+    The ETag is derived from the version of the collection data, see get_etag.
+    If the client already has the response (If-None-Match) a 304 Not Modified is returned
+    without executing the endpoint.
+    Otherwise the response is served from the response cache, if possible.
+
+    Views and worker requests are not validated, views may contain data from any collection.
+
+    :param func:
+    :return:
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        catalog_name = kwargs.get('catalog_name')
+        collection_name = kwargs.get('collection_name')
+        if request.args.get('view') or WorkerResponse.is_worker_request() or \
+                not GOBModel().get_collection(catalog_name, collection_name):
+            return func(*args, **kwargs)
+
+        version = get_version(catalog_name, collection_name)
+        etag = get_etag(version)
+        if is_not_modified(etag):
+            return not_modified(etag)
+
+        response = response_cache.get(catalog_name, collection_name, version, etag)
+        if response is None:
+            response = func(*args, **kwargs)
+            response_cache.put(catalog_name, collection_name, etag, response)
+        return add_etag(response, etag)
+
+    return wrapper
+
+
+def _attribute_names():
+    """Returns the names of the attributes of all collections in the GOB model
+
+    :return:
+    """
+    model = GOBModel()
+    return {name for catalog_name in model.get_catalogs()
+            for collection in model.get_collections(catalog_name).values()
+            for name in collection['fields']}
+
+
 def _add_route(app, paths, rule, view_func, methods):
     """
     For every rule add a public and a secure endpoint
@@ -411,6 +614,9 @@ def get_app():
     """
     connect()
 
+    # Response keys are mostly attribute names, convert these to camelCase in advance
+    prepopulate_camelcase(_attribute_names())
+
     graphql = GraphQLView.as_view(
         'graphql',
         schema=schema,
@@ -440,8 +646,8 @@ def get_app():
     ROUTES = [
         (PUBLIC, '/', _catalogs, ['GET']),
         (PUBLIC, '/<catalog_name>/', _catalog, ['GET']),
-        (PUBLIC, '/<catalog_name>/<collection_name>/', _collection, ['GET']),
-        (PUBLIC, '/<catalog_name>/<collection_name>/<entity_id>/', _entity, ['GET']),
+        (PUBLIC, '/<catalog_name>/<collection_name>/', _etag_route(_collection), ['GET']),
+        (PUBLIC, '/<catalog_name>/<collection_name>/<entity_id>/', _etag_route(_entity), ['GET']),
         (PUBLIC, '/<catalog_name>/<collection_name>/<entity_id>/<reference_path>/', _reference_collection, ['GET']),
         (PUBLIC, '/alltests/', _clear_tests, ['DELETE']),
         (PUBLIC, '/toestanden/', _states, ['GET']),
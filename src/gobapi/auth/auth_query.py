@@ -236,6 +236,7 @@ class AuthorizedQuery(Query):
         An authorized query checks every entity for columns that should not be communicated.
         """
         self._authority = None
+        self._loaded_columns = None
         super().__init__(*args, **kwargs)
 
     def set_catalog_collection(self, catalog, collection):
@@ -244,6 +245,14 @@ class AuthorizedQuery(Query):
         """
         self._authority = Authority(catalog, collection)
 
+    def set_loaded_columns(self, columns):
+        """
+        Register the columns that are loaded by the query, by default all columns are loaded
+
+        Columns that are not loaded are not checked, checking these columns would (lazy) load their values
+        """
+        self._loaded_columns = columns
+
     def __iter__(self):
         """
         Iterator that yields entities for which the non-authorized columns have been cleared.
@@ -257,6 +266,10 @@ class AuthorizedQuery(Query):
             suppressed_columns = []
             secure_columns = {}
 
+        if self._loaded_columns is not None:
+            secure_columns = {column: info for column, info in secure_columns.items()
+                              if column in self._loaded_columns}
+
         for entity in super().__iter__():
             if isinstance(entity, tuple):
                 self._suppress_columns(entity[0], suppressed_columns)
@@ -276,7 +289,9 @@ class AuthorizedQuery(Query):
 
     def _suppress_columns(self, entity, suppressed_columns):
         self.set_suppressed_columns(entity, suppressed_columns)
-        for column in [c for c in suppressed_columns if hasattr(entity, c)]:
+        columns = suppressed_columns if self._loaded_columns is None else \
+            [c for c in suppressed_columns if c in self._loaded_columns]
+        for column in [c for c in columns if hasattr(entity, c)]:
             setattr(entity, column, None)
 
     def set_suppressed_columns(self, entity, suppressed_columns):
@@ -0,0 +1,130 @@
+"""Compression
+
+Streaming responses are compressed on the fly when the client accepts a supported encoding.
+The encoding is negotiated by the Accept-Encoding request header.
+
+gzip is always supported, zstd is supported when the zstandard package is installed.
+The compression level is set by STREAM_COMPRESSION_LEVEL, 0 disables compression.
+
+Worker files are written gzip compressed when WORKER_FILE_COMPRESSION is set.
+
+"""
+import gzip
+import zlib
+
+from flask import request
+
+from gobapi.config import STREAM_COMPRESSION_LEVEL
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# The first bytes of any gzip file
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# Size of the chunks that are read from a compressed file
+_READ_SIZE = 64 * 1024
+
+
+def get_encodings():
+    """Returns the supported encodings, most preferred first
+
+    :return:
+    """
+    return [ZSTD, GZIP] if zstandard else [GZIP]
+
+
+def get_encoding():
+    """Returns the encoding for the response that is being served
+
+    :return: the best supported encoding that is accepted by the client or None for no compression
+    """
+    if STREAM_COMPRESSION_LEVEL <= 0:
+        return None
+    return request.accept_encodings.best_match(get_encodings())
+
+
+def accepts(encoding):
+    """Tells whether the client accepts the given encoding
+
+    :param encoding:
+    :return:
+    """
+    return request.accept_encodings[encoding] > 0
+
+
+def compress(chunks, encoding):
+    """Compress the given chunks with the given encoding
+
+    Each chunk is flushed so that the client receives the chunk without delay.
+    Streams that report progress or keep the connection alive, e.g. a dump to another database, depend on this.
+    Entity streams are yielded in large chunks, e.g. see utils.coalesce_chunks, so the flushes hardly affect the ratio.
+
+    If an Exception occurs, the compressed data is flushed before the Exception is re-raised
+    so that the client receives any error message that has been generated, see utils.streaming_gob_response
+
+    :param chunks: str or bytes chunks
+    :param encoding: GZIP or ZSTD
+    :return: compressed chunks
+    """
+    compressor, flush_mode = _get_compressor(encoding)
+    try:
+        for chunk in chunks:
+            if chunk:
+                data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+                yield data + compressor.flush(flush_mode)
+    except Exception as e:
+        yield compressor.flush()
+        raise e
+
+    yield compressor.flush()
+
+
+def _get_compressor(encoding):
+    """Returns a compressor for the given encoding and the mode to flush the compressor after each chunk
+
+    :param encoding:
+    :return: (compressor, flush mode)
+    """
+    if encoding == ZSTD:
+        compressor = zstandard.ZstdCompressor(level=STREAM_COMPRESSION_LEVEL).compressobj()
+        return compressor, zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    # Use a gzip header and trailer
+    return zlib.compressobj(STREAM_COMPRESSION_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS), zlib.Z_SYNC_FLUSH
+
+
+def open_file(filename, compressed):
+    """Opens the given file for writing bytes
+
+    :param filename:
+    :param compressed: write gzip compressed
+    :return:
+    """
+    if compressed:
+        return gzip.open(filename, "wb", compresslevel=max(STREAM_COMPRESSION_LEVEL, 1))
+    return open(filename, "wb")
+
+
+def is_compressed_file(filename):
+    """Tells whether the given file is gzip compressed
+
+    :param filename:
+    :return:
+    """
+    with open(filename, "rb") as f:
+        return f.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+
+
+def decompress_file(filename):
+    """Reads the given gzip compressed file
+
+    :param filename:
+    :return: decompressed chunks
+    """
+    with gzip.open(filename, "rb") as f:
+        yield from iter(lambda: f.read(_READ_SIZE), b'')
@@ -20,6 +20,50 @@ GOB_DB = {
     'port': os.getenv("DATABASE_PORT_OVERRIDE", 5406),
 }
 
+# Connection pool of the GOB database, see sqlalchemy.create_engine
+GOB_DB_POOL = {
+    'pool_size': int(os.getenv("DATABASE_POOL_SIZE", 5)),
+    'max_overflow': int(os.getenv("DATABASE_MAX_OVERFLOW", 10)),
+    'pool_recycle': int(os.getenv("DATABASE_POOL_RECYCLE", 3600)),  # seconds, -1 for no recycle
+    'pool_pre_ping': os.getenv("DATABASE_POOL_PRE_PING", "true") == "true",
+}
+
+# Statement timeouts in milliseconds (0 = no timeout) per route class, see gobapi.db_pool
+STATEMENT_TIMEOUTS = {
+    'interactive': int(os.getenv("INTERACTIVE_STATEMENT_TIMEOUT", 120000)),
+    'streaming': int(os.getenv("STREAMING_STATEMENT_TIMEOUT", 0)),
+    'dump': int(os.getenv("DUMP_STATEMENT_TIMEOUT", 0)),
+}
+
+# Number of rows that are fetched at once from a server side cursor when streaming entities
+STREAM_FETCH_SIZE = int(os.getenv("STREAM_FETCH_SIZE", 10000))
+
+# Min size of the chunks that are written to the client in streaming responses, see gobapi.utils.coalesce_chunks
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 64 * 1024))
+
+# Compression level of streaming responses and worker files (0 = no compression), see gobapi.compression
+STREAM_COMPRESSION_LEVEL = int(os.getenv("STREAM_COMPRESSION_LEVEL", 6))
+WORKER_FILE_COMPRESSION = os.getenv("WORKER_FILE_COMPRESSION", "false") == "true"
+
+# Load dumps to a PostgreSQL database in binary COPY format when possible, see gobapi.dump.binary
+DUMP_BINARY_COPY = os.getenv("DUMP_BINARY_COPY", "true") == "true"
+
+# Replace a dumped PostgreSQL table by renaming the loaded tmp table instead of copying it, see gobapi.dump.to_db
+DUMP_TABLE_SWAP = os.getenv("DUMP_TABLE_SWAP", "true") == "true"
+
+# Max number of relations that are dumped to a database concurrently (1 = one after another), see gobapi.dump.to_db
+DUMP_RELATION_THREADS = int(os.getenv("DUMP_RELATION_THREADS", 1))
+
+# Max number of destination connections that build the indexes of a dumped table concurrently
+DUMP_INDEX_CONNECTIONS = int(os.getenv("DUMP_INDEX_CONNECTIONS", 4))
+
+# Directory for the cached reflection of the GOB database, see gobapi.reflection_cache
+# The directory is private to the user that runs the API, the cache files are unpickled on startup
+REFLECTION_CACHE_DIR = os.getenv("REFLECTION_CACHE_DIR", os.path.expanduser("~/.cache/gobapi"))
+
+# Max total size in bytes of the cached responses, see gobapi.response_cache. 0 disables the cache
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 64 * 1024 * 1024))
+
 # see gobapi.services.registry
 API_INFRA_SERVICES = os.getenv(
     "API_INFRA_SERVICES", "MESSAGE_SERVICE"
@@ -0,0 +1,102 @@
+"""Database connection pool
+
+The connection pool is configured by GOB_DB_POOL.
+
+Every statement is subject to the statement timeout for the class of the route that is being served:
+- dump: dumps of collections
+- streaming: streaming (stream, ndjson, graphql streaming) responses
+- interactive: any other request
+Outside of a request no statement timeout applies.
+
+The statement timeout is set when a connection is checked out from the pool.
+The current timeout is registered with the connection so that it is only set when it changes.
+
+"""
+from flask import request
+from sqlalchemy import event
+
+from gobapi.config import STATEMENT_TIMEOUTS
+
+INTERACTIVE = 'interactive'
+STREAMING = 'streaming'
+DUMP = 'dump'
+
+_STATEMENT_TIMEOUT = 'statement_timeout'
+
+
+def activate(engine):
+    """
+    Activate statement timeouts by registering to the checkout event of the engine's pool
+
+    :param engine:
+    :return:
+    """
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        _set_statement_timeout(dbapi_connection, connection_record.info, get_statement_timeout())
+
+
+def get_route_class():
+    """Returns the class of the route that is being served
+
+    :return: DUMP, STREAMING, INTERACTIVE or None when not serving a request
+    """
+    try:
+        path = request.path
+        args = request.args
+    except RuntimeError:
+        # Working outside of request context
+        return None
+
+    if '/dump/' in path:
+        return DUMP
+    elif args.get('stream') == 'true' or args.get('ndjson') == 'true' or path.endswith('/streaming/'):
+        return STREAMING
+    else:
+        return INTERACTIVE
+
+
+def get_statement_timeout():
+    """Returns the statement timeout in milliseconds for the route that is being served
+
+    :return: timeout in milliseconds, 0 for no timeout
+    """
+    return STATEMENT_TIMEOUTS.get(get_route_class(), 0)
+
+
+def _set_statement_timeout(dbapi_connection, info, timeout):
+    """
+    Set the statement timeout for the given DBAPI connection
+
+    The timeout is committed so that it applies to the connection, not only to the current transaction
+
+    :param dbapi_connection:
+    :param info: info dictionary that lives as long as the DBAPI connection
+    :param timeout: timeout in milliseconds
+    :return:
+    """
+    if info.get(_STATEMENT_TIMEOUT) == timeout:
+        return
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET statement_timeout = {int(timeout)}")
+    cursor.close()
+    dbapi_connection.commit()
+    info[_STATEMENT_TIMEOUT] = timeout
+
+
+def get_status(engine):
+    """Returns the status of the connection pool of the given engine
+
+    :param engine:
+    :return:
+    """
+    pool = engine.pool
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'status': pool.status(),
+        'statement_timeouts': STATEMENT_TIMEOUTS,
+    }
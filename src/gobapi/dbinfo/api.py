@@ -1,11 +1,18 @@
 from flask import jsonify
 
-from gobapi.storage import exec_statement
+from gobapi.storage import exec_statement, get_pool_status
 
 from gobapi.dbinfo.statements import DB_STATEMENTS
 
 
+# Info type for the status of the connection pool
+POOL_INFO = "pool"
+
+
 def get_db_info(info_type):
+    if info_type == POOL_INFO:
+        return jsonify(get_pool_status())
+
     statement = DB_STATEMENTS.get(info_type)
     if statement:
         results = exec_statement(statement)
@@ -0,0 +1,199 @@
+"""
+Dump GOB
+
+Dumps of catalog collections in PostgreSQL binary COPY format
+
+The binary format avoids the quoting and escaping of values and the parsing of the text on the destination side.
+The values are the same values as the CSV values, see gobapi.dump.csv, but they are not quoted or escaped.
+
+https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+"""
+import datetime
+import decimal
+import json
+import re
+import struct
+
+from shapely import wkb, wkt
+
+from gobapi.dump.config import to_bool, to_date, to_datetime
+from gobapi.dump.config import get_column_types, get_fields, get_field_values_getter
+from gobapi.dump.csv_stream import CSVStream
+
+# File header: signature, flags field and header extension area length
+HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+# File trailer: a tuple with field count -1
+TRAILER = struct.pack('!h', -1)
+
+_NULL = struct.pack('!i', -1)
+
+# Dates and timestamps are relative to 2000-01-01
+_EPOCH_DATE = datetime.date(2000, 1, 1)
+_EPOCH_DATETIME = datetime.datetime(2000, 1, 1)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Numeric values are stored in base 10000 digits
+_NUMERIC_POS = 0x0000
+_NUMERIC_NEG = 0x4000
+_NUMERIC_NAN = 0xC000
+_NUMERIC_DIGITS = 4
+
+_SRID = re.compile(r"^SRID=(\d+);(.*)$")
+_HEX = re.compile(r"^[0-9a-fA-F]+$")
+
+
+def _encode_string(value):
+    return str(value).encode('utf-8')
+
+
+def _encode_integer(value):
+    return struct.pack('!i', int(value))
+
+
+def _encode_boolean(value):
+    return struct.pack('!?', to_bool(value))
+
+
+def _encode_date(value):
+    return struct.pack('!i', (to_date(value) - _EPOCH_DATE).days)
+
+
+def _encode_timestamp(value):
+    return struct.pack('!q', (to_datetime(value) - _EPOCH_DATETIME) // _MICROSECOND)
+
+
+def _encode_numeric(value):
+    """
+    Encode a numeric value as ndigits, weight, sign and display scale followed by the base 10000 digits
+
+    :param value:
+    :return:
+    """
+    value = decimal.Decimal(str(value))
+    if not value.is_finite():
+        return struct.pack('!hhHh', 0, 0, _NUMERIC_NAN, 0)
+
+    sign, digits, exponent = value.as_tuple()
+    dscale = max(-exponent, 0)
+    digits = "".join(str(digit) for digit in digits) + "0" * max(exponent, 0)
+
+    # Split in integer and fraction digits, both padded to whole base 10000 digits
+    n_integer = len(digits) - dscale
+    integer = digits[:max(n_integer, 0)]
+    fraction = "0" * max(-n_integer, 0) + digits[max(n_integer, 0):]
+    integer = integer.zfill(-(-len(integer) // _NUMERIC_DIGITS) * _NUMERIC_DIGITS)
+    fraction = fraction.ljust(-(-len(fraction) // _NUMERIC_DIGITS) * _NUMERIC_DIGITS, "0")
+
+    base_digits = [int(integer[i:i + _NUMERIC_DIGITS]) for i in range(0, len(integer), _NUMERIC_DIGITS)]
+    weight = len(base_digits) - 1
+    base_digits += [int(fraction[i:i + _NUMERIC_DIGITS]) for i in range(0, len(fraction), _NUMERIC_DIGITS)]
+
+    # Strip leading and trailing zero digits
+    while base_digits and base_digits[0] == 0:
+        base_digits.pop(0)
+        weight -= 1
+    while base_digits and base_digits[-1] == 0:
+        base_digits.pop()
+    if not base_digits:
+        weight = 0
+
+    return struct.pack(f'!hhHh{len(base_digits)}h',
+                       len(base_digits), weight, _NUMERIC_NEG if sign else _NUMERIC_POS, dscale, *base_digits)
+
+
+def _encode_geometry(value):
+    """
+    Encode a geometry as (E)WKB
+
+    The value is either (E)WKB in hex format, eg a WKBElement, or (E)WKT
+
+    :param value:
+    :return:
+    """
+    value = str(value)
+    if _HEX.match(value):
+        return bytes.fromhex(value)
+
+    srid = _SRID.match(value)
+    if srid:
+        return wkb.dumps(wkt.loads(srid.group(2)), srid=int(srid.group(1)))
+    return wkb.dumps(wkt.loads(value))
+
+
+def _encode_jsonb(value):
+    # jsonb version number followed by the json text
+    return b'\x01' + (value if isinstance(value, str) else json.dumps(value)).encode('utf-8')
+
+
+ENCODERS = {
+    "character varying": _encode_string,
+    "integer": _encode_integer,
+    "boolean": _encode_boolean,
+    "date": _encode_date,
+    "timestamp without time zone": _encode_timestamp,
+    "numeric": _encode_numeric,
+    "geometry": _encode_geometry,
+    "jsonb": _encode_jsonb,
+}
+
+
+def _tuple(values, encoders):
+    """
+    Returns the binary tuple for the given values
+
+    :param values:
+    :param encoders:
+    :return:
+    """
+    fields = [struct.pack('!h', len(values))]
+    for value, encode in zip(values, encoders):
+        if value is None:
+            fields.append(_NULL)
+        else:
+            data = encode(value)
+            fields.append(struct.pack('!i', len(data)))
+            fields.append(data)
+    return b"".join(fields)
+
+
+def is_supported(model, ignore_fields=None):
+    """
+    Tells if the entities of the given model can be encoded in binary format
+
+    :param model:
+    :param ignore_fields:
+    :return:
+    """
+    return all(column_type in ENCODERS for column_type in get_column_types(*get_fields(model, ignore_fields)))
+
+
+def binary_entities(entities, model, ignore_fields=None):
+    """
+    Yield the given entities as binary tuples, without file header and trailer, see BinaryStream
+
+    :param entities:
+    :param model:
+    :param ignore_fields:
+    :return:
+    """
+    field_specifications, field_order = get_fields(model, ignore_fields)
+    encoders = [ENCODERS[column_type] for column_type in get_column_types(field_specifications, field_order)]
+    getters = [get_field_values_getter(field_name, field_specifications) for field_name in field_order]
+    for entity in entities:
+        yield _tuple([value for get_values in getters for value in get_values(entity)], encoders)
+
+
+class BinaryStream(CSVStream):
+    """
+    A class to stream binary tuples in 'faked' multiple files, see CSVStream
+
+    Each file starts with the binary file header and ends with the binary file trailer
+    """
+    TRAILER = TRAILER
+
+    def _get_header(self):
+        return HEADER
+
+    def _encode(self, line):
+        # Tuples are already encoded
+        return line
@@ -1,3 +1,5 @@
+import datetime
+
 from gobcore.typesystem import get_gob_type, GOB_SECURE_TYPES
 from gobcore.model.metadata import FIELD
 from gobcore.typesystem import is_gob_geo_type, is_gob_reference_type
@@ -29,6 +31,13 @@ SKIP_FIELDS = ["_hash", "_gobid"]
 
 SKIP_RELATIONS = ["brk_tng_brk_sdl_is_gebaseerd_op_stukdeel"]
 
+# Temporary table to stage the ids for a sync dump
+SYNC_IDS_TABLE = "sync_ids"
+SYNC_ID = "sync_id"
+
+# Table with the checkpoints of the dumps in a destination schema, to resume failed dumps
+CHECKPOINTS_TABLE = "dump_checkpoints"
+
 # SQL constants
 SQL_TYPE_CONVERSIONS = {
     "GOB.String": "character varying",
@@ -235,3 +244,196 @@ def get_field_value(entity, field, spec):
     gob_type = get_gob_type(spec['type'])
     entity_value = getattr(entity, field, None)
     return None if entity_value is None else gob_type.from_value(entity_value).to_value
+
+
+def get_field_value_getter(field_name, specs):
+    """
+    Returns a function that gets the value of the given field from an entity, see get_field_value
+
+    The GOB type is resolved once so that the returned function can be applied to many entities
+
+    :param field_name:
+    :param specs:
+    :return:
+    """
+    if is_unique_id(field_name):
+        return _get_unique_reference_getter(field_name, specs)
+
+    from_value = get_gob_type(specs[field_name]['type']).from_value
+
+    def get_value(entity):
+        entity_value = getattr(entity, field_name, None)
+        return None if entity_value is None else from_value(entity_value).to_value
+
+    return get_value
+
+
+def _get_unique_reference_getter(field_name, specs):
+    """
+    Returns a function that gets the unique reference of an entity, see get_unique_reference
+
+    The getters of the id and volgnummer fields are resolved once
+
+    :param field_name:
+    :param specs:
+    :return:
+    """
+    if field_name == UNIQUE_ID:
+        get_id = get_field_value_getter(specs[UNIQUE_ID]['entity_id'], specs)
+        if specs.get(FIELD.SEQNR) is None:
+            return get_id
+        get_volgnummer = get_field_value_getter(FIELD.SEQNR, specs)
+        return lambda entity: joined_names(get_id(entity), get_volgnummer(entity))
+
+    side = [side for side in REL_SIDES if field_name == f"{side}_{UNIQUE_ID}"][0]
+    get_id = get_field_value_getter(f"{side}_id", specs)
+    get_volgnummer = get_field_value_getter(f"{side}_{FIELD.SEQNR}", specs)
+
+    def get_value(entity):
+        id = get_id(entity)
+        volgnummer = get_volgnummer(entity)
+        return id if volgnummer is None else joined_names(id, volgnummer)
+
+    return get_value
+
+
+def to_bool(value):
+    """
+    Returns the boolean for the given SQL boolean value, either a boolean or its text representation
+
+    :param value:
+    :return:
+    """
+    if isinstance(value, str):
+        return value.lower() in ['t', 'true', 'y', 'yes', 'on', '1']
+    return bool(value)
+
+
+def to_date(value):
+    """
+    Returns the date for the given date, datetime or ISO formatted text
+
+    :param value:
+    :return:
+    """
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    elif isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+
+def to_datetime(value):
+    """
+    Returns the datetime without time zone for the given date, datetime or ISO formatted text
+
+    :param value:
+    :return:
+    """
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    # timestamp without time zone ignores any time zone
+    return value.replace(tzinfo=None)
+
+
+def _text_value(value):
+    """
+    Returns the text of a value in a list of values
+
+    :param value:
+    :return:
+    """
+    return "" if value is None else str(value)
+
+
+def _list_value(values):
+    return "[" + ",".join(_text_value(value) for value in values) + "]"
+
+
+def _reference_values(value, spec):
+    """
+    Returns the values for the given reference and type specification
+    Note that the result is an array, as a reference value results in multiple values
+
+    :param value:
+    :param spec:
+    :return:
+    """
+    if spec['type'] == "GOB.Reference":
+        dst = add_unique_reference(value or {})
+        return [dst.get(field) for field in get_reference_fields(spec)]
+    else:  # GOB.ManyReference
+        dsts = [add_unique_reference(dst) for dst in value or []]
+        return [_list_value(dst.get(field) for dst in dsts) for field in get_reference_fields(spec)]
+
+
+def get_values(value, spec):
+    """
+    Returns the values for the given value and type specification
+    Note that the result is an array, as reference and JSON values result in multiple values
+
+    :param value:
+    :param spec:
+    :return:
+    """
+    if spec['type'] in REFERENCE_TYPES:
+        return _reference_values(value, spec)
+    elif spec['type'] == 'GOB.JSON':
+        if isinstance(value, list):
+            return [_list_value(row.get(field, '') for row in value) for field in spec['attributes'].keys()]
+        else:
+            value = value or {}
+            return [value.get(field) for field in spec['attributes'].keys()]
+    else:
+        return [value]
+
+
+def get_column_types(field_specs, field_order):
+    """
+    Returns the SQL types of the columns for the given type specifications, see sql._create_table
+
+    :param field_specs:
+    :param field_order:
+    :return:
+    """
+    types = []
+    for field_name in field_order:
+        field_spec = field_specs[field_name]
+        if field_spec['type'] in REFERENCE_TYPES:
+            types.extend([SQL_TYPE_CONVERSIONS['GOB.String']] * len(get_reference_fields(field_spec)))
+        elif field_spec['type'] == 'GOB.JSON':
+            types.extend([SQL_TYPE_CONVERSIONS['GOB.String']] * len(field_spec['attributes']))
+        else:
+            types.append(SQL_TYPE_CONVERSIONS.get(field_spec['type']))
+    return types
+
+
+def get_field_values_getter(field_name, field_specs):
+    """
+    Returns a function that returns the values for the given field of an entity
+
+    :param field_name:
+    :param field_specs:
+    :return:
+    """
+    field_spec = field_specs[field_name]
+    get_value = get_field_value_getter(field_name, field_specs)
+    if field_spec['type'] in REFERENCE_TYPES or field_spec['type'] == 'GOB.JSON':
+        return lambda entity: get_values(get_value(entity), field_spec)
+    else:
+        return lambda entity: [get_value(entity)]
+
+
+def get_fields(model, ignore_fields):
+    """
+    Returns the field specifications and the order of the fields for the given model, without the ignored fields
+
+    :param model:
+    :param ignore_fields:
+    :return:
+    """
+    field_specifications = get_field_specifications(model)
+    field_order = [f for f in get_field_order(model) if f not in (ignore_fields or [])]
+    return field_specifications, field_order
@@ -2,14 +2,19 @@
 Dump GOB
 
 Dumps of catalog collections in csv format
+
+The entities are converted by a csv encoder that interprets the field specifications only once.
 """
 import re
 
 from gobapi.dump.config import DELIMITER_CHAR, QUOTATION_CHAR
 from gobapi.dump.config import REFERENCE_TYPES, get_reference_fields
 
-from gobapi.dump.config import get_unique_reference, add_unique_reference, is_unique_id
-from gobapi.dump.config import get_field_specifications, get_field_order, get_field_value, joined_names
+from gobapi.dump.config import add_unique_reference
+from gobapi.dump.config import get_field_specifications, get_field_order, joined_names
+from gobapi.dump.config import get_field_value_getter
+
+_RE_CRLF = re.compile(r"\r?\n")
 
 
 def _csv_line(values):
@@ -35,9 +40,7 @@ def _csv_value(value):
         # Do not surround numeric values with quotes
         return str(value)
     else:
-        value = str(value)
-        value_without_crlf = re.compile(r"\r?\n")
-        value = value_without_crlf.sub(" ", value)
+        value = _RE_CRLF.sub(" ", str(value))
         value = value.replace(QUOTATION_CHAR, 2 * QUOTATION_CHAR)
         return f"{QUOTATION_CHAR}{value}{QUOTATION_CHAR}"
 
@@ -120,22 +123,40 @@ def _csv_header(field_specs, field_order):
     return fields
 
 
-def _csv_record(entity, field_specs, field_order):
+def _csv_field_encoder(field_name, field_specs):
     """
-    Returns the CSV record fields for the given entity and corresponding type specifications
-    :param entity:
+    Returns a function that returns the CSV values for the given field of an entity, joined by DELIMITER_CHAR
+
+    :param field_name:
     :param field_specs:
     :return:
     """
-    fields = []
-    for field_name in field_order:
-        field_spec = field_specs[field_name]
-        if is_unique_id(field_name):
-            value = get_unique_reference(entity, field_name, field_specs)
-        else:
-            value = get_field_value(entity, field_name, field_spec)
-        fields.extend(_csv_values(value, field_spec))
-    return fields
+    field_spec = field_specs[field_name]
+    get_value = get_field_value_getter(field_name, field_specs)
+    if field_spec['type'] in REFERENCE_TYPES or field_spec['type'] == 'GOB.JSON':
+        return lambda entity: DELIMITER_CHAR.join(_csv_values(get_value(entity), field_spec))
+    else:
+        return lambda entity: _csv_value(get_value(entity))
+
+
+def csv_encoder(field_specs, field_order):
+    """
+    Returns a function that returns the CSV line for an entity, see _csv_line
+
+    The field specifications are interpreted once so that the returned function can be applied to many entities
+
+    :param field_specs:
+    :param field_order:
+    :return:
+    """
+    # Skip fields without any CSV values, eg JSON fields without attributes
+    encoders = [_csv_field_encoder(field_name, field_specs) for field_name in field_order
+                if field_specs[field_name]['type'] != 'GOB.JSON' or field_specs[field_name]['attributes']]
+
+    def encode(entity):
+        return DELIMITER_CHAR.join([encode_field(entity) for encode_field in encoders]) + "\n"
+
+    return encode
 
 
 def csv_entities(entities, model, ignore_fields=None):
@@ -150,10 +171,11 @@ def csv_entities(entities, model, ignore_fields=None):
     field_specifications = get_field_specifications(model)
     field_order = [f for f in get_field_order(model) if f not in ignore_fields]
 
+    encode = csv_encoder(field_specifications, field_order)
+
     header = _csv_header(field_specifications, field_order)
     for entity in entities:
         if header:
             yield _csv_line(header)
             header = None
-        fields = _csv_record(entity, field_specifications, field_order)
-        yield _csv_line(fields)
+        yield encode(entity)
@@ -1,4 +1,4 @@
-import itertools
+from collections import deque
 
 
 class CSVStream():
@@ -19,8 +19,12 @@ class CSVStream():
         a,b,c
         7,8,9
 
+    The lines are encoded once and kept as a queue of chunks.
+    Each read joins the requested bytes from the chunks, so every byte is copied only once.
     """
     DEFAULT_READ_SIZE = 8192  # Default number of bytes to return by the read method
+    ENCODING = "utf-8"
+    TRAILER = b""             # Data to end each faked file with
 
     def __init__(self, lines, max_read):
         """
@@ -32,11 +36,26 @@ class CSVStream():
         self.lines = lines
         self.max_read = max_read
 
-        self.buffer = ""                    # Buffer all input that has not been 'written out'
+        self.chunks = deque()               # Buffer all input that has not been 'written out'
+        self.offset = 0                     # Number of bytes of the first chunk that have already been written out
+        self.size = 0                       # Number of bytes in the buffer that have not been written out
         self.count = 0                      # Count the number of lines for a faked file
         self.total_count = 0                # Count the total number of lines for all faked file reads
-        self.last_line = next(lines, None)  # Extract the header
-        self.header = self.last_line        # Keep this line for any subsequent reset_count's
+        self.peeked = None                  # Line that has been read by has_items
+        self.started = False                # Tells if the header of the current faked file has been buffered
+        self.ended = False                  # Tells if the last line of the current faked file has been buffered
+        self.header = self._get_header()    # Keep this line for any subsequent reset_count's
+
+    def _get_header(self):
+        """
+        Extract the header
+
+        :return:
+        """
+        return self._encode(next(self.lines, None) or "")
+
+    def _encode(self, line):
+        return line.encode(self.ENCODING)
 
     def reset_count(self):
         """
@@ -45,6 +64,8 @@ class CSVStream():
         :return: None
         """
         self.count = 0
+        self.started = False
+        self.ended = False
 
     def has_items(self):
         """
@@ -52,11 +73,47 @@ class CSVStream():
 
         :return: True if any items are available to be read
         """
-        peek_line = next(self.lines, None)
-        if peek_line:
-            # Put back the peeked line
-            self.lines = itertools.chain([peek_line], self.lines)
-        return peek_line is not None
+        if self.peeked is None:
+            self.peeked = next(self.lines, None)
+        return self.peeked is not None
+
+    def _next_line(self):
+        """
+        Returns the next line for the current faked file
+
+        :return: the next line or None if no more lines can be read or the maximum number of lines has been read
+        """
+        if self.count >= self.max_read or not self.has_items():
+            return None
+        line, self.peeked = self.peeked, None
+        self.count += 1
+        self.total_count += 1
+        return line
+
+    def _append(self, data):
+        if data:
+            self.chunks.append(data)
+            self.size += len(data)
+
+    def _take(self, size):
+        """
+        Take at most size bytes from the buffer
+
+        :param size:
+        :return:
+        """
+        pieces = []
+        while size > 0 and self.chunks:
+            chunk = self.chunks[0]
+            piece = memoryview(chunk)[self.offset:self.offset + size]
+            pieces.append(piece)
+            size -= len(piece)
+            self.size -= len(piece)
+            self.offset += len(piece)
+            if self.offset == len(chunk):
+                self.chunks.popleft()
+                self.offset = 0
+        return b"".join(pieces)
 
     def read(self, size=DEFAULT_READ_SIZE):
         """
@@ -65,27 +122,25 @@ class CSVStream():
         :param size:
         :return:
         """
-        if self.count == 0:
-            # Start a new 'file' so start with a header and any remaining buffer contents from any previous reads
-            self.buffer = self.header + self.buffer
+        if not self.started:
+            # Start a new 'file' so start with a header. Any data of a previous 'file' has already been read
+            self._append(self.header)
+            self.started = True
 
-        while len(self.buffer) < size and self.count < self.max_read:
+        while self.size < size and not self.ended:
             # Read a line, stop if:
             # - no more lines can be read
             # - the requested size has been reached
             # - the maximum number of lines has been read
-            self.last_line = next(self.lines, None)
-            if self.last_line is None:
-                break
-            # Store the line in the buffer and increment counters
-            self.buffer += self.last_line
-            self.count += 1
-            self.total_count += 1
-        # Return the requested size (or less if no more data is available)
-        result = self.buffer[:size]
-        # Keep any remaining data for the next read
-        self.buffer = self.buffer[size:]
-        return result
+            line = self._next_line()
+            if line is None:
+                self._append(self.TRAILER)
+                self.ended = True
+            else:
+                self._append(self._encode(line))
+
+        # Return the requested size (or less if no more data is available), keep any remaining data for the next read
+        return self._take(size)
 
     def readline(self, *args, **kwargs):
         """
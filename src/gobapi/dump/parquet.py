@@ -0,0 +1,157 @@
+"""
+Dump GOB
+
+Dumps of catalog collections in Parquet format
+
+The columns are the same as the columns of the CSV dump, see gobapi.dump.csv.
+The column types are derived from the SQL column types, see gobapi.dump.config.SQL_TYPE_CONVERSIONS.
+Numeric values are written as text to keep their exact value.
+
+The entities are written in row groups of ROW_GROUP_SIZE entities.
+Each row group is returned as soon as it has been written, so the memory usage is bounded by the row group size.
+
+Parquet dumps require the pyarrow package.
+"""
+import json
+
+from itertools import islice
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from gobapi.dump.config import REFERENCE_TYPES, get_reference_fields, joined_names
+from gobapi.dump.config import to_bool, to_date, to_datetime
+from gobapi.dump.config import get_column_types, get_fields, get_field_values_getter
+
+ROW_GROUP_SIZE = 100000         # Number of entities per row group
+
+
+def is_available():
+    """
+    Tells if Parquet dumps are available
+
+    :return:
+    """
+    return pyarrow is not None
+
+
+def _blocks(entities, size):
+    """
+    Yields the given entities in blocks of the given size
+
+    :param entities:
+    :param size:
+    :return:
+    """
+    entities = iter(entities)
+    block = list(islice(entities, size))
+    while block:
+        yield block
+        block = list(islice(entities, size))
+
+
+def _to_json(value):
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _get_arrow_types():
+    """
+    Returns the Arrow type and the value conversion for each SQL type
+
+    :return:
+    """
+    return {
+        "character varying": (pyarrow.string(), str),
+        "integer": (pyarrow.int64(), int),
+        "boolean": (pyarrow.bool_(), to_bool),
+        "date": (pyarrow.date32(), to_date),
+        "timestamp without time zone": (pyarrow.timestamp('us'), to_datetime),
+        # numeric has no fixed precision and scale, the exact value is kept as text
+        "numeric": (pyarrow.string(), str),
+        "geometry": (pyarrow.string(), str),
+        "jsonb": (pyarrow.string(), _to_json),
+    }
+
+
+def _column_names(field_specs, field_order):
+    """
+    Returns the column names for the given type specifications, see csv._csv_header
+
+    :param field_specs:
+    :param field_order:
+    :return:
+    """
+    names = []
+    for field_name in field_order:
+        field_spec = field_specs[field_name]
+        if field_spec['type'] in REFERENCE_TYPES:
+            names.extend([joined_names(field_name, field) for field in get_reference_fields(field_spec)])
+        elif field_spec['type'] == 'GOB.JSON':
+            names.extend([joined_names(field_name, field) for field in field_spec['attributes'].keys()])
+        else:
+            names.append(field_name)
+    return names
+
+
+class _Sink():
+    """
+    Output stream for the Parquet writer that collects the written data until it is taken
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        """
+        Returns and removes the data that has been written
+
+        :return:
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_entities(entities, model):
+    """
+    Yield the given entities in Parquet format
+
+    :param entities:
+    :param model:
+    :return:
+    """
+    field_specifications, field_order = get_fields(model, None)
+    arrow_types = _get_arrow_types()
+    types, conversions = zip(*[arrow_types.get(column_type, (pyarrow.string(), str))
+                               for column_type in get_column_types(field_specifications, field_order)])
+    schema = pyarrow.schema(list(zip(_column_names(field_specifications, field_order), types)))
+    getters = [get_field_values_getter(field_name, field_specifications) for field_name in field_order]
+
+    sink = _Sink()
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for block in _blocks(entities, ROW_GROUP_SIZE):
+            rows = [[value for get_values in getters for value in get_values(entity)] for entity in block]
+            columns = [pyarrow.array([None if value is None else convert(value) for value in values], type=type)
+                       for values, convert, type in zip(zip(*rows), conversions, types)]
+            writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+            yield sink.take()
+    yield sink.take()
@@ -12,7 +12,8 @@ from gobcore.typesystem import fully_qualified_type_name
 from gobapi.auth.auth_query import Authority
 from gobapi.dump.config import DELIMITER_CHAR
 from gobapi.dump.config import UNIQUE_ID, REFERENCE_TYPES, get_reference_fields
-from gobapi.dump.config import SQL_TYPE_CONVERSIONS, SQL_QUOTATION_MARK
+from gobapi.dump.config import SQL_TYPE_CONVERSIONS, SQL_QUOTATION_MARK, SYNC_IDS_TABLE, SYNC_ID, \
+    CHECKPOINTS_TABLE
 
 from gobapi.dump.config import get_field_specifications, joined_names, get_field_order
 from gobcore.model.metadata import FIELD
@@ -145,15 +146,234 @@ CREATE INDEX IF NOT EXISTS {collection_name}_{field} ON {table} USING {method} (
 """
 
 
+def _lock_table(schema, table_name):
+    """
+    Returns a SQL statement to lock the given table until the end of the transaction
+
+    No other transaction can read the table or create objects that depend on the table while it is locked.
+
+    :param schema:
+    :param table_name:
+    :return:
+    """
+    return f"LOCK TABLE {_quoted_tablename(schema, table_name)} IN ACCESS EXCLUSIVE MODE"
+
+
+def _get_dependent_views(schema, table_name):
+    """
+    Returns a SQL query for the views that depend on the given table, directly or through other views
+
+    Each view is returned with its kind, schema, name, definition, owner, comment and the statements to grant its
+    privileges. The views are ordered so that each view comes after the views it depends on.
+
+    :param schema:
+    :param table_name:
+    :return:
+    """
+    table = to_sql_string_value(_quoted_tablename(schema, table_name))
+    return f"""
+WITH RECURSIVE dependant(oid, depth) AS (
+    SELECT to_regclass({table})::oid, 0
+  UNION
+    SELECT view.oid, dependant.depth + 1
+    FROM dependant
+    JOIN pg_depend dependency ON dependency.refobjid = dependant.oid
+                             AND dependency.classid = 'pg_rewrite'::regclass
+    JOIN pg_rewrite rewrite ON rewrite.oid = dependency.objid
+    JOIN pg_class view ON view.oid = rewrite.ev_class
+    WHERE view.oid != dependant.oid
+)
+SELECT
+    view.relkind,
+    namespace.nspname,
+    view.relname,
+    pg_get_viewdef(view.oid),
+    pg_get_userbyid(view.relowner),
+    obj_description(view.oid, 'pg_class'),
+    ARRAY(
+        SELECT format('GRANT %s ON %I.%I TO %s%s',
+                      acl.privilege_type,
+                      namespace.nspname,
+                      view.relname,
+                      CASE WHEN acl.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(acl.grantee)) END,
+                      CASE WHEN acl.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END)
+        FROM aclexplode(view.relacl) acl
+    )
+FROM (SELECT oid, max(depth) AS depth FROM dependant WHERE depth > 0 GROUP BY oid) dependants
+JOIN pg_class view ON view.oid = dependants.oid
+JOIN pg_namespace namespace ON namespace.oid = view.relnamespace
+ORDER BY dependants.depth, namespace.nspname, view.relname
+"""
+
+
+def _create_view(schema, name, definition, owner, comment, grants):
+    """
+    Returns the SQL statements to recreate a view, see _get_dependent_views
+
+    :param schema:
+    :param name:
+    :param definition:
+    :param owner:
+    :param comment:
+    :param grants: GRANT statements for the privileges on the view
+    :return:
+    """
+    view = _quoted_tablename(schema, name)
+    statements = [
+        f"CREATE VIEW {view} AS {definition.rstrip().rstrip(';')}",
+        f"ALTER VIEW {view} OWNER TO {_quote(owner)}",
+    ]
+    if comment is not None:
+        statements.append(f"COMMENT ON VIEW {view} IS {to_sql_string_value(comment)}")
+    return statements + list(grants)
+
+
+def _swap_table(schema, src_name, dst_name, index_names, views):
+    """
+    Replace the dst table by the src table in the given schema
+
+    The indexes of the src table are renamed to the names of the indexes of the dst table.
+    The given views that depend on the dst table are dropped with the table and recreated on the new table,
+    with their owner, comment and privileges.
+    The statements are executed in a single transaction.
+
+    :param schema:
+    :param src_name:
+    :param dst_name:
+    :param index_names: the names of the indexes without the table name prefix, see _create_index
+    :param views: list of (schema, name, definition, owner, comment, grants) of the views, see _get_dependent_views
+    :return:
+    """
+    statements = [
+        f"DROP TABLE IF EXISTS {_quoted_tablename(schema, dst_name)} CASCADE",
+        f"ALTER TABLE {_quoted_tablename(schema, src_name)} RENAME TO {_quote(dst_name)}",
+    ]
+    statements.extend(f"ALTER INDEX IF EXISTS {_quote(schema)}.{src_name}_{name} RENAME TO {dst_name}_{name}"
+                      for name in index_names)
+    for view in views:
+        statements.extend(_create_view(*view))
+    return ";\n".join(statements)
+
+
+def _analyze_table(schema, collection_name):
+    """
+    Update the planner statistics for the table with the given collection_name in the given schema
+
+    :param schema:
+    :param collection_name:
+    :return:
+    """
+    return f"ANALYZE {_quoted_tablename(schema, collection_name)}"
+
+
 def get_max_eventid(schema, collection_name):
     table_name = _quoted_tablename(schema, collection_name)
     return f"SELECT max({FIELD.LAST_EVENT}) FROM {table_name}"
 
 
-def delete_entities_with_source_ids(schema, collection_name, source_ids):
+def _create_sync_ids_table():
+    """
+    Returns a SQL statement to create the temporary table to stage the ids for a sync dump
+
+    :return:
+    """
+    return f"""
+DROP TABLE IF EXISTS {_quote(SYNC_IDS_TABLE)};
+CREATE TEMPORARY TABLE {_quote(SYNC_IDS_TABLE)} ({SYNC_ID} character varying)
+"""
+
+
+def _copy_into_sync_ids_table():
+    return f"COPY {_quote(SYNC_IDS_TABLE)} ({SYNC_ID}) FROM STDIN DELIMITER '{DELIMITER_CHAR}' CSV HEADER;"
+
+
+def _analyze_sync_ids_table():
+    # Temporary tables are not analyzed automatically
+    return f"ANALYZE {_quote(SYNC_IDS_TABLE)}"
+
+
+def _delete_sync_ids_table():
+    return f"DROP TABLE IF EXISTS {_quote(SYNC_IDS_TABLE)}"
+
+
+def not_in_sync_ids(id):
+    """
+    Returns a SQL condition that tells if the given id has not been staged in the sync ids table
+
+    The condition is planned as an anti-join with the sync ids table
+
+    :param id: SQL expression for the id
+    :return:
+    """
+    sync_ids = _quote(SYNC_IDS_TABLE)
+    return f"NOT EXISTS (SELECT 1 FROM {sync_ids} WHERE {sync_ids}.{SYNC_ID} = {id})"
+
+
+def delete_staged_entities(schema, collection_name, id):
+    """
+    Returns a SQL statement to delete the entities with the ids that have been staged in the sync ids table
+
+    :param schema:
+    :param collection_name:
+    :param id: SQL expression for the id
+    :return:
+    """
     table_name = _quoted_tablename(schema, collection_name)
-    source_ids_sql = ",".join([to_sql_string_value(source_id) for source_id in source_ids])
-    return f"DELETE FROM {table_name} WHERE {FIELD.SOURCE_ID} IN ({source_ids_sql})"
+    sync_ids = _quote(SYNC_IDS_TABLE)
+    return f"DELETE FROM {table_name} USING {sync_ids} WHERE {sync_ids}.{SYNC_ID} = {id}"
+
+
+def _create_checkpoints_table(schema):
+    """
+    Returns a SQL statement to create the table with the checkpoints of the dumps in the given schema
+
+    :param schema:
+    :return:
+    """
+    return f"""
+CREATE TABLE IF NOT EXISTS {_quoted_tablename(schema, CHECKPOINTS_TABLE)}
+(
+  table_name character varying PRIMARY KEY,
+  staging_table_name character varying,
+  table_definition character varying,
+  last_event bigint
+)
+"""
+
+
+def _save_checkpoint(schema, table_name, staging_table_name, table_definition, last_event):
+    """
+    Returns a SQL statement to save the checkpoint of the dump of the given table
+
+    :param schema:
+    :param table_name:
+    :param staging_table_name: the table that the dump is loaded into
+    :param table_definition: identifies the structure of the staging table
+    :param last_event: the last event of the entities that have been loaded into the staging table
+    :return:
+    """
+    checkpoints = _quoted_tablename(schema, CHECKPOINTS_TABLE)
+    values = ", ".join([to_sql_string_value(table_name), to_sql_string_value(staging_table_name),
+                        to_sql_string_value(table_definition), str(int(last_event))])
+    return f"""
+INSERT INTO {checkpoints} (table_name, staging_table_name, table_definition, last_event)
+VALUES ({values})
+ON CONFLICT (table_name) DO UPDATE SET
+  staging_table_name = EXCLUDED.staging_table_name,
+  table_definition = EXCLUDED.table_definition,
+  last_event = EXCLUDED.last_event
+"""
+
+
+def _get_checkpoint(schema, table_name):
+    checkpoints = _quoted_tablename(schema, CHECKPOINTS_TABLE)
+    return f"SELECT staging_table_name, table_definition, last_event FROM {checkpoints} " \
+           f"WHERE table_name = {to_sql_string_value(table_name)}"
+
+
+def _delete_checkpoint(schema, table_name):
+    checkpoints = _quoted_tablename(schema, CHECKPOINTS_TABLE)
+    return f"DELETE FROM {checkpoints} WHERE table_name = {to_sql_string_value(table_name)}"
 
 
 def get_count(schema, collection_name):
@@ -1,9 +1,18 @@
+import hashlib
+import itertools
+import math
+import queue
+import threading
 import traceback
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import copy_current_request_context, has_request_context
 from gobcore.typesystem import fully_qualified_type_name, GOB
 from typing import Tuple, List
 
 from gobapi.auth.auth_query import Authority
+from gobapi.config import DUMP_BINARY_COPY, DUMP_TABLE_SWAP, DUMP_RELATION_THREADS, DUMP_INDEX_CONNECTIONS
 from gobapi.storage import dump_entities
 
 from gobcore.model import GOBModel
@@ -11,22 +20,58 @@ from gobcore.model.metadata import FIELD
 from gobcore.model.relations import get_relation_name
 from gobcore.datastore.factory import DatastoreFactory
 
-from gobapi.dump.config import SKIP_RELATIONS, UNIQUE_ID, UNIQUE_REL_ID
+from gobapi.dump.config import SKIP_RELATIONS, UNIQUE_ID, UNIQUE_REL_ID, SYNC_ID, CHECKPOINTS_TABLE
 from gobapi.dump.sql import _create_schema, _create_table, _insert_into_table, _delete_table
 from gobapi.dump.sql import _create_indexes, _create_index, get_max_eventid, get_count as get_dst_count
-from gobapi.dump.csv import csv_entities
+from gobapi.dump.sql import _analyze_table, _get_dependent_views, _lock_table, _swap_table
+from gobapi.dump.sql import _create_sync_ids_table, _copy_into_sync_ids_table, _analyze_sync_ids_table, \
+    _delete_sync_ids_table, not_in_sync_ids, delete_staged_entities
+from gobapi.dump.sql import _create_checkpoints_table, _save_checkpoint, _get_checkpoint, _delete_checkpoint
+from gobapi.dump.csv import csv_entities, _csv_value
 from gobapi.dump.csv_stream import CSVStream
-from gobapi.storage import get_entity_refs_after, get_table_and_model, get_max_eventid as get_src_max_eventid, \
+from gobapi.dump import binary
+from gobapi.storage import stream_entity_refs_after, get_table_and_model, get_max_eventid as get_src_max_eventid, \
     get_count as get_src_count
 
-from gobapi.dump.sql import to_sql_string_value
-
 STREAM_PER = 10000              # Stream per STREAM_PER lines
 COMMIT_PER = 10 * STREAM_PER    # Commit once per COMMIT_PER lines
 BUFFER_PER = 50000              # Copy read buffer size
 
 MAX_SYNC_ITEMS = 500000         # Maximum number of items to sync before switching to full dump
 
+OUTPUT_QUEUE_SIZE = 1000        # Maximum number of output lines of concurrent dumps that wait to be returned
+OUTPUT_PUT_TIMEOUT = 1          # Number of seconds between checks for a stop while the output queue is full
+
+
+class _LastEvents:
+    """Keeps track of the last events of the entities that are read from an iterator
+
+    The entities are read ahead of the rows that have been written to the destination.
+    The last event of the n-th entity is kept until it is requested, the last events before it are forgotten.
+    """
+
+    def __init__(self, entities):
+        self.entities = entities
+        self.last_events = deque()
+        self.forgotten = 0
+
+    def __iter__(self):
+        for entity in self.entities:
+            self.last_events.append(getattr(entity, FIELD.LAST_EVENT))
+            yield entity
+
+    def get(self, n):
+        """
+        Returns the last event of the n-th entity that has been read
+
+        :param n:
+        :return: the last event or None if the n-th entity has not been read
+        """
+        while self.last_events and self.forgotten < n - 1:
+            self.last_events.popleft()
+            self.forgotten += 1
+        return self.last_events[0] if self.last_events and self.forgotten == n - 1 else None
+
 
 class DbDumper:
     """Dumps given collection and possibly relations owned by the collection to the database passed in config.
@@ -50,9 +95,18 @@ class DbDumper:
         self.collection_name = collection_name
         self.tmp_collection_name = f"tmp_{collection_name}"
 
-        self.datastore = DatastoreFactory.get_datastore(config['db'])
+        self.db_config = config['db']
+        self.datastore = DatastoreFactory.get_datastore(self.db_config)
         self.datastore.connect()
 
+        # Binary COPY and table swaps are PostgreSQL specific
+        is_postgres = config['db'].get('drivername', '').startswith('postgres')
+        self.binary_copy = DUMP_BINARY_COPY and is_postgres
+        self.table_swap = DUMP_TABLE_SWAP and is_postgres
+
+        # The checkpoints table is created when the first checkpoint is saved
+        self.has_checkpoints_table = False
+
         self.schema = self._get_dst_schema(config, catalog_name, collection_name)
 
         _, self.model = get_table_and_model(catalog_name, collection_name)
@@ -112,23 +166,43 @@ class DbDumper:
         """
         return self._get_columns(table_a) == self._get_columns(table_b)
 
-    def _copy_table_into(self, src_table: str, dst_table: str, ids_to_skip) -> None:
+    def _stage_sync_ids(self, ids, max_count: int = None) -> int:
+        """Stages the given ids in a temporary table on the destination
+
+        The ids are streamed into the table, at most max_count ids are read from the given iterator
+
+        :param ids: iterator of ids
+        :param max_count: the maximum number of ids to stage, default all ids
+        :return: the number of staged ids
+        """
+        self._execute(_create_sync_ids_table())
+
+        lines = itertools.chain([f"{SYNC_ID}\n"], (f"{_csv_value(id)}\n" for id in ids))
+        stream = CSVStream(lines, math.inf if max_count is None else max_count)
+        with self.datastore.connection.cursor() as cursor:
+            stream.reset_count()
+            cursor.copy_expert(sql=_copy_into_sync_ids_table(), file=stream, size=BUFFER_PER)
+
+        self._execute(_analyze_sync_ids_table())
+        return stream.total_count
+
+    def _copy_table_into(self, src_table: str, dst_table: str, skip_sync_ids: bool = False) -> None:
         """Copies rows of src_table into dst_table
 
+        When skip_sync_ids is set, the rows with an id in the staged sync ids table are excluded by an anti-join,
+        see _stage_sync_ids. The staged ids are removed afterwards.
         """
         where = ""
-        if ids_to_skip:
+        if skip_sync_ids:
             # Only copy the rows that have not changed
-            if self.catalog_name == "rel":
-                unique_id = UNIQUE_REL_ID
-            else:
-                unique_id = UNIQUE_ID
-            ids_to_skip_sql = ",".join([to_sql_string_value(id) for id in ids_to_skip])
-            where = f"WHERE {unique_id} NOT IN ({ids_to_skip_sql})"
+            where = f"WHERE {not_in_sync_ids(self._get_unique_id())}"
 
         query = f'INSERT INTO "{self.schema}"."{dst_table}" SELECT * FROM "{self.schema}"."{src_table}" {where}'
         self._execute(query)
 
+        if skip_sync_ids:
+            self._execute(_delete_sync_ids_table())
+
     def _get_max_eventid(self, table_name: str):
         """Get max eventid from table_name
 
@@ -201,24 +275,229 @@ class DbDumper:
 
     def _delete_tmp_table(self):
         self._delete_table(self.tmp_collection_name)
+        # A dump can only be resumed from its tmp table
+        self._delete_checkpoint()
+
+    def _get_unique_id(self):
+        return UNIQUE_REL_ID if self.catalog_name == "rel" else UNIQUE_ID
+
+    def _get_table_definition(self):
+        """Returns a hash of the definition of the tmp table, to tell if a dump can be resumed in an existing tmp table
+        """
+        create_table = _create_table(self.schema, self.catalog_name, self.collection_name, self.model,
+                                     tablename=self.tmp_collection_name)
+        return hashlib.md5(create_table.encode()).hexdigest()
+
+    def _save_checkpoint(self, cursor, last_event):
+        """Saves the checkpoint for the rows that have been loaded into the tmp table
+
+        The checkpoint is saved with the given cursor, so it is committed together with the rows.
+        The checkpoints table is created when it is first used.
+
+        :param cursor:
+        :param last_event: the last event of the last loaded row
+        :return:
+        """
+        if last_event is not None:
+            if not self.has_checkpoints_table:
+                cursor.execute(_create_checkpoints_table(self.schema))
+                self.has_checkpoints_table = True
+            cursor.execute(_save_checkpoint(self.schema, self.collection_name, self.tmp_collection_name,
+                                            self._get_table_definition(), last_event))
+
+    def create_checkpoints_table(self):
+        """Creates the checkpoints table if it does not exist yet
+
+        :return:
+        """
+        self._execute(_create_checkpoints_table(self.schema))
+        self.has_checkpoints_table = True
+
+    def _delete_checkpoint(self):
+        if self._table_exists(CHECKPOINTS_TABLE):
+            self._execute(_delete_checkpoint(self.schema, self.collection_name))
+
+    def _get_resumable_checkpoint(self):
+        """Returns the last event of the checkpoint of an earlier dump that can be resumed
+
+        A dump can be resumed when its tmp table still exists and has the same definition
+
+        :return: the last event of the checkpoint, or None if there is no dump to resume
+        """
+        if not self._table_exists(CHECKPOINTS_TABLE):
+            return None
+
+        checkpoint = next(self._query(_get_checkpoint(self.schema, self.collection_name)), None)
+        if checkpoint is None:
+            return None
+
+        staging_table_name, table_definition, last_event = checkpoint
+        if staging_table_name == self.tmp_collection_name and \
+                table_definition == self._get_table_definition() and \
+                self._table_exists(staging_table_name):
+            return last_event
+
+    def _resume_dump(self):
+        """
+        Resumes an earlier dump that failed while loading the tmp table
+
+        The tmp table contains the entities up to the last event of the checkpoint.
+        The entities with a last event on or after the checkpoint are removed from the tmp table and dumped again.
+        This includes any entity that has been changed since the checkpoint.
+        The ids of these entities are staged without limit, as they include all entities that have not been loaded.
+
+        :return: (entities, model) to complete the tmp table, or None if there is no dump to resume
+        """
+        last_event = self._get_resumable_checkpoint()
+        if last_event is None:
+            yield "No dump to resume\n"
+            return None
+
+        after_eventid = last_event - 1
+        source_ids = stream_entity_refs_after(self.catalog_name, self.collection_name, after_eventid)
+        try:
+            nr_items = self._stage_sync_ids(source_ids)
+        finally:
+            # Release the server side cursor on failure
+            source_ids.close()
+
+        yield f"Resume dump from event {last_event}, dump {nr_items} items\n"
+        self._execute(delete_staged_entities(self.schema, self.tmp_collection_name, self._get_unique_id()))
+        self._execute(_delete_sync_ids_table())
+
+        return self._dump_entities(filter=self._filter_last_events_lambda(after_eventid))
+
+    def _build_index(self, table_name, index):
+        """
+        Build the given index on its own destination connection
+
+        :param table_name:
+        :param index:
+        :return:
+        """
+        datastore = DatastoreFactory.get_datastore(self.db_config)
+        datastore.connect()
+        try:
+            datastore.execute(_create_index(self.schema, table_name, **index))
+        finally:
+            datastore.disconnect()
+
+    def _create_indexes(self, model, table_name=None):
+        """
+        Create default indexes for the given collection, by default on the collection table
+
+        The indexes are built concurrently over at most DUMP_INDEX_CONNECTIONS destination connections.
+        Spatial indexes take the longest to build, they are started first.
+
+        :param model:
+        :param table_name:
+        :return:
+        """
+        table_name = table_name or self.collection_name
+        indexes = sorted(_create_indexes(model), key=lambda index: index.get('method') != "gist")
+        yield f"Create {len(indexes)} indexes\n"
+
+        with ThreadPoolExecutor(max_workers=max(DUMP_INDEX_CONNECTIONS, 1)) as executor:
+            futures = {executor.submit(self._build_index, table_name, index): index for index in indexes}
+            for future in as_completed(futures):
+                future.result()
+                yield f"Created index on {futures[future]['field']}\n"
+
+    def _analyze(self, table_name=None):
+        table_name = table_name or self.collection_name
+        yield f"Analyze {table_name}\n"
+        self._execute(_analyze_table(self.schema, table_name))
+
+    def _get_swappable_views(self, cursor):
+        """
+        Returns the views that depend on the collection table, directly or through other views
+
+        A materialized view would be recomputed when it is recreated, a table with materialized views is not swapped
+
+        :param cursor:
+        :return: list of views, see _swap_table, or None if the collection table cannot be swapped
+        """
+        cursor.execute(_get_dependent_views(self.schema, self.collection_name))
+        views = cursor.fetchall()
+        if any(relkind != 'v' for relkind, *_ in views):
+            return None
+        return [view[1:] for view in views]
+
+    def _swap_tmp_table(self, model):
+        """
+        Replace the collection table by the loaded tmp table in a single transaction
 
-    def _create_indexes(self, model):
+        The views that depend on the collection table, like the utility view, are recreated on the new table.
+        The collection table is locked before its views are read, so that no view can be added until the swap
+        is committed.
+
+        :param model:
+        :return: True if the collection table has been swapped
+        """
+        connection = self.datastore.connection
+        with connection.cursor() as cursor:
+            cursor.execute(_lock_table(self.schema, self.collection_name))
+            views = self._get_swappable_views(cursor)
+            if views is None:
+                connection.rollback()
+                yield f"Materialized views depend on {self.collection_name}, copy instead of swap\n"
+                return False
+
+            yield f"Swap {self.tmp_collection_name} in to {self.collection_name}\n"
+            # The primary key index is renamed together with the default indexes
+            index_names = [index['field'] for index in _create_indexes(model)] + ["pkey"]
+            cursor.execute(_swap_table(self.schema, self.tmp_collection_name, self.collection_name, index_names,
+                                       views))
+        connection.commit()
+        return True
+
+    def _replace_table(self, model):
+        """
+        Replace the contents of the collection table by the loaded tmp table
+
+        With table swaps the tmp table is indexed and renamed, otherwise the tmp table is copied into the collection
+        table. Every row is written only once by a table swap and consumers never see an empty table.
+        Without table swaps the indexes of the collection table are kept, only missing indexes are created.
+
+        :param model:
+        :return:
         """
-        Create default indexes for the given collection
+        if self.table_swap:
+            yield from self._create_indexes(model, self.tmp_collection_name)
+            yield from self._analyze(self.tmp_collection_name)
+            if (yield from self._swap_tmp_table(model)):
+                self._delete_checkpoint()
+                return
 
+        yield from self._copy_tmp_table()
+        yield from self._create_indexes(model)
+        yield from self._analyze()
+
+    def _get_copy_stream(self, entities, model, suppress_columns):
+        """Returns the stream to copy the given entities to the tmp table and the corresponding COPY statement
+
+        The entities are copied in binary format if the destination and the model support it, otherwise as CSV
+
+        :param entities:
         :param model:
+        :param suppress_columns:
         :return:
         """
-        for index in _create_indexes(model):
-            yield f"Create index on {index['field']}\n"
-            self._execute(_create_index(self.schema, self.collection_name, **index))
+        table = f"{self.schema}.{self.tmp_collection_name}"
+        if self.binary_copy and binary.is_supported(model, suppress_columns):
+            stream = binary.BinaryStream(binary.binary_entities(entities, model, suppress_columns), STREAM_PER)
+            return stream, f"COPY {table} FROM STDIN WITH (FORMAT binary);"
+        else:
+            stream = CSVStream(csv_entities(entities, model, suppress_columns), STREAM_PER)
+            return stream, f"COPY {table} FROM STDIN DELIMITER ';' CSV HEADER;"
 
     def _dump_entities_to_table(self, entities, model):
         authority = Authority(self.catalog_name, self.collection_name)
         suppress_columns = authority.get_suppressed_columns()
 
         connection = self.datastore.connection
-        stream = CSVStream(csv_entities(entities, model, suppress_columns), STREAM_PER)
+        last_events = _LastEvents(entities)
+        stream, copy = self._get_copy_stream(iter(last_events), model, suppress_columns)
 
         with connection.cursor() as cursor:
             yield "Export data"
@@ -226,12 +505,14 @@ class DbDumper:
             while stream.has_items():
                 stream.reset_count()
                 cursor.copy_expert(
-                    sql=f"COPY {self.schema}.{self.tmp_collection_name} FROM STDIN DELIMITER ';' CSV HEADER;",
+                    sql=copy,
                     file=stream,
                     size=BUFFER_PER
                 )
 
                 if stream.total_count >= commit:
+                    # Commit the rows together with the checkpoint to resume from
+                    self._save_checkpoint(cursor, last_events.get(stream.total_count))
                     connection.commit()
                     commit += COMMIT_PER
 
@@ -240,25 +521,43 @@ class DbDumper:
                     # Let client know we're still working.
                     yield "."
 
-        yield f"\nExported {stream.total_count} rows\n"
+            yield f"\nExported {stream.total_count} rows\n"
+            self._save_checkpoint(cursor, last_events.get(stream.total_count))
         connection.commit()
 
     def _filter_last_events_lambda(self, max_eventid):
         return lambda table: getattr(table, FIELD.LAST_EVENT) > max_eventid
 
-    def dump_to_db(self, full_dump=False):
+    def dump_to_db(self, full_dump=False, resume=False):
         """Runs dump for this instance. Tries to synchronise based on last event by default. Set full_dump=True to
         replace all existing data and ignore synchronisation based on events.
+        Set resume=True to continue an earlier dump that failed while loading its data, see _resume_dump.
         """
-        yield from self._prepare_destination()
+        result = (yield from self._resume_dump()) if resume else None
+        if result is None:
+            yield from self._prepare_destination()
+            result = yield from self._get_entities(full_dump)
+            if result is None:
+                # Collection is up-to-date
+                return
+
+        entities, model = result
+        yield from self._dump_entities_to_table(entities, model)
+        yield from self._replace_table(model)
+
+    def _get_entities(self, full_dump):
+        """Returns the entities to load into the tmp table for a full or sync dump
 
+        :param full_dump:
+        :return: (entities, model) or None if the collection is up-to-date
+        """
         if not full_dump:
             # Try sync dump
             dst_max_eventid = yield from self._get_dst_max_eventid()
             if dst_max_eventid:
-                # Get all source ids that have been updated or added lately
-                source_ids_to_update = get_entity_refs_after(self.catalog_name, self.collection_name, dst_max_eventid)
-                if source_ids_to_update:
+                # Stage all source ids that have been updated or added lately
+                nr_items_to_sync = self._stage_source_ids_to_update(dst_max_eventid)
+                if nr_items_to_sync:
                     yield "Have earlier dump, sync dump\n"
                 else:
                     count_src = self._count_src()
@@ -267,7 +566,7 @@ class DbDumper:
                     if count_src == count_dst:
                         yield f"Collection is up-to-date, no actions necessary\n"
                         self._delete_tmp_table()
-                        return
+                        return None
                     else:
                         yield "Collection counts don't match. Forcing full dump\n"
                         full_dump = True
@@ -280,11 +579,9 @@ class DbDumper:
             entities, model = yield from self._full_dump()
         else:
             # Sync updated and new entities
-            entities, model = yield from self._sync_dump(dst_max_eventid, source_ids_to_update)
+            entities, model = yield from self._sync_dump(dst_max_eventid, nr_items_to_sync)
 
-        yield from self._dump_entities_to_table(entities, model)
-        yield from self._copy_tmp_table()
-        yield from self._create_indexes(model)
+        return entities, model
 
     def _ref(self, rel_alias: str, with_seqnr: bool):
         """Returns ref expression for a relation with alias :rel_alias: with or without seqnr
@@ -425,26 +722,44 @@ from {self.catalog_name}.{self.collection_name} {main_alias}
         yield "Do full dump\n"
         return self._dump_entities()
 
-    def _sync_dump(self, dst_max_eventid, source_ids_to_update):
+    def _stage_source_ids_to_update(self, dst_max_eventid):
+        """
+        Stage the ids of the source entities that have been updated or added after dst_max_eventid
+
+        The ids are streamed from the source into the staging table on the destination.
+        At most MAX_SYNC_ITEMS + 1 ids are staged, enough to tell that a sync dump is not possible
+
+        :param dst_max_eventid:
+        :return: the number of staged ids
+        """
+        source_ids_to_update = stream_entity_refs_after(self.catalog_name, self.collection_name, dst_max_eventid)
+        try:
+            return self._stage_sync_ids(source_ids_to_update, MAX_SYNC_ITEMS + 1)
+        finally:
+            # Release the server side cursor when not all ids have been read
+            source_ids_to_update.close()
+
+    def _sync_dump(self, dst_max_eventid, nr_items_to_sync):
         """
         Sync data with updated and new source data.
         If too many items need to be synced, fallback to full dump
 
+        The ids of the items to sync have been staged, see _stage_source_ids_to_update
+
         :param dst_max_eventid:
-        :param source_ids_to_update:
+        :param nr_items_to_sync:
         :return:
         """
-        nr_items_to_sync = len(source_ids_to_update)
         if nr_items_to_sync > MAX_SYNC_ITEMS:
-            yield f"Collection is too far behind: {nr_items_to_sync}, do full dump\n"
+            yield f"Collection is too far behind: more than {MAX_SYNC_ITEMS} items, do full dump\n"
             # Add all items
             filter = None
         else:
             # Sync outdated or new items
-            yield f"Collection is behind, sync {len(source_ids_to_update)} items\n"
+            yield f"Collection is behind, sync {nr_items_to_sync} items\n"
 
             # Copy existing data in tmp table and skip all outdated entities
-            self._copy_table_into(self.collection_name, self.tmp_collection_name, source_ids_to_update)
+            self._copy_table_into(self.collection_name, self.tmp_collection_name, skip_sync_ids=True)
 
             # Add new and updated entities
             filter = self._filter_last_events_lambda(dst_max_eventid)
@@ -458,12 +773,136 @@ from {self.catalog_name}.{self.collection_name} {main_alias}
         self.datastore.execute(query)
 
 
+def _dump_relation(catalog_name, collection_name, relation, relation_name, config):
+    """Dumps the relation table relation_name for the given relation of catalog_name, collection_name """
+    yield f"Export {catalog_name} {collection_name} {relation}\n"
+
+    rel_dumper = DbDumper('rel', relation_name, config)
+    yield from rel_dumper.dump_to_db(full_dump=config.get('force_full', False), resume=config.get('resume', False))
+
+
+def _prefixed_lines(results, prefix):
+    """
+    Yields the output of a dump with each line prefixed by prefix
+
+    Results are yielded as they come, so progress dots and partial lines keep the response alive.
+    Only the start of a line is prefixed, lines that already start with prefix are left as they are.
+
+    :param results: output of a dump
+    :param prefix:
+    :return:
+    """
+    at_line_start = True
+    for result in results:
+        parts = []
+        for part in result.splitlines(keepends=True):
+            if at_line_start and part != "\n" and not part.startswith(prefix):
+                part = f"{prefix}{part}"
+            parts.append(part)
+            at_line_start = part.endswith("\n")
+        if parts:
+            yield "".join(parts)
+
+
+def _multiplexed(output, n_dumps):
+    """
+    Yields the output of n_dumps concurrent dumps from the output queue until all dumps have finished
+
+    Each dump ends with None. An exception in a dump is re-raised
+
+    :param output:
+    :param n_dumps:
+    :return:
+    """
+    while n_dumps:
+        item = output.get()
+        if item is None:
+            n_dumps -= 1
+        elif isinstance(item, Exception):
+            raise item
+        else:
+            yield item
+
+
+def _put(output, item, stop):
+    """
+    Puts the given item in the output queue, waits while the queue is full until the item is put or stop is set
+
+    :param output:
+    :param item:
+    :param stop:
+    :return: True if the item has been put in the output queue
+    """
+    while not stop.is_set():
+        try:
+            output.put(item, timeout=OUTPUT_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _run_dump(name, dump, output, stop):
+    """
+    Runs the given dump and puts its output lines, or the exception that ends the dump, in the output queue
+
+    The end of the dump is signalled by None.
+    The dump is ended when stop is set, eg when the output is no longer read
+
+    :param name:
+    :param dump:
+    :param output:
+    :param stop:
+    :return:
+    """
+    try:
+        for line in _prefixed_lines(dump, f"{name}: "):
+            if not _put(output, line, stop):
+                break
+    except Exception as e:
+        _put(output, e, stop)
+    finally:
+        _put(output, None, stop)
+
+
+def _dump_relations_concurrently(dumps):
+    """
+    Runs the given relation dumps in at most DUMP_RELATION_THREADS threads
+
+    The output of the dumps is multiplexed, each line is prefixed by the name of the relation.
+    The output queue holds at most OUTPUT_QUEUE_SIZE lines, a dump waits while its output is not read.
+    The dumps run in a copy of the current request context, so with the same authorization as the request.
+
+    :param dumps: list of (relation name, dump generator)
+    :return:
+    """
+    output = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+    stop = threading.Event()
+
+    run = copy_current_request_context(_run_dump) if has_request_context() else _run_dump
+
+    with ThreadPoolExecutor(max_workers=DUMP_RELATION_THREADS) as executor:
+        futures = [executor.submit(run, name, dump, output, stop) for name, dump in dumps]
+        try:
+            yield from _multiplexed(output, len(futures))
+        finally:
+            # Do not start any waiting dumps and stop the running dumps after a failure
+            # or when the output is no longer read
+            stop.set()
+            for future in futures:
+                future.cancel()
+
+
 def _dump_relations(catalog_name, collection_name, config):
-    """Dumps relations for catalog_name, collection_name """
+    """Dumps relations for catalog_name, collection_name
+
+    Relations are dumped concurrently when DUMP_RELATION_THREADS > 1
+    """
     config['schema'] = catalog_name
 
     _, model = get_table_and_model(catalog_name, collection_name)
 
+    dumps = []
     for relation in [k for k in model['references'].keys()]:
         relation_name = get_relation_name(GOBModel(), catalog_name, collection_name, relation)
 
@@ -472,16 +911,22 @@ def _dump_relations(catalog_name, collection_name, config):
             yield f"Skipping {catalog_name} {collection_name} {relation}\n"
             continue
 
-        yield f"Export {catalog_name} {collection_name} {relation}\n"
+        dumps.append((relation_name, _dump_relation(catalog_name, collection_name, relation, relation_name, config)))
 
-        rel_dumper = DbDumper('rel', relation_name, config)
-        yield from rel_dumper.dump_to_db(full_dump=config.get('force_full', False))
+    if DUMP_RELATION_THREADS > 1 and len(dumps) > 1:
+        # Create the checkpoints table before the dumps start, the dumps would otherwise create it concurrently
+        relation_name, _ = dumps[0]
+        DbDumper('rel', relation_name, config).create_checkpoints_table()
+        yield from _dump_relations_concurrently(dumps)
+    else:
+        for _, dump in dumps:
+            yield from dump
 
 
 def dump_to_db(catalog_name, collection_name, config):
     try:
         dumper = DbDumper(catalog_name, collection_name, config)
-        yield from dumper.dump_to_db(full_dump=config.get('force_full', False))
+        yield from dumper.dump_to_db(full_dump=config.get('force_full', False), resume=config.get('resume', False))
 
         if config.get('include_relations', True):
             yield from _dump_relations(catalog_name, collection_name, config)
@@ -3,7 +3,7 @@ from gobcore.model.metadata import FIELD
 
 from gobapi.graphql_streaming.resolve import Resolver
 from gobapi.response import stream_response
-from gobapi.utils import dict_to_camelcase, streaming_gob_response
+from gobapi.utils import dict_to_camelcase, streaming_gob_response, coalesce_chunks
 
 
 class GraphQLStreamingResponseBuilder:
@@ -208,6 +208,7 @@ class GraphQLStreamingResponseBuilder:
             result[relation] = [v for v in [FIELD.SOURCE_VALUE, FIELD.SOURCE_INFO] if v in selection['fields']]
         return result
 
+    @coalesce_chunks
     @streaming_gob_response
     def __iter__(self):
         """Main method. Use class as iterator.
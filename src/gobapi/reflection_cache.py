@@ -0,0 +1,261 @@
+"""Reflection cache
+
+Reflecting all tables of the GOB database is a long running operation.
+To allow for a fast startup the reflected metadata is cached in a local file.
+
+The cache file is keyed on a fingerprint of the database schema.
+When the schema changes a new cache file is built on startup.
+Only one process builds the cache file, any other process waits for the cache file to be written.
+
+The cache files are unpickled, so only files in a private directory that are owned by the current user are read.
+
+"""
+import hashlib
+import os
+import pickle
+import time
+import warnings
+
+import sqlalchemy
+
+from sqlalchemy import MetaData, exc as sa_exc
+
+from gobapi.config import REFLECTION_CACHE_DIR
+from gobapi.logger import get_logger
+
+logger = get_logger("API")
+
+# Fingerprint of all columns, constraints and indexes in the current schema
+_SCHEMA_FINGERPRINT = """
+SELECT md5(concat_ws('|',
+    (SELECT string_agg(concat_ws(':', table_name, column_name, data_type, is_nullable), ','
+                       ORDER BY table_name, ordinal_position)
+     FROM information_schema.columns
+     WHERE table_schema = current_schema()),
+    (SELECT string_agg(concat_ws(':', tc.table_name, tc.constraint_name, tc.constraint_type,
+                                 kcu.column_name, kcu.ordinal_position), ','
+                       ORDER BY tc.table_name, tc.constraint_name, kcu.ordinal_position)
+     FROM information_schema.table_constraints tc
+     LEFT JOIN information_schema.key_column_usage kcu
+         ON kcu.constraint_schema = tc.constraint_schema
+         AND kcu.constraint_name = tc.constraint_name
+         AND kcu.table_name = tc.table_name
+     WHERE tc.table_schema = current_schema()),
+    (SELECT string_agg(concat_ws(':', tablename, indexname, indexdef), ','
+                       ORDER BY tablename, indexname)
+     FROM pg_indexes
+     WHERE schemaname = current_schema())
+))
+"""
+
+# Max number of seconds to build the cache file, after this time the lock on the cache file is considered stale
+_LOCK_TIMEOUT = 60 * 60
+
+# Number of seconds between checks for a cache file that is being built by another process
+_LOCK_POLL_INTERVAL = 1
+
+
+def get_metadata(engine):
+    """Returns the reflected metadata for the given engine
+
+    If a cache file exists for the current database schema the metadata is read from this file.
+    Otherwise the tables are reflected and the cache file is written.
+    If another process is already building the cache file, wait for it to complete.
+    If the cache directory cannot be used the tables are reflected without using the cache.
+
+    :param engine:
+    :return: metadata, bound to the given engine
+    """
+    filename = _get_filename(_get_fingerprint(engine))
+
+    try:
+        metadata = _load(filename)
+        while metadata is None:
+            metadata = _build(engine, filename) if _lock(filename) else _wait(filename)
+    except OSError as e:
+        logger.warning(f"Reflection cache {filename} could not be used: {str(e)}")
+        metadata = _reflect(engine)
+
+    metadata.bind = engine
+    return metadata
+
+
+def _get_fingerprint(engine):
+    """Returns a fingerprint of the database schema
+
+    Include the SQLAlchemy version as the pickled metadata is specific for the SQLAlchemy version
+
+    :param engine:
+    :return:
+    """
+    schema_fingerprint = engine.execute(_SCHEMA_FINGERPRINT).scalar()
+    return hashlib.md5(f"{sqlalchemy.__version__}:{schema_fingerprint}".encode()).hexdigest()
+
+
+def _get_filename(fingerprint):
+    return os.path.join(REFLECTION_CACHE_DIR, f"gobapi_reflection_{fingerprint}.pickle")
+
+
+def _get_lock_filename(filename):
+    return f"{filename}.lock"
+
+
+def _is_private(filename):
+    """Tells if the given file is owned by the current user and cannot be written by anyone else
+
+    :param filename:
+    :return:
+    """
+    stat = os.stat(filename)
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def _load(filename):
+    """Load the metadata from the given cache file
+
+    :param filename:
+    :return: metadata or None if the cache file does not exist or cannot be read
+    """
+    try:
+        if not _is_private(filename):
+            logger.warning(f"Reflection cache {filename} is not private and is ignored")
+            return None
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Reflection cache {filename} could not be read: {str(e)}")
+        return None
+
+
+def _remove(filename):
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+
+def _is_running(pid):
+    """Tells if a process with the given pid exists
+
+    :param pid:
+    :return:
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but is owned by another user
+        pass
+    return True
+
+
+def _is_stale(lock_filename):
+    """Tells if the given lock file is stale
+
+    A lock is stale when the process that holds the lock has gone or when the lock is held for too long
+
+    :param lock_filename:
+    :return: False if the lock file does not exist
+    """
+    try:
+        age = time.time() - os.path.getmtime(lock_filename)
+        with open(lock_filename) as f:
+            pid = f.read()
+    except FileNotFoundError:
+        return False
+    return age > _LOCK_TIMEOUT or (pid.isdigit() and not _is_running(int(pid)))
+
+
+def _lock(filename):
+    """Lock the given cache file to build it
+
+    The lock file is created exclusively so that only one process builds the cache file.
+    The lock file contains the pid of the process that holds the lock.
+    A stale lock is removed.
+
+    :param filename:
+    :return: True if the lock is acquired
+    """
+    lock_filename = _get_lock_filename(filename)
+    if _is_stale(lock_filename):
+        logger.warning(f"Reflection cache lock {lock_filename} is stale and is removed")
+        _remove(lock_filename)
+
+    os.makedirs(REFLECTION_CACHE_DIR, mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(lock_filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        return False
+
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def _wait(filename):
+    """Wait for another process to build the given cache file
+
+    :param filename:
+    :return: metadata or None if the other process has not written the cache file
+    """
+    logger.info(f"Waiting for reflection cache {filename}")
+    lock_filename = _get_lock_filename(filename)
+    while os.path.exists(lock_filename) and not _is_stale(lock_filename):
+        time.sleep(_LOCK_POLL_INTERVAL)
+    return _load(filename)
+
+
+def _write(metadata, filename):
+    """Write the metadata to the given cache file
+
+    The metadata is written to a temporary file that is renamed when complete.
+
+    :param metadata:
+    :param filename:
+    :return:
+    """
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    try:
+        fd = os.open(tmp_filename, os.O_CREAT | os.O_TRUNC | os.O_WRONLY, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(metadata, f)
+        os.rename(tmp_filename, filename)
+        logger.info(f"Reflection cache {filename} written")
+    except Exception as e:
+        logger.error(f"Reflection cache {filename} could not be written: {str(e)}")
+        _remove(tmp_filename)
+
+
+def _build(engine, filename):
+    """Reflect all tables and write the result to the given cache file
+
+    The caller holds the lock on the cache file, the lock is released when done.
+
+    :param engine:
+    :param filename:
+    :return: metadata
+    """
+    logger.info(f"Reflection cache outdated, building {filename}")
+    try:
+        metadata = _reflect(engine)
+        _write(metadata, filename)
+        return metadata
+    finally:
+        _remove(_get_lock_filename(filename))
+
+
+def _reflect(engine):
+    """Reflect all tables
+
+    :param engine:
+    :return: metadata
+    """
+    with warnings.catch_warnings():
+        # Ignore warnings for unsupported reflection for expression-based indexes
+        warnings.simplefilter("ignore", category=sa_exc.SAWarning)
+        metadata = MetaData()
+        metadata.reflect(engine)     # Long running statement !
+    return metadata
@@ -7,17 +7,24 @@ hal_response is a method that converts an API response to HAL JSON
 
 Paged output contains links to any next or previous page
 get_page_ref contains logic to format a page link
+get_cursor_ref contains logic to format a link to the next page for keyset (cursor) pagination
 
 When a requested item can not be found, a 404 not found is returned
 The not_found method provides for logic to generate 404 responses
 
+Responses can be validated by a (weak) ETag, see get_etag
+When the data has not been modified a 304 not modified is returned
+
 """
+import base64
+import hashlib
 import json
 import urllib
 
 from flask import request
+from gobcore.secure.config import REQUEST_ROLES
 from gobapi.json import APIGobTypeJSONEncoder
-from gobapi.utils import dict_to_camelcase, streaming_gob_response
+from gobapi.utils import dict_to_camelcase, streaming_gob_response, coalesce_chunks
 
 
 def _error_response(error, msg):
@@ -63,6 +70,17 @@ def stream_response(data):
     return json.dumps(response, cls=APIGobTypeJSONEncoder)
 
 
+def bad_request(msg):
+    """Bad request
+
+    Provides for a standard bad request response
+
+    :param msg: the message that describes what is wrong with the request
+    :return:
+    """
+    return _error_response(400, msg)
+
+
 def not_found(msg):
     """Not found
 
@@ -74,6 +92,58 @@ def not_found(msg):
     return _error_response(404, msg)
 
 
+def get_etag(version):
+    """ETag
+
+    Returns the ETag for the response to the current request, given the version of the requested data.
+    The ETag changes whenever the data, the request path and arguments or the roles of the user change.
+
+    :param version: any json serializable value that changes whenever the requested data changes
+    :return:
+    """
+    roles = sorted(role for role in request.headers.get(REQUEST_ROLES, "").split(",") if role)
+    args = sorted(request.args.items())
+    key = json.dumps([version, request.path, args, roles], default=str)
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def is_not_modified(etag):
+    """Tells if the client already has the response for the given ETag (If-None-Match)
+
+    :param etag:
+    :return:
+    """
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag):
+    """Not modified
+
+    Provides for a standard not modified response
+
+    :param etag:
+    :return:
+    """
+    return '', 304, {'ETag': f'W/"{etag}"'}
+
+
+def add_etag(response, etag):
+    """Add the ETag to a successful response
+
+    The ETag is weak because equal data may be serialized differently, e.g. when the response is compressed
+
+    :param response: either a (body, status, headers) tuple or a Response object
+    :param etag:
+    :return:
+    """
+    if isinstance(response, tuple):
+        body, status, headers = response
+        return (body, status, {**headers, 'ETag': f'W/"{etag}"'}) if status == 200 else response
+    elif response.status_code == 200:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 def get_page_ref(page, num_pages):
     """Page reference
 
@@ -91,6 +161,53 @@ def get_page_ref(page, num_pages):
         return f'{request.path}?{urllib.parse.urlencode(args)}'
 
 
+def get_cursor_ref(cursor):
+    """Cursor reference
+
+    Returns a reference link to the page that starts after the given cursor.
+    Any page argument is replaced by the after argument.
+    If no cursor is given (no next page) None is returned
+
+    :param cursor: opaque cursor as returned by encode_cursor
+    :return:
+    """
+    if cursor is not None:
+        args = request.args.copy()
+        args.pop('page', None)
+        args['after'] = cursor
+        return f'{request.path}?{urllib.parse.urlencode(args)}'
+
+
+def encode_cursor(gobid):
+    """Encode cursor
+
+    Returns an opaque cursor for the given gobid, None if no gobid is given
+
+    :param gobid:
+    :return:
+    """
+    if gobid is not None:
+        return base64.urlsafe_b64encode(str(gobid).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode cursor
+
+    Returns the gobid for the given opaque cursor. An empty cursor denotes the start of the collection.
+    A ValueError is raised if the cursor is invalid
+
+    :param cursor: opaque cursor as returned by encode_cursor
+    :return: gobid or None if the cursor is empty
+    """
+    if not cursor:
+        return None
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+@coalesce_chunks
 @streaming_gob_response
 def stream_entities(entities, convert):
     yield("[")
@@ -101,6 +218,7 @@ def stream_entities(entities, convert):
     yield("]\n")
 
 
+@coalesce_chunks
 @streaming_gob_response
 def ndjson_entities(entities, convert):
     for entity in entities:
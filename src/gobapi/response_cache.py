@@ -0,0 +1,128 @@
+"""Response cache
+
+Caches the responses of catalog collection endpoints in memory.
+
+Responses are cached per collection and ETag, see gobapi.response.get_etag.
+The ETag is derived from the path, the request arguments, the roles of the user and the version of the collection.
+So public and secure responses and responses for different role sets are cached separately.
+
+When the version of a collection changes all cached responses for the collection are removed.
+The total size of the cached responses is limited to RESPONSE_CACHE_SIZE bytes,
+the least recently used responses are removed first.
+
+Only complete (body, status, headers) responses are cached, streaming responses are not.
+
+"""
+import threading
+
+from collections import OrderedDict
+
+from gobapi.config import RESPONSE_CACHE_SIZE
+
+_lock = threading.Lock()
+
+# Cached responses per (catalog, collection, etag) => (response, size), least recently used first
+_responses = OrderedDict()
+
+# Cached version and keys per (catalog, collection) => (version, set of keys)
+_collections = {}
+
+_size = 0
+
+
+def get(catalog, collection, version, etag):
+    """Returns the cached response for the given collection, version and etag
+
+    If the version of the collection has changed, all cached responses for the collection are removed
+
+    :param catalog:
+    :param collection:
+    :param version: the current version of the collection, see storage.get_version
+    :param etag:
+    :return: the cached response or None if the response is not cached
+    """
+    with _lock:
+        cached_version, _ = _collections.get((catalog, collection), (version, None))
+        if cached_version != version:
+            _invalidate(catalog, collection)
+        _collections.setdefault((catalog, collection), (version, set()))
+
+        key = (catalog, collection, etag)
+        if key in _responses:
+            _responses.move_to_end(key)
+            response, _ = _responses[key]
+            return response
+
+
+def put(catalog, collection, etag, response):
+    """Cache the response for the given collection and etag
+
+    Only successful (body, status, headers) responses that fit in the cache are cached.
+    The least recently used responses are removed to make room for the response.
+
+    :param catalog:
+    :param collection:
+    :param etag:
+    :param response:
+    :return:
+    """
+    global _size
+
+    if not (isinstance(response, tuple) and response[1] == 200):
+        return
+
+    size = _get_size(response[0])
+    if size > RESPONSE_CACHE_SIZE:
+        return
+
+    with _lock:
+        if (catalog, collection) not in _collections:
+            # The collection has been invalidated in the meantime
+            return
+
+        key = (catalog, collection, etag)
+        _remove(key)
+        while _responses and _size + size > RESPONSE_CACHE_SIZE:
+            _remove(next(iter(_responses)))
+
+        _responses[key] = (response, size)
+        _collections[(catalog, collection)][1].add(key)
+        _size += size
+
+
+def _get_size(body):
+    """Returns the size in bytes of the given response body
+
+    :param body: str or bytes
+    :return:
+    """
+    return len(body.encode() if isinstance(body, str) else body)
+
+
+def clear():
+    """Remove all cached responses
+
+    :return:
+    """
+    global _size
+
+    with _lock:
+        _responses.clear()
+        _collections.clear()
+        _size = 0
+
+
+def _invalidate(catalog, collection):
+    _, keys = _collections.pop((catalog, collection), (None, set()))
+    for key in list(keys):
+        _remove(key)
+
+
+def _remove(key):
+    global _size
+
+    if key in _responses:
+        _, size = _responses.pop(key)
+        _size -= size
+        catalog, collection, _ = key
+        _collections.get((catalog, collection), (None, set()))[1].discard(key)
@@ -7,14 +7,13 @@ By using this module the API does not need to have any knowledge about the under
 """
 import datetime
 import re
-import warnings
 
-from typing import List
+from typing import Iterator
 from collections import defaultdict
 
-from sqlalchemy import create_engine, Table, MetaData, func, and_, or_, exc as sa_exc
+from sqlalchemy import create_engine, Table, func, and_, or_
 from sqlalchemy.engine.url import URL
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker, load_only
 from sqlalchemy.ext.automap import automap_base
 from sqlalchemy.sql import label, functions
 
@@ -24,17 +23,31 @@ from gobcore.model.sa.gob import Base, models
 from gobcore.typesystem import get_gob_type_from_sql_type, get_gob_type_from_info
 from gobcore.model.metadata import PUBLIC_META_FIELDS, PRIVATE_META_FIELDS, FIXED_COLUMNS, FIELD
 
-from gobapi.config import GOB_DB, current_api_base_path
+from gobapi.config import GOB_DB, GOB_DB_POOL, STREAM_FETCH_SIZE, current_api_base_path
 from gobapi.session import set_session, get_session
 from gobapi.auth.auth_query import AuthorizedQuery, SUPPRESSED_COLUMNS, Authority
 from gobapi.constants import API_FIELD
 
+import gobapi.db_pool as db_pool
 import gobapi.profiled_query as profiled_query
+import gobapi.reflection_cache as reflection_cache
 
 session = None
 _Base = None
 metadata = None
 
+# Total count modes for paged entities
+COUNT_EXACT = 'true'            # Exact count, cached until the collection changes
+COUNT_ESTIMATE = 'estimate'     # Count as estimated by the query planner
+COUNT_NONE = 'false'            # Skip the count
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+# Exact counts per (catalog, collection, roles) => (max eventid, count)
+_count_cache = {}
+
+# Entity conversion plans per (catalog, collection, meta, private attributes, base path)
+_convert_plans = {}
+
 
 def connect():
     """Module initialisation
@@ -47,23 +60,21 @@ def connect():
     """
     global session, _Base, metadata
 
-    engine = create_engine(URL(**GOB_DB))
+    engine = create_engine(URL(**GOB_DB), **GOB_DB_POOL)
+    db_pool.activate(engine)
     session = scoped_session(sessionmaker(autocommit=True,
                                           autoflush=False,
                                           bind=engine,
                                           query_cls=AuthorizedQuery))
 
-    with warnings.catch_warnings():
-        # Ignore warnings for unsupported reflection for expression-based indexes
-        warnings.simplefilter("ignore", category=sa_exc.SAWarning)
-        _Base = automap_base()
-        _Base.prepare(engine, reflect=True)     # Long running statement !
+    # Reflection of the database is cached, see reflection_cache
+    metadata = reflection_cache.get_metadata(engine)
+    _Base = automap_base(metadata=metadata)
+    _Base.prepare()
 
     Base.metadata.bind = engine  # Bind engine to metadata of the base class
     Base.query = session.query_property()  # Used by graphql to execute queries
 
-    metadata = MetaData(engine)
-
     set_session(session)
     profiled_query.activate()
 
@@ -73,6 +84,10 @@ def exec_statement(statement):
     return engine.execute(statement)
 
 
+def get_pool_status():
+    return db_pool.get_status(session.get_bind())
+
+
 def _get_table(table_names, table_name):
     """
     Return the name of the table as it exists in the database.
@@ -105,16 +120,17 @@ def get_table_and_model(catalog_name, collection_name, view=None):
         return models[f'{catalog_name}_{collection_name}'], GOBModel().get_collection(catalog_name, collection_name)
 
 
-def _create_reference_link(reference, catalog, collection):
+def _create_reference_link(reference, catalog, collection, base_path=None):
     identificatie = reference.get(FIELD.REFERENCE_ID)
     if identificatie:
-        return {'_links': {'self': {'href': f'{current_api_base_path()}/{catalog}/{collection}/{identificatie}/'}}}
+        base_path = base_path or current_api_base_path()
+        return {'_links': {'self': {'href': f'{base_path}/{catalog}/{collection}/{identificatie}/'}}}
     else:
         return {}
 
 
-def _format_reference(reference, catalog, collection, spec):
-    link = _create_reference_link(reference, catalog, collection)
+def _format_reference(reference, catalog, collection, spec, base_path=None):
+    link = _create_reference_link(reference, catalog, collection, base_path)
 
     if spec.get('secure', {}).get(FIELD.SOURCE_VALUE):
         # Original bronwaarde was secured, decrypt if possible
@@ -130,12 +146,6 @@ def _format_reference(reference, catalog, collection, spec):
     }
 
 
-def _create_external_reference_link(entity, field, entity_catalog, entity_collection):
-    identificatie = getattr(entity, FIELD.ID)
-    field_path = field.replace('_', '-')
-    return {'href': f'{current_api_base_path()}/{entity_catalog}/{entity_collection}/{identificatie}/{field_path}/'}
-
-
 def _create_reference_view(entity, field, spec):
     # Get the dict or array of dicts from a (Many)Reference field
     embedded = _to_gob_value(entity, field, spec).to_db
@@ -152,28 +162,29 @@ def _create_reference_view(entity, field, spec):
     return embedded
 
 
-def _create_reference(entity, field, spec, entity_catalog=None, entity_collection=None):
-    """Create an embedded reference
+def _get_reference_formatter(spec, base_path=None):
+    """Get the function that creates an embedded reference for the given reference specification
 
-    :param entity: The entity
-    :param field: The field a reference is being created for
     :param spec: The field specification
-    :param catalog: The catalog of the entity
-    :param collection: The collection of the entity
+    :param base_path: The base path of the reference links, defaults to the base path of the current request
     :return:
     """
-    if spec['ref'] is not None:
-        catalog, collection = spec['ref'].split(':')
+    if spec['ref'] is None:
+        return lambda references: {}
 
-        references = getattr(entity, field) or []
+    catalog, collection = spec['ref'].split(':')
+
+    def format_references(references):
+        references = references or []
 
         if isinstance(references, dict):
             references = [references]
 
         # reference is a dict of the form {'bronwaarde': X, 'id': Y}
-        return [_format_reference(reference, catalog, collection, spec) for reference in references]
+        return [_format_reference(reference, catalog, collection, spec, base_path=base_path)
+                for reference in references]
 
-    return {}
+    return format_references
 
 
 def _to_gob_value(entity, field, spec, resolve_secure=False):
@@ -241,67 +252,173 @@ def _add_relation_dates_to_manyreference(entity_reference, relation_dates):
     return entity_reference
 
 
-def _flatten_join_result(result):
-    entity = result[0]
+def _get_join_reference_names(result):
+    """Returns the position and name of the references in a join result
 
-    for key, value in result._asdict().items():
-        if isinstance(value, Base):
-            # First item is Base object
-            continue
-        else:
-            # Other items are of the form { 'ref:ligt_in_wijk': [{'bronwaarde': X, 'id': Y}] }
-            _, reference = key.split(':')
+    The first item is the Base object, the other items are of the form
+    { 'ref:ligt_in_wijk': [{'bronwaarde': X, 'id': Y}] }
 
-            setattr(entity, reference, value)
+    :param result:
+    :return: list of (index, reference name)
+    """
+    return [(index, key.split(':')[1]) for index, key in enumerate(result._asdict().keys()) if index > 0]
 
+
+def _flatten_join_result(result, reference_names):
+    """Sets the reference values of a join result on the entity of the join result
+
+    :param result:
+    :param reference_names: the (index, reference name) of the references as returned by _get_join_reference_names.
+                            All results of a query have the same layout, the layout is analysed only once
+    :return:
+    """
+    entity = result[0]
+    for index, reference in reference_names:
+        setattr(entity, reference, result[index])
     return entity
 
 
-def _get_convert_for_model(catalog, collection, model, meta=None, private_attributes=False):
+def _get_convert_plan(catalog, collection, model, meta=None, private_attributes=False, fields=None):
+    """Get the plan to convert entities of a GOBModel collection
+
+    Selecting the attributes and references, resolving the GOB types and constructing the links is done once
+    for every catalog, collection, meta, private_attributes and base path combination.
+    The plan is cached and reused for all subsequent requests.
+    The requested fields are selected from the cached plan, fields are not part of the cache key
+    so that the number of cached plans is limited to the number of collections.
+
+    :param catalog:
+    :param collection:
+    :param model:
+    :param meta:
+    :param private_attributes:
+    :param fields: optional list of fields to convert, defaults to all fields
+    :return:
+    """
+    base_path = current_api_base_path()
+    key = (catalog, collection, tuple(meta or {}), private_attributes, base_path)
+    if key not in _convert_plans:
+        _convert_plans[key] = _create_convert_plan(catalog, collection, model, meta, private_attributes, base_path)
+    return _select_plan_fields(_convert_plans[key], fields)
+
+
+def _select_plan_fields(plan, fields):
+    """Returns the plan restricted to the given fields, the plan itself if fields is None
+
+    :param plan:
+    :param fields:
+    :return:
+    """
+    if fields is None:
+        return plan
+
+    return {
+        **plan,
+        **{items: tuple(item for item in plan[items] if item[0] in fields)
+           for items in ['attributes', 'references', 'very_many_references']}
+    }
+
+
+def _get_response_items(model, meta, private_attributes):
+    """Returns the attributes, references and very many references of a collection that are included in a response
+
+    Private attributes and hidden attributes are excluded unless private_attributes is requested.
+
+    :return: (attributes, references, very_many_references) dictionaries
+    """
+    # Get the attributes which are not a reference, exclude private_attributes unless specifically requested
+    attributes = {k: v for k, v in model['fields'].items()
+                  if (not k.startswith('_') or private_attributes)
+                  and not v.get('hidden')
+                  and k not in model['references'].keys()}
+    attributes.update(meta or {})
+
+    # Get the references to other entities, exclude private_attributes unless specifically requested
+    very_many_references = model.get('very_many_references', {})
+    references = {k: v for k, v in model['references'].items()
+                  if k not in very_many_references.keys()
+                  and ((not k.startswith('_') and not v.get('hidden')) or private_attributes)}
+
+    return attributes, references, very_many_references
+
+
+def get_response_fields(catalog, collection, entity=False):
+    """Returns the names of the fields that a response for entities of the given collection can contain
+
+    Single entities also contain the private attributes and the public metadata, see get_entity
+
+    :param catalog:
+    :param collection:
+    :param entity: True for the response of a single entity
+    :return: set of field names
+    """
+    model = GOBModel().get_collection(catalog, collection)
+    meta, private_attributes = (PUBLIC_META_FIELDS, True) if entity else (None, False)
+    return {name for items in _get_response_items(model, meta, private_attributes) for name in items}
+
+
+def _create_convert_plan(catalog, collection, model, meta, private_attributes, base_path):
+    """Create the plan to convert entities of a GOBModel collection
+
+    The plan consists of:
+    - attributes: ordered (attribute name, GOB type, spec) tuples
+    - references: ordered (reference name, reference formatter) tuples
+    - very_many_references: ordered (reference name, reference path) tuples
+    - href: the link to the collection
+
+    :return:
+    """
+    attributes, references, very_many_references = _get_response_items(model, meta, private_attributes)
+
+    return {
+        'attributes': tuple((k, get_gob_type_from_info(v), v) for k, v in attributes.items()),
+        'references': tuple((k, _get_reference_formatter(v, base_path)) for k, v in references.items()),
+        'very_many_references': tuple((k, k.replace('_', '-')) for k in very_many_references.keys()),
+        'href': f'{base_path}/{catalog}/{collection}/'
+    }
+
+
+def _get_convert_for_model(catalog, collection, model, meta=None, private_attributes=False, fields=None):
     """Get the entity to dict convert function for GOBModels
 
     The model is used to extract only the public attributes of the entity.
 
     :param entity:
     :param model:
+    :param fields: optional list of fields to convert, defaults to all fields
     :return:
     """
     def convert(result):
-        entity = _flatten_join_result(result) if isinstance(result, tuple) else result
+        if isinstance(result, tuple):
+            if not reference_names:
+                # All results of the query have the same layout
+                reference_names.extend(_get_join_reference_names(result))
+            entity = _flatten_join_result(result, reference_names)
+        else:
+            entity = result
 
         deleted = getattr(entity, SUPPRESSED_COLUMNS, [])
-        hal_entity = {k: _to_gob_value(entity, k, v) for k, v in items if k not in deleted}
+        hal_entity = {k: gob_type.from_value(getattr(entity, k, None), **spec)
+                      for k, gob_type, spec in plan['attributes'] if k not in deleted}
 
         # Add link to self in each entity
-        id = getattr(entity, '_id')
+        href = f"{plan['href']}{getattr(entity, FIELD.ID)}/"
         hal_entity['_links'] = {
-            'self': {'href': f'{current_api_base_path()}/{catalog}/{collection}/{id}/'}
+            'self': {'href': href}
         }
-        # Add references to other entities, exclude private_attributes unless specifically requested
-        if model['references']:
-            hal_entity['_embedded'] = {k: _create_reference(entity, k, v, catalog, collection)
-                                       for k, v in model['references'].items()
-                                       if k not in deleted
-                                       and k not in model.get('very_many_references', {}).keys()
-                                       and ((not k.startswith('_') and not v.get('hidden')) or private_attributes)}
-
-            # Delete embedded from the entity if no references are added
-            if not hal_entity['_embedded']:
-                del hal_entity['_embedded']
-
-        if model.get('very_many_references'):
-            hal_entity['_links'].update({k: _create_external_reference_link(entity, k, catalog, collection)
-                                        for k, v in model['very_many_references'].items()})
+
+        # Add references to other entities
+        embedded = {k: format_references(getattr(entity, k))
+                    for k, format_references in plan['references'] if k not in deleted}
+        if embedded:
+            hal_entity['_embedded'] = embedded
+
+        hal_entity['_links'].update({k: {'href': f'{href}{path}/'} for k, path in plan['very_many_references']})
 
         return hal_entity
 
-    # Get the attributes which are not a reference, exclude private_attributes unless specifically requested
-    attributes = {k: v for k, v in model['fields'].items()
-                  if (not k.startswith('_') or private_attributes)
-                  and not v.get('hidden')}
-    attributes.update(meta or {})
-    hal_attributes = {k: v for k, v in attributes.items() if k not in model['references'].keys()}
-    items = list(hal_attributes.items())
+    plan = _get_convert_plan(catalog, collection, model, meta, private_attributes, fields)
+    reference_names = []
     return convert
 
 
@@ -437,7 +554,8 @@ def isReference(column_name):
     return column_name.startswith(('_ref', '_mref'))
 
 
-def get_entities(catalog, collection, offset, limit, view=None, reference_name=None, src_id=None):
+def get_entities(catalog, collection, offset, limit, view=None, reference_name=None, src_id=None, count=COUNT_EXACT,
+                 fields=None):
     """Entities
 
     Returns the list of entities within a collection.
@@ -449,23 +567,139 @@ def get_entities(catalog, collection, offset, limit, view=None, reference_name=N
     :param view: optional view for the collection
     :param reference_name: optional reference_name, will return entities for a specific relation
     :param src_id: optional e.g. 1234
+    :param count: total count mode, COUNT_EXACT, COUNT_ESTIMATE or COUNT_NONE
+    :param fields: optional list of fields to return, defaults to all fields
     :return:
     """
-    all_entities, entity_convert = query_reference_entities(catalog, collection, reference_name, src_id) \
-        if reference_name else query_entities(catalog, collection, view)
-
-    all_entities.set_catalog_collection(catalog, collection)
+    all_entities, entity_convert = _query_page_entities(catalog, collection, view, reference_name, src_id, fields)
 
     # For views count is slow on large views
-    all_count = all_entities.count() if view is None else None
+    all_count = _get_total_count(all_entities, catalog, collection, reference_name, count) if view is None else None
 
     # Limit and offset for pagination
     page_entities = all_entities.offset(offset).limit(limit).all()
+    if view is None and reference_name is None:
+        _add_page_relations(page_entities, catalog, collection, fields)
 
     entities = [entity_convert(entity) for entity in page_entities]
     return entities, all_count
 
 
+def get_entities_after(catalog, collection, after, limit, fields=None):
+    """Entities after
+
+    Returns the list of entities within a collection that follow the entity with _gobid <after>.
+    The entities are ordered by _gobid and limited to <limit> items.
+
+    Contrary to offset pagination the page is selected by an index range scan on _gobid (keyset pagination),
+    so the cost of retrieving a page does not depend on how deep the page is.
+    For the same reason no total count is returned, counting would again require a scan of the whole collection.
+
+    :param collection_name:
+    :param after: _gobid of the last entity on the previous page, None to start at the first entity
+    :param limit:
+    :param fields: optional list of fields to return, defaults to all fields
+    :return: (entities, _gobid to use as after for the next page or None if this is the last page)
+    """
+    all_entities, entity_convert = _query_page_entities(catalog, collection, None, None, None, fields)
+
+    table = all_entities.column_descriptions[0]['entity']
+    gobid = getattr(table, FIELD.GOBID)
+    if after is not None:
+        all_entities = all_entities.filter(gobid > after)
+
+    # Read one entity more than requested to find out if a next page exists
+    page_entities = all_entities.order_by(gobid).limit(limit + 1).all()
+
+    next_after = _get_gobid(page_entities[limit - 1]) if len(page_entities) > limit else None
+
+    page_entities = _add_page_relations(page_entities[:limit], catalog, collection, fields)
+
+    entities = [entity_convert(entity) for entity in page_entities]
+    return entities, next_after
+
+
+def _query_page_entities(catalog, collection, view, reference_name, src_id, fields=None):
+    """Returns the query and convert function for paged access to the entities of a collection or relation
+
+    The relations of the entities of a collection are not part of the query, add them per page with _add_page_relations
+
+    :return: (query, entity_convert)
+    """
+    all_entities, entity_convert = query_reference_entities(catalog, collection, reference_name, src_id) \
+        if reference_name else query_entities(catalog, collection, view, fields, relations=False)
+
+    all_entities.set_catalog_collection(catalog, collection)
+    return all_entities, entity_convert
+
+
+def _get_total_count(query, catalog, collection, reference_name, count):
+    """Returns the total number of entities for the given query
+
+    Depending on the count mode the count is skipped (None is returned), estimated or exact.
+    Exact counts for collections are cached, see _get_cached_count
+
+    :param query:
+    :param reference_name: reference name if the query is for the entities of a specific relation
+    :param count: total count mode, COUNT_EXACT, COUNT_ESTIMATE or COUNT_NONE
+    :return:
+    """
+    if count == COUNT_NONE:
+        return None
+    elif count == COUNT_ESTIMATE:
+        return _get_estimated_count(query)
+    elif reference_name:
+        return query.count()
+    else:
+        return _get_cached_count(query, catalog, collection)
+
+
+def _get_cached_count(query, catalog, collection):
+    """Returns the number of entities for the given collection query
+
+    Counts are cached per catalog, collection and set of roles of the current request.
+    A cached count is valid as long as the max eventid of the collection has not changed.
+
+    Note that entities that expire without a new event are not reflected in the cached count.
+
+    :param query:
+    :param catalog:
+    :param collection:
+    :return:
+    """
+    roles = Authority(catalog, collection).get_roles()
+    key = (catalog, collection, tuple(sorted(roles)))
+
+    max_eventid = get_max_eventid(catalog, collection)
+
+    cached_eventid, count = _count_cache.get(key, (None, None))
+    if count is None or cached_eventid != max_eventid:
+        count = query.count()
+        _count_cache[key] = (max_eventid, count)
+    return count
+
+
+def _get_estimated_count(query):
+    """Returns the number of rows for the given query as estimated by the query planner
+
+    :param query:
+    :return:
+    """
+    statement = query.statement.compile(dialect=query.session.bind.dialect)
+    plan = query.session.connection().execute(f"EXPLAIN (FORMAT JSON) {statement}", statement.params).scalar()
+    return plan[0]['Plan']['Plan Rows']
+
+
+def _get_gobid(result):
+    """Returns the _gobid of a query result, being either an entity or a (entity, relations...) tuple
+
+    :param result:
+    :return:
+    """
+    entity = result[0] if isinstance(result, tuple) else result
+    return getattr(entity, FIELD.GOBID)
+
+
 def dump_entities(catalog, collection, filter=None, order_by=None):
     """
     Get all entities in the given catalog collection
@@ -499,7 +733,19 @@ def dump_entities(catalog, collection, filter=None, order_by=None):
 
     entities.set_catalog_collection(catalog, collection)
 
-    return entities.yield_per(10000), model
+    return streaming_query(entities), model
+
+
+def streaming_query(query):
+    """Returns the query to stream its results
+
+    The results are read from a server side cursor, STREAM_FETCH_SIZE rows at a time,
+    instead of buffering the complete result in memory before the first row is returned.
+
+    :param query:
+    :return:
+    """
+    return query.yield_per(STREAM_FETCH_SIZE)
 
 
 def get_id_columns(catalog, collection):
@@ -521,9 +767,9 @@ def get_id_columns(catalog, collection):
     return [getattr(table, column) for column in columns if hasattr(table, column)]
 
 
-def get_entity_refs_after(catalog: str, collection: str, last_eventid: int) -> List[str]:
+def _query_entity_refs_after(catalog: str, collection: str, last_eventid: int):
     """
-    Returns refs of entities with _last_event greater than last_eventid
+    Returns the query for the refs of entities with _last_event greater than last_eventid
 
     :param catalog:
     :param collection:
@@ -542,7 +788,22 @@ def get_entity_refs_after(catalog: str, collection: str, last_eventid: int) -> L
     id = functions.concat(*id_columns)
     query = session.query(id).filter(getattr(table, FIELD.LAST_EVENT) > last_eventid)
     query.set_catalog_collection(catalog, collection)
-    return [row[0] for row in query.all()]
+    return query
+
+
+def stream_entity_refs_after(catalog: str, collection: str, last_eventid: int) -> Iterator[str]:
+    """
+    Yields refs of entities with _last_event greater than last_eventid
+
+    The refs are read from a server side cursor, see streaming_query
+
+    :param catalog:
+    :param collection:
+    :param last_eventid:
+    """
+    query = _query_entity_refs_after(catalog, collection, last_eventid)
+    for row in streaming_query(query):
+        yield row[0]
 
 
 def get_count(catalog: str, collection: str) -> int:
@@ -580,48 +841,149 @@ def get_max_eventid(catalog: str, collection: str) -> int:
     return query.scalar()
 
 
-def _add_relations(query, catalog_name, collection_name):
+def get_version(catalog: str, collection: str) -> tuple:
+    """Returns the version of the data of the given catalog and collection
+
+    The version consists of the max eventids of the object table and of the relation tables of the collection.
+    It changes whenever any entity or any relation of the collection changes.
+
+    :param catalog:
+    :param collection:
+    :return:
+    """
+    assert _Base
+    session = get_session()
+
+    table, _ = get_table_and_model(catalog, collection)
+    tables = [table] + [rel_table for _, rel_table in _get_relation_tables(catalog, collection)]
+
+    query = session.query(*[session.query(func.max(getattr(t, FIELD.LAST_EVENT))).as_scalar() for t in tables])
+    query.set_catalog_collection(catalog, collection)
+    return tuple(query.one())
+
+
+def _get_relation_tables(catalog_name, collection_name, fields=None):
+    """Yields the (reference, relation table) for the references of a collection that have a relation table
+
+    :param catalog_name:
+    :param collection_name:
+    :param fields: optional list of fields, only the references for these fields are returned
+    :return:
+    """
     gob_model = GOBModel()
     collection = gob_model.get_collection(catalog_name, collection_name)
-    has_states = collection.get('has_states', False)
 
-    src_table, _ = get_table_and_model(catalog_name, collection_name)
+    # Only the relations for the requested fields
+    references = [reference for reference in collection['references'] if fields is None or reference in fields]
 
-    for reference in collection['references']:
+    for reference in references:
         relation_name = get_relation_name(gob_model, catalog_name, collection_name, reference)
 
-        if not relation_name:
-            continue
+        if relation_name:
+            rel_table, _ = get_table_and_model('rel', relation_name)
+            yield reference, rel_table
 
-        rel_table, _ = get_table_and_model('rel', relation_name)
 
-        select_attrs = [
-            getattr(rel_table, 'src_id'),
-            getattr(rel_table, 'src_volgnummer'),
-        ] if has_states else [
-            getattr(rel_table, 'src_id'),
-        ]
+def _source_values(rel_table):
+    """Returns the aggregation of relations in a json list of {bronwaarde, id} objects
+
+    :param rel_table: the relation table
+    :return:
+    """
+    return func.json_agg(
+        func.json_build_object(
+            FIELD.SOURCE_VALUE, getattr(rel_table, FIELD.SOURCE_VALUE),
+            FIELD.REFERENCE_ID, getattr(rel_table, 'dst_id')
+        )
+    ).label('source_values')
+
 
-        subselect = session \
-            .query(
-                *select_attrs,
-                func.json_agg(
-                    func.json_build_object(
-                        FIELD.SOURCE_VALUE, getattr(rel_table, FIELD.SOURCE_VALUE),
-                        FIELD.REFERENCE_ID, getattr(rel_table, 'dst_id')
-                    )
-                ).label('source_values')
-            ).filter(
-                and_(
-                    getattr(rel_table, FIELD.DATE_DELETED).is_(None),
-                    or_(
-                        getattr(rel_table, FIELD.EXPIRATION_DATE).is_(None),
-                        getattr(rel_table, FIELD.EXPIRATION_DATE) > func.now()
-                    )
-                )
-            ).group_by(
-                *select_attrs
-            ).subquery()
+def _is_active_relation(rel_table):
+    """Returns the clause that selects the relations that are not deleted and not expired
+
+    :param rel_table: the relation table
+    :return:
+    """
+    return and_(
+        getattr(rel_table, FIELD.DATE_DELETED).is_(None),
+        or_(
+            getattr(rel_table, FIELD.EXPIRATION_DATE).is_(None),
+            getattr(rel_table, FIELD.EXPIRATION_DATE) > func.now()
+        )
+    )
+
+
+def _query_relation(rel_table, src_id, src_volgnummer=None):
+    """Returns the query that aggregates the active relations of a src entity in a json list
+
+    :param rel_table: the relation table
+    :param src_id: the id of the src entity, a column or a value
+    :param src_volgnummer: the volgnummer of the src entity, a column or a value. None for collections without states
+    :return:
+    """
+    src_clause = [
+        getattr(rel_table, 'src_id') == src_id,
+    ] if src_volgnummer is None else [
+        getattr(rel_table, 'src_id') == src_id,
+        getattr(rel_table, 'src_volgnummer') == src_volgnummer
+    ]
+
+    return session \
+        .query(
+            _source_values(rel_table)
+        ).filter(
+            and_(
+                *src_clause,
+                _is_active_relation(rel_table)
+            )
+        )
+
+
+def _query_relations(rel_table, has_states):
+    """Returns the query that aggregates the active relations per src entity in a json list
+
+    :param rel_table: the relation table
+    :param has_states: True if the src collection has states, the relations are grouped per src id and volgnummer
+    :return: query of (src_id, [src_volgnummer,] source_values)
+    """
+    select_attrs = [
+        getattr(rel_table, 'src_id'),
+        getattr(rel_table, 'src_volgnummer'),
+    ] if has_states else [
+        getattr(rel_table, 'src_id'),
+    ]
+
+    return session \
+        .query(
+            *select_attrs,
+            _source_values(rel_table)
+        ).filter(
+            _is_active_relation(rel_table)
+        ).group_by(
+            *select_attrs
+        )
+
+
+def _add_relations(query, catalog_name, collection_name, fields=None):
+    """Add the relations of the entities in the query as json columns labeled ref:<reference>
+
+    The relations of all entities are aggregated per src entity and joined with the entities.
+    This is the efficient way to add the relations to all entities of a collection, e.g. for a stream.
+    For a page of entities use _add_page_relations.
+
+    :param query:
+    :param catalog_name:
+    :param collection_name:
+    :param fields: optional list of fields, only the relations for these fields are added
+    :return: query
+    """
+    collection = GOBModel().get_collection(catalog_name, collection_name)
+    has_states = collection.get('has_states', False)
+
+    src_table, _ = get_table_and_model(catalog_name, collection_name)
+
+    for reference, rel_table in _get_relation_tables(catalog_name, collection_name, fields):
+        subselect = _query_relations(rel_table, has_states).subquery()
 
         join_clause = [
             getattr(src_table, FIELD.ID) == getattr(subselect.c, 'src_id'),
@@ -638,6 +1000,71 @@ def _add_relations(query, catalog_name, collection_name):
     return query
 
 
+def _get_src_key(entity, has_states):
+    """Returns the key of a src entity as returned by _query_relations
+
+    :param entity:
+    :param has_states:
+    :return: (id, volgnummer) or (id,) for collections without states
+    """
+    return (getattr(entity, FIELD.ID), getattr(entity, FIELD.SEQNR)) if has_states else (getattr(entity, FIELD.ID),)
+
+
+def _add_page_relations(entities, catalog_name, collection_name, fields=None):
+    """Set the relations of the entities of a page
+
+    Only the relations of the entities of the page are aggregated, in one query per reference.
+    Each query is an indexed lookup on the relation src ids of the entities.
+
+    :param entities: the entities of the page
+    :param catalog_name:
+    :param collection_name:
+    :param fields: optional list of fields, only the relations for these fields are set
+    :return: entities
+    """
+    collection = GOBModel().get_collection(catalog_name, collection_name)
+    has_states = collection.get('has_states', False)
+    src_ids = {getattr(entity, FIELD.ID) for entity in entities}
+
+    for reference, rel_table in _get_relation_tables(catalog_name, collection_name, fields) if entities else []:
+        query = _query_relations(rel_table, has_states).filter(getattr(rel_table, 'src_id').in_(src_ids))
+        query.set_catalog_collection(catalog_name, collection_name)
+
+        relations = {tuple(relation[:-1]): relation[-1] for relation in query.all()}
+        for entity in entities:
+            setattr(entity, reference, relations.get(_get_src_key(entity, has_states)))
+
+    return entities
+
+
+def _add_entity_relations(entity, catalog_name, collection_name, fields=None):
+    """Set the relations of a single entity
+
+    The relations for all references are retrieved in one query.
+    Each relation is an indexed lookup on the relation src id (and src volgnummer) of the entity.
+
+    :param entity:
+    :param catalog_name:
+    :param collection_name:
+    :param fields: optional list of fields, only the relations for these fields are set
+    :return: entity
+    """
+    collection = GOBModel().get_collection(catalog_name, collection_name)
+    src_volgnummer = getattr(entity, FIELD.SEQNR) if collection.get('has_states', False) else None
+
+    relations = [(reference, _query_relation(rel_table, getattr(entity, FIELD.ID), src_volgnummer).as_scalar())
+                 for reference, rel_table in _get_relation_tables(catalog_name, collection_name, fields)]
+    if not relations:
+        return entity
+
+    query = session.query(*[relation.label(f"ref:{reference}") for reference, relation in relations])
+    query.set_catalog_collection(catalog_name, collection_name)
+
+    for (reference, _), value in zip(relations, query.one()):
+        setattr(entity, reference, value)
+    return entity
+
+
 def _apply_filters(query, filters, model):
     for filter in filters:
         if filter.get('op') == '==':
@@ -648,7 +1075,38 @@ def _apply_filters(query, filters, model):
     return query
 
 
-def query_entities(catalog, collection, view):
+def _load_fields(query, table, fields):
+    """Restrict the columns that are loaded by the query to the columns for the given fields
+
+    The id, gobid and volgnummer columns are always loaded, they are required for links, cursors and relations.
+    Any field that is not a column of the table, e.g. a relation, is skipped.
+
+    :param query:
+    :param table: The SQLAlchemy model
+    :param fields: list of fields to load, if None all columns are loaded
+    :return: query
+    """
+    if fields is None:
+        return query
+
+    table_columns = table.__table__.columns.keys()
+    columns = [column for column in {*fields, FIELD.ID, FIELD.GOBID, FIELD.SEQNR} if column in table_columns]
+
+    query = query.options(load_only(*columns))
+    query.set_loaded_columns(columns)
+    return query
+
+
+def query_entities(catalog, collection, view, fields=None, relations=True):
+    """Returns the query for the entities of a collection or view and the function to convert the entities
+
+    :param catalog:
+    :param collection:
+    :param view: optional view for the collection
+    :param fields: optional list of fields to return, defaults to all fields
+    :param relations: join the relations of the entities in the query, see _add_relations
+    :return: (query, entity_convert)
+    """
     assert _Base
     session = get_session()
 
@@ -659,7 +1117,8 @@ def query_entities(catalog, collection, view):
 
     # Only add relations if we're querying a catalog/collection
     if view is None:
-        query = _add_relations(query, catalog, collection)
+        query = _load_fields(query, table, fields)
+        query = _add_relations(query, catalog, collection, fields) if relations else query
 
     # Exclude all records with date_deleted
     all_entities = filter_deleted(query, table)
@@ -680,9 +1139,9 @@ def query_entities(catalog, collection, view):
         entity_convert = _get_convert_for_table(table,
                                                 {**PUBLIC_META_FIELDS, **PRIVATE_META_FIELDS, **FIXED_COLUMNS})
     else:
-        entity_convert = _get_convert_for_model(catalog, collection, model)
+        entity_convert = _get_convert_for_model(catalog, collection, model, fields=fields)
 
-    return all_entities.yield_per(10000), entity_convert
+    return all_entities, entity_convert
 
 
 def query_reference_entities(catalog, collection, reference_name, src_id):
@@ -820,16 +1279,14 @@ COMMIT;
     exec_statement(statement)
 
 
-def get_entity(catalog, collection, id, view=None):
-    """Entity
+def _query_entity(catalog, collection, id, view=None):
+    """Returns the query for the entity from the specified collection or the view identified by the id parameter
 
-    Returns the entity from the specified collection or the view identied by the id parameter.
-    If the entity cannot be found, None is returned
-
-    :param collection_name:
+    :param catalog:
+    :param collection:
     :param id:
     :param view:
-    :return:
+    :return: (query, table, model)
     """
     assert _Base
     session = get_session()
@@ -843,14 +1300,12 @@ def get_entity(catalog, collection, id, view=None):
     query = session.query(table).filter_by(**filter)
     query.set_catalog_collection(catalog, collection)
 
-    query = _add_relations(query, catalog,  collection)
-
     # Exclude all records with date_deleted
-    entity = filter_deleted(query, table)
+    query = filter_deleted(query, table)
 
     if view is None:
         # The default result is without deleted items
-        entity = filter_active(entity, table)
+        query = filter_active(query, table)
 
     # Apply filters if defined in model
     try:
@@ -858,19 +1313,58 @@ def get_entity(catalog, collection, id, view=None):
     except (KeyError, TypeError) as e:
         pass
     else:
-        entity = _apply_filters(entity, filters, table)
+        query = _apply_filters(query, filters, table)
+
+    return query, table, model
+
+
+def get_entity(catalog, collection, id, view=None, fields=None):
+    """Entity
+
+    Returns the entity from the specified collection or the view identied by the id parameter.
+    If the entity cannot be found, None is returned
+
+    The entity is retrieved by its id, its relations are retrieved separately, see _add_entity_relations
+
+    :param collection_name:
+    :param id:
+    :param view:
+    :param fields: optional list of fields to return, defaults to all fields. Not applicable to views
+    :return:
+    """
+    query, table, model = _query_entity(catalog, collection, id, view)
 
-    entity = entity.one_or_none()
     if view:
+        entity = query.one_or_none()
         entity_convert = _get_convert_for_table(table,
                                                 {**PRIVATE_META_FIELDS, **FIXED_COLUMNS})
     else:
+        entity = _load_fields(query, table, fields).one_or_none()
+        if entity:
+            _add_entity_relations(entity, catalog, collection, fields)
         entity_convert = _get_convert_for_model(catalog, collection, model,
-                                                meta=PUBLIC_META_FIELDS, private_attributes=True)
+                                                meta=PUBLIC_META_FIELDS, private_attributes=True, fields=fields)
 
     return entity_convert(entity) if entity else None
 
 
+def entity_exists(catalog, collection, id):
+    """Tells whether the entity from the specified collection identified by the id parameter exists
+
+    Only the existence is checked, the entity itself is not retrieved nor converted
+
+    :param catalog:
+    :param collection:
+    :param id:
+    :return: True if the entity exists
+    """
+    query, _, _ = _query_entity(catalog, collection, id)
+
+    query = get_session().query(query.exists())
+    query.set_catalog_collection(catalog, collection)
+    return query.scalar()
+
+
 def filter_deleted(query, model):
     """Filter a query to exclude records with date deleted
 
@@ -1,5 +1,14 @@
+import functools
 import re
 
+from gobapi.config import STREAM_CHUNK_SIZE
+
+_RE_TO_CAMELCASE = re.compile(r'(?!^)_([a-zA-Z])')
+
+# Memo of camelCase conversions, the converted keys are mostly the GOB model attribute names
+_CAMELCASE_MEMO_SIZE = 10000
+_camelcase_memo = {}
+
 
 def to_snake(camel: str):
     """
@@ -23,11 +32,27 @@ def to_camelcase(s):
     :param s: string to convert to camelCase
     :return:
     """
-    def _camelcase_converter(m):
-        return m.group(1).upper()
+    try:
+        return _camelcase_memo[s]
+    except KeyError:
+        camelcase = _RE_TO_CAMELCASE.sub(_camelcase_converter, s)
+        if len(_camelcase_memo) < _CAMELCASE_MEMO_SIZE:
+            _camelcase_memo[s] = camelcase
+        return camelcase
+
 
-    _RE_TO_CAMELCASE = re.compile(r'(?!^)_([a-zA-Z])')
-    return re.sub(_RE_TO_CAMELCASE, _camelcase_converter, s)
+def _camelcase_converter(m):
+    return m.group(1).upper()
+
+
+def prepopulate_camelcase(names):
+    """Converts the given snake_case names to camelCase in advance
+
+    :param names: snake_case names, eg the GOB model attribute names
+    :return:
+    """
+    for name in names:
+        to_camelcase(name)
 
 
 def dict_to_camelcase(d):
@@ -41,7 +66,9 @@ def dict_to_camelcase(d):
     :param d:
     :return:
     """
-    return d if d is None else {to_camelcase(key): object_to_camelcase(value) for key, value in d.items()}
+    # Only convert list and dict values, any other value is returned as is
+    return d if d is None else {to_camelcase(key): object_to_camelcase(value) if isinstance(value, (list, dict))
+                                else value for key, value in d.items()}
 
 
 def object_to_camelcase(value):
@@ -82,3 +109,50 @@ def streaming_gob_response(func):
             raise e
 
     return wrapper
+
+
+def coalesce_chunks(func):
+    """Decorator for a function or method that returns a generator that serves as streaming response.
+
+    Every item that is yielded results in a separate write to the client.
+    The decorator coalesces the yielded items into chunks of at least STREAM_CHUNK_SIZE characters.
+    The last chunk contains the remaining items.
+
+    Apply the decorator on top of streaming_gob_response so that the empty line or GOB_API_ERROR line that is
+    added by streaming_gob_response is always included in the last chunk. If an Exception occurs, the items that
+    have been collected so far are yielded before the Exception is re-raised.
+
+    :param func:
+    :return:
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        chunk = []
+        try:
+            yield from _coalesce(func(*args, **kwargs), chunk)
+        except Exception as e:
+            if chunk:
+                yield "".join(chunk)
+            raise e
+
+        if chunk:
+            yield "".join(chunk)
+
+    return wrapper
+
+
+def _coalesce(items, chunk):
+    """Yields the items in chunks of at least STREAM_CHUNK_SIZE characters
+
+    :param items:
+    :param chunk: list that holds the items that have not yet been yielded
+    :return:
+    """
+    size = 0
+    for item in items:
+        chunk.append(item)
+        size += len(item)
+        if size >= STREAM_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk.clear()
+            size = 0
@@ -1,6 +1,9 @@
+import mimetypes
+
 from time import sleep
-from flask import send_file, jsonify
+from flask import send_file, jsonify, Response
 
+from gobapi import compression
 from gobapi.worker.response import WorkerResponse
 
 
@@ -15,13 +18,37 @@ def worker_result(worker_id):
     """
     filename = WorkerResponse.get_response_file(worker_id)
     if filename:
-        return send_file(filename)
+        return _send_worker_file(filename)
     elif WorkerResponse.is_working(worker_id):
         return f"Worker {worker_id} not finished", 204  # No Content
     else:
         return _worker_not_found(worker_id)
 
 
+def _send_worker_file(filename):
+    """
+    Returns a Response for the given worker file.
+
+    A compressed worker file is sent as is when the client accepts gzip, otherwise it is decompressed.
+    The response for a compressed worker file varies with the Accept-Encoding of the request.
+    The decompressed file gets the mimetype that send_file would have given to the file.
+
+    :param filename:
+    :return:
+    """
+    if not compression.is_compressed_file(filename):
+        return send_file(filename)
+
+    if compression.accepts(compression.GZIP):
+        response = send_file(filename)
+        response.headers['Content-Encoding'] = compression.GZIP
+    else:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = Response(compression.decompress_file(filename), mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
 def worker_end(worker_id):
     """
     End a running worker
@@ -7,6 +7,9 @@ from pathlib import Path
 from flask import request, Response, stream_with_context
 from gobcore.message_broker.config import GOB_SHARED_DIR
 
+from gobapi import compression
+from gobapi.config import WORKER_FILE_COMPRESSION
+
 
 class WorkerResponse():
 
@@ -54,9 +57,10 @@ class WorkerResponse():
         yield f"{self.id}\n"
 
         success = False
-        with open(tmp_filename, "w") as f:
+        with compression.open_file(tmp_filename, WORKER_FILE_COMPRESSION) as f:
             for row in rows:
-                f.write(row)
+                # Rows are either text or binary data
+                f.write(row.encode() if isinstance(row, str) else row)
                 if not self._last_progress:
                     print(f"INFO: Worker {self.id} wrote first row")
                 yield from self.yield_progress(tmp_filename)
@@ -80,15 +84,27 @@ class WorkerResponse():
             print(f"ERROR: Worker {self.id} FAILURE")
             yield "FAILURE"
 
+    @classmethod
+    def is_worker_request(cls):
+        return bool(request.headers.get(cls._WORKER_REQUEST))
+
     @classmethod
     def stream_with_context(cls, rows, mimetype):
-        if request.headers.get(cls._WORKER_REQUEST):
+        if cls.is_worker_request():
             worker = WorkerResponse()
             response = Response(stream_with_context(worker.write_response(rows)), mimetype='text/plain')
             response.headers[cls._WORKER_ID_RESPONSE] = worker.id
             return response
-        else:
-            return Response(stream_with_context(rows), mimetype=mimetype)
+
+        # Compress the response if the client accepts a supported encoding
+        encoding = compression.get_encoding()
+        if encoding:
+            rows = compression.compress(rows, encoding)
+        response = Response(stream_with_context(rows), mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
 
     @classmethod
     def is_working(cls, worker_id):
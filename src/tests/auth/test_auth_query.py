@@ -161,6 +161,23 @@ class TestAuthorizedQueryIter(TestCase):
             self.assertFalse(hasattr(result[0], "some other col"))
             self.assertIsNotNone(result[0].c)
 
+    @patch("gobapi.auth.auth_query.Authority")
+    @patch("gobapi.auth.auth_query.super")
+    def test_iter_loaded_columns(self, mock_super, mock_authority):
+        mock_super.return_value = iter([MockEntity()])
+        mock_authority.exposed_value.return_value = 'exposed value'
+        q = AuthorizedQuery()
+        q._authority = mock.MagicMock()
+        q._authority.get_suppressed_columns = lambda: ["a", "b"]
+        q._authority.get_secured_columns = lambda: {"b": "info", "c": "info"}
+        q.set_loaded_columns(["a", "c"])
+        for result in q:
+            # Only loaded columns are checked
+            self.assertIsNone(result.a)
+            self.assertEqual(result.b, "value b")
+            self.assertEqual(result.c, "exposed value")
+            self.assertEqual(getattr(result, "_suppressed_columns"), ["a", "b"])
+
     @patch("gobapi.auth.auth_query.super")
     def test_iter_unauthorized(self, mock_super):
         mock_super.return_value = iter([MockEntity(), MockEntity()])
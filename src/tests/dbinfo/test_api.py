@@ -13,3 +13,9 @@ class TestDBInfoAPI(TestCase):
 
         result = get_db_info('statement')
         self.assertEqual(result, "jsonify [{'exec': 'some statement'}]")
+
+    @mock.patch("gobapi.dbinfo.api.get_pool_status", lambda: {'size': 5})
+    @mock.patch("gobapi.dbinfo.api.jsonify", lambda s: f'jsonify {s}')
+    def test_pool_info(self):
+        result = get_db_info('pool')
+        self.assertEqual(result, "jsonify {'size': 5}")
@@ -0,0 +1,125 @@
+import datetime
+import decimal
+import struct
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobapi.dump.binary import _encode_string, _encode_integer, _encode_boolean, _encode_date, _encode_timestamp
+from gobapi.dump.binary import _encode_numeric, _encode_geometry, _encode_jsonb, _tuple
+from gobapi.dump.binary import binary_entities, is_supported, BinaryStream, HEADER, TRAILER
+
+
+class MockEntity:
+
+    def __init__(self):
+        self.a = "a"
+        self.b = 5
+
+    @classmethod
+    def specs(self):
+        return {
+            'a': {
+                'type': 'GOB.String',
+                'entity_id': 'a'
+            },
+            'b': {
+                'type': 'GOB.Integer'
+            },
+            'c': {
+                'type': 'GOB.String'
+            }
+        }
+
+
+class TestBinary(TestCase):
+
+    def test_encode_string(self):
+        self.assertEqual(_encode_string("a\r\n\"b\";"), b"a\r\n\"b\";")
+        self.assertEqual(_encode_string(1), b"1")
+
+    def test_encode_integer(self):
+        self.assertEqual(_encode_integer(-2), b"\xff\xff\xff\xfe")
+        self.assertEqual(_encode_integer("2"), b"\x00\x00\x00\x02")
+
+    def test_encode_boolean(self):
+        self.assertEqual(_encode_boolean(True), b"\x01")
+        self.assertEqual(_encode_boolean("False"), b"\x00")
+        self.assertEqual(_encode_boolean("t"), b"\x01")
+
+    def test_encode_date(self):
+        self.assertEqual(_encode_date(datetime.date(2000, 1, 2)), struct.pack('!i', 1))
+        self.assertEqual(_encode_date(datetime.datetime(1999, 12, 31, 12)), struct.pack('!i', -1))
+        self.assertEqual(_encode_date("2000-01-02"), struct.pack('!i', 1))
+
+    def test_encode_timestamp(self):
+        self.assertEqual(_encode_timestamp(datetime.datetime(2000, 1, 1, 0, 0, 1, 5)), struct.pack('!q', 1000005))
+        self.assertEqual(_encode_timestamp("2000-01-01T00:00:01"), struct.pack('!q', 1000000))
+        self.assertEqual(_encode_timestamp(datetime.date(2000, 1, 2)), struct.pack('!q', 86400000000))
+
+    def test_encode_numeric(self):
+        self.assertEqual(_encode_numeric(0), struct.pack('!hhHh', 0, 0, 0, 0))
+        self.assertEqual(_encode_numeric("12345.678"), struct.pack('!hhHh3h', 3, 1, 0, 3, 1, 2345, 6780))
+        self.assertEqual(_encode_numeric(-0.5), struct.pack('!hhHh1h', 1, -1, 0x4000, 1, 5000))
+        self.assertEqual(_encode_numeric(decimal.Decimal("0.00001")), struct.pack('!hhHh1h', 1, -2, 0, 5, 1000))
+        self.assertEqual(_encode_numeric(decimal.Decimal("1E+4")), struct.pack('!hhHh1h', 1, 1, 0, 0, 1))
+        self.assertEqual(_encode_numeric(decimal.Decimal("NaN")), struct.pack('!hhHh', 0, 0, 0xC000, 0))
+
+    @patch("gobapi.dump.binary.wkb")
+    @patch("gobapi.dump.binary.wkt")
+    def test_encode_geometry(self, mock_wkt, mock_wkb):
+        self.assertEqual(_encode_geometry("0101"), b"\x01\x01")
+
+        self.assertEqual(_encode_geometry("POINT (1 2)"), mock_wkb.dumps.return_value)
+        mock_wkt.loads.assert_called_with("POINT (1 2)")
+        mock_wkb.dumps.assert_called_with(mock_wkt.loads.return_value)
+
+        _encode_geometry("SRID=28992;POINT (1 2)")
+        mock_wkt.loads.assert_called_with("POINT (1 2)")
+        mock_wkb.dumps.assert_called_with(mock_wkt.loads.return_value, srid=28992)
+
+    def test_encode_jsonb(self):
+        self.assertEqual(_encode_jsonb({"a": 1}), b'\x01{"a": 1}')
+        self.assertEqual(_encode_jsonb('{"a": 1}'), b'\x01{"a": 1}')
+
+    def test_tuple(self):
+        result = _tuple([None, "a"], [_encode_string, _encode_string])
+        self.assertEqual(result, b"\x00\x02" + b"\xff\xff\xff\xff" + b"\x00\x00\x00\x01a")
+
+    def test_binary_entities(self):
+        model = {
+            'catalog': 'any catalog',
+            'entity_id': 'a',
+            'fields': MockEntity.specs(),
+            'all_fields': MockEntity.specs()
+        }
+        self.assertTrue(is_supported(model))
+
+        results = list(binary_entities([MockEntity()], model, ['c']))
+        self.assertEqual(results, [
+            b"\x00\x03" + b"\x00\x00\x00\x01a" + b"\x00\x00\x00\x04\x00\x00\x00\x05" + b"\x00\x00\x00\x01a"
+        ])
+
+    def test_stream_empty(self):
+        stream = BinaryStream(iter([]), 1)
+        self.assertFalse(stream.has_items())
+
+    def test_stream_max_read(self):
+        stream = BinaryStream(iter([b"a", b"b", b"c"]), 2)
+        self.assertTrue(stream.has_items())
+        stream.reset_count()
+        self.assertEqual(stream.read(), HEADER + b"ab" + TRAILER)
+        self.assertEqual(stream.read(), b"")
+
+        self.assertTrue(stream.has_items())
+        stream.reset_count()
+        self.assertEqual(stream.read(len(HEADER) + 1), HEADER + b"c")
+        self.assertEqual(stream.read(), TRAILER)
+        self.assertEqual(stream.read(), b"")
+        self.assertFalse(stream.has_items())
+        self.assertEqual(stream.total_count, 3)
+
+    def test_readline(self):
+        stream = BinaryStream(iter([]), 1)
+        with self.assertRaises(NotImplementedError):
+            stream.readline()
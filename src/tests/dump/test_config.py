@@ -1,3 +1,5 @@
+import datetime
+
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 
@@ -6,8 +8,9 @@ from flask import Response
 from gobapi import api, storage
 
 from gobapi.dump.config import (
-    get_unique_reference, add_unique_reference, get_field_specifications, get_field_value,
-    joined_names, get_field_order, get_reference_fields, REFERENCE_FIELDS, FIELD, REL_FIELDS, get_skip_fields
+    get_unique_reference, add_unique_reference, get_field_specifications, get_field_value, get_field_value_getter,
+    joined_names, get_field_order, get_reference_fields, REFERENCE_FIELDS, FIELD, REL_FIELDS, get_skip_fields,
+    to_bool, to_date, to_datetime, get_values, get_column_types, get_field_values_getter, get_fields
 )
 
 
@@ -165,6 +168,90 @@ class TestConfig(TestCase):
         result = get_field_value(entity, 'c', MockEntity.specs()['a'])
         self.assertEqual(result, None)
 
+    def test_get_field_value_getter(self):
+        entity = MockEntity()
+        specs = MockEntity.specs()
+        self.assertEqual(get_field_value_getter('a', specs)(entity), 'a')
+
+        del entity.a
+        self.assertEqual(get_field_value_getter('a', specs)(entity), None)
+
+    @patch('gobapi.dump.config.UNIQUE_ID', 'ref')
+    @patch('gobapi.dump.config.FIELD.SEQNR', 'b')
+    def test_get_field_value_getter_unique_id(self):
+        entity = MockEntity()
+        specs = {**MockEntity.specs(), 'ref': {'type': 'GOB.String', 'entity_id': 'a'}}
+        get_value = get_field_value_getter('ref', specs)
+        self.assertEqual(get_value(entity), get_unique_reference(entity, 'ref', specs))
+        self.assertEqual(get_value(entity), 'a_5')
+
+        # Without volgnummer
+        del specs['b']
+        get_value = get_field_value_getter('ref', specs)
+        self.assertEqual(get_value(entity), get_unique_reference(entity, 'ref', specs))
+        self.assertEqual(get_value(entity), 'a')
+
+    @patch('gobapi.dump.config.FIELD.SEQNR', 'volgnummer')
+    def test_get_field_value_getter_relation_unique_id(self):
+        entity = type('MockRelation', (), {'src_id': 'a', 'src_volgnummer': 5, 'dst_id': 'b', 'dst_volgnummer': None})
+        specs = {field: {'type': 'GOB.String'} for field in ['src_id', 'src_volgnummer', 'dst_id', 'dst_volgnummer']}
+        for field, expect in [('src_ref', 'a_5'), ('dst_ref', 'b')]:
+            get_value = get_field_value_getter(field, specs)
+            self.assertEqual(get_value(entity), get_unique_reference(entity, field, specs))
+            self.assertEqual(get_value(entity), expect)
+
+
+    def test_to_bool(self):
+        self.assertTrue(to_bool(True))
+        self.assertTrue(to_bool("t"))
+        self.assertFalse(to_bool("f"))
+        self.assertFalse(to_bool(0))
+
+    def test_to_date(self):
+        self.assertEqual(to_date("2020-01-02"), datetime.date(2020, 1, 2))
+        self.assertEqual(to_date("2020-01-02T10:00:00"), datetime.date(2020, 1, 2))
+        self.assertEqual(to_date(datetime.datetime(2020, 1, 2, 10)), datetime.date(2020, 1, 2))
+        self.assertEqual(to_date(datetime.date(2020, 1, 2)), datetime.date(2020, 1, 2))
+
+    def test_to_datetime(self):
+        self.assertEqual(to_datetime("2020-01-02T10:00:00"), datetime.datetime(2020, 1, 2, 10))
+        self.assertEqual(to_datetime(datetime.date(2020, 1, 2)), datetime.datetime(2020, 1, 2))
+        value = datetime.datetime(2020, 1, 2, 10, tzinfo=datetime.timezone.utc)
+        self.assertEqual(to_datetime(value), datetime.datetime(2020, 1, 2, 10))
+
+    def testget_values(self):
+        self.assertEqual(get_values(None, {'type': 'GOB.String'}), [None])
+        self.assertEqual(get_values({'id': 1, 'volgnummer': 2, 'bronwaarde': 'b'}, {'type': 'GOB.Reference'}), ['b'])
+        self.assertEqual(get_values(None, {'type': 'GOB.Reference'}), [None])
+        self.assertEqual(get_values([{'bronwaarde': 'a'}, {}], {'type': 'GOB.ManyReference'}), ['[a,]'])
+
+        spec = {'type': 'GOB.JSON', 'attributes': {'x': {}, 'y': {}}}
+        self.assertEqual(get_values({'x': 1}, spec), [1, None])
+        self.assertEqual(get_values([{'x': 1}, {'x': None, 'y': 'b'}], spec), ['[1,]', '[,b]'])
+
+    def testget_column_types(self):
+        specs = {
+            'a': {'type': 'GOB.Integer'},
+            'b': {'type': 'GOB.Reference'},
+            'c': {'type': 'GOB.JSON', 'attributes': {'x': {}, 'y': {}}},
+            'd': {'type': 'GOB.Unknown'},
+        }
+        self.assertEqual(get_column_types(specs, ['a', 'b', 'c']), ['integer'] + ['character varying'] * 3)
+        self.assertEqual(get_column_types(specs, ['d']), [None])
+
+    def test_get_field_values_getter(self):
+        entity = MockEntity()
+        specs = {**MockEntity.specs(), 'd': {'type': 'GOB.JSON', 'attributes': {'x': {}}}}
+        entity.d = None
+        self.assertEqual(get_field_values_getter('a', specs)(entity), ['a'])
+        self.assertEqual(get_field_values_getter('d', specs)(entity), [None])
+
+    @patch('gobapi.dump.config.get_field_order', lambda model: ['a', 'b', 'c'])
+    @patch('gobapi.dump.config.get_field_specifications', lambda model: 'any specs')
+    def test_get_fields(self):
+        self.assertEqual(get_fields('any model', None), ('any specs', ['a', 'b', 'c']))
+        self.assertEqual(get_fields('any model', ['b']), ('any specs', ['a', 'c']))
+
 
 @patch('gobapi.api.WorkerResponse.stream_with_context', lambda f, mimetype: Response())
 class TestDumpApi(TestCase):
@@ -221,6 +308,22 @@ class TestDumpApi(TestCase):
         result = api._dump("any catalog", "any collection")
         self.assertIsInstance(result, Response)
 
+    @patch('gobapi.api.parquet')
+    @patch('gobapi.api.dump_entities', lambda cat, col, **kwargs: ([], {}))
+    @patch('gobapi.api.request')
+    def test_dump_parquet(self, mock_request, mock_parquet):
+        mock_request.method = 'GET'
+
+        mock_request.args = {'format': 'parquet'}
+        result = api._dump("any catalog", "any collection")
+        self.assertIsInstance(result, Response)
+        mock_parquet.parquet_entities.assert_called_with([], {})
+
+        # pyarrow not installed
+        mock_parquet.is_available.return_value = False
+        msg, status = api._dump("any catalog", "any collection")
+        self.assertEqual(status, 400)
+
     @patch('gobapi.api.dump_entities', lambda cat, col, **kwargs: ([], {}))
     @patch('gobapi.api.request')
     def test_dump_other(self, mock_request):
@@ -2,7 +2,8 @@ from unittest import TestCase
 from unittest.mock import patch
 
 from gobapi.dump.config import REFERENCE_FIELDS
-from gobapi.dump.csv import _csv_line, _csv_value, _csv_header, _csv_reference_values, _csv_values, _csv_record, csv_entities
+from gobapi.dump.csv import _csv_line, _csv_value, _csv_header, _csv_reference_values, _csv_values, csv_entities
+from gobapi.dump.csv import csv_encoder
 
 
 class MockEntity:
@@ -146,18 +147,6 @@ class TestCSV(TestCase):
         result = _csv_values(value, spec)
         self.assertEqual(result, ['', ''])
 
-    def test_csv_record(self):
-        entity = None
-        specs = {}
-        result = _csv_record(entity, specs, [])
-        self.assertEqual(result, [])
-
-        entity = MockEntity()
-        specs = entity.specs()
-
-        result = _csv_record(entity, specs, ['a', 'b'])
-        self.assertEqual(result, ['"a"', '5'])
-
     def test_csv_entities(self):
         entities = []
         model = {
@@ -193,3 +182,16 @@ class TestCSV(TestCase):
             results.append(result)
 
         self.assertEqual(results, ['"a";"b";"ref"\n', '"a";5;"a"\n', '"a";5;"a"\n'])
+
+    def test_csv_encoder(self):
+        specs = MockEntity.specs()
+        specs['d'] = {'type': 'GOB.Reference'}
+        specs['e'] = {'type': 'GOB.JSON', 'attributes': {}}
+        entity = MockEntity()
+        entity.c = "x\r\ny"
+        entity.d = {'bronwaarde': 'z'}
+        entity.e = {}
+        order = ['a', 'b', 'c', 'd', 'e']
+
+        encode = csv_encoder(specs, order)
+        self.assertEqual(encode(entity), '"a";5;"x y";"z"\n')
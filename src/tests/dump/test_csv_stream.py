@@ -17,22 +17,22 @@ class TestCSVStream(TestCase):
         stream = CSVStream(iter(["a"]), 1)
         self.assertFalse(stream.has_items())
         result = stream.read()
-        self.assertEqual(result, "a")
+        self.assertEqual(result, b"a")
 
     def test_one_line(self):
         stream = CSVStream(iter(["a", "b"]), 1)
         self.assertTrue(stream.has_items())
         result = stream.read()
-        self.assertEqual(result, "ab")
+        self.assertEqual(result, b"ab")
 
     def test_max_read(self):
         stream = CSVStream(iter(["a", "b", "c"]), 1)
         self.assertTrue(stream.has_items())
         result = stream.read()
-        self.assertEqual(result, "ab")
+        self.assertEqual(result, b"ab")
         stream.reset_count()
         result = stream.read()
-        self.assertEqual(result, "ac")
+        self.assertEqual(result, b"ac")
 
     def test_readline(self):
         stream = CSVStream(iter([]), 1)
@@ -40,3 +40,23 @@ class TestCSVStream(TestCase):
             stream.readline()
 
 
+
+    def test_read_size(self):
+        stream = CSVStream(iter(["h\n", "abc\n", "d\n", "é\n"]), 10)
+        self.assertEqual(stream.read(3), b"h\na")
+        self.assertEqual(stream.read(3), b"bc\n")
+        self.assertEqual(stream.read(), b"d\n\xc3\xa9\n")
+        self.assertEqual(stream.read(), b"")
+        self.assertEqual(stream.total_count, 3)
+
+    def test_has_items(self):
+        stream = CSVStream(iter(["h", "a", "b"]), 1)
+        for _ in range(2):
+            # has_items does not consume any lines
+            self.assertTrue(stream.has_items())
+        stream.reset_count()
+        self.assertEqual(stream.read(), b"ha")
+        self.assertTrue(stream.has_items())
+        stream.reset_count()
+        self.assertEqual(stream.read(), b"hb")
+        self.assertFalse(stream.has_items())
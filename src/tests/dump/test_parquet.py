@@ -0,0 +1,111 @@
+import datetime
+import decimal
+import importlib
+import io
+import sys
+
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from gobapi.dump import parquet
+from gobapi.dump.parquet import _blocks, _column_names, _get_arrow_types, _Sink, _to_json, parquet_entities
+
+
+class MockEntity:
+
+    def __init__(self, b):
+        self.a = "a"
+        self.b = b
+        self.d = "2020-01-02"
+
+    @classmethod
+    def specs(self):
+        return {
+            'a': {
+                'type': 'GOB.String',
+                'entity_id': 'a'
+            },
+            'b': {
+                'type': 'GOB.Integer'
+            },
+            'c': {
+                'type': 'GOB.Reference'
+            },
+            'd': {
+                'type': 'GOB.Date'
+            }
+        }
+
+
+class TestParquet(TestCase):
+
+    def test_column_names(self):
+        specs = {
+            'a': {'type': 'GOB.String'},
+            'b': {'type': 'GOB.Reference'},
+            'c': {'type': 'GOB.JSON', 'attributes': {'x': {}, 'y': {}}},
+        }
+        self.assertEqual(_column_names(specs, ['a', 'b', 'c']), ['a', 'b_bronwaarde', 'c_x', 'c_y'])
+
+    def test_is_available(self):
+        with patch.dict(sys.modules, {'pyarrow': None, 'pyarrow.parquet': None}):
+            importlib.reload(parquet)
+            self.assertFalse(parquet.is_available())
+        importlib.reload(parquet)
+
+    def test_blocks(self):
+        self.assertEqual(list(_blocks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(_blocks([], 2)), [])
+
+    def test_to_json(self):
+        self.assertEqual(_to_json('{"a": 1}'), '{"a": 1}')
+        self.assertEqual(_to_json({"a": 1}), '{"a": 1}')
+
+    def test_sink(self):
+        sink = _Sink()
+        self.assertEqual(sink.write(b"ab"), 2)
+        sink.write(memoryview(b"c"))
+        sink.flush()
+        self.assertEqual(sink.tell(), 3)
+        self.assertEqual(sink.take(), b"abc")
+        self.assertEqual(sink.take(), b"")
+        self.assertEqual(sink.tell(), 3)
+
+        sink.close()
+        self.assertTrue(sink.closed)
+
+    @skipUnless(parquet.is_available(), "pyarrow is not installed")
+    def test_get_arrow_types(self):
+        import pyarrow
+
+        # Numeric values are kept exact
+        arrow_type, convert = _get_arrow_types()["numeric"]
+        self.assertEqual(arrow_type, pyarrow.string())
+        self.assertEqual(convert(decimal.Decimal("0.1000000000000000000001")), "0.1000000000000000000001")
+
+    @skipUnless(parquet.is_available(), "pyarrow is not installed")
+    @patch("gobapi.dump.parquet.ROW_GROUP_SIZE", 2)
+    def test_parquet_entities(self):
+        import pyarrow.parquet
+
+        entities = [MockEntity(b) for b in [1, None, 3]]
+        model = {
+            'catalog': 'any catalog',
+            'entity_id': 'a',
+            'fields': MockEntity.specs(),
+            'all_fields': MockEntity.specs()
+        }
+        chunks = list(parquet_entities(entities, model))
+
+        # One chunk per row group and a last chunk with the footer
+        self.assertEqual(len(chunks), 3)
+
+        parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(b"".join(chunks)))
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        self.assertEqual(parquet_file.read().to_pydict(), {
+            'a': ['a', 'a', 'a'],
+            'b': [1, None, 3],
+            'c_bronwaarde': [None, None, None],
+            'd': [datetime.date(2020, 1, 2)] * 3,
+            'ref': ['a', 'a', 'a'],
+        })
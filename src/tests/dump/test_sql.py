@@ -2,8 +2,13 @@ from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
 from gobapi.dump.sql import _create_table, _create_schema, _import_csv, sql_entities, get_max_eventid, \
-    delete_entities_with_source_ids, _quoted_tablename, _insert_into_table, _delete_table, _create_indexes, _create_index, to_sql_string_value, \
+    _quoted_tablename, _insert_into_table, _delete_table, _create_indexes, _create_index, to_sql_string_value, \
     get_count
+from gobapi.dump.sql import _create_sync_ids_table, _copy_into_sync_ids_table, _analyze_sync_ids_table, \
+    _delete_sync_ids_table, not_in_sync_ids, _analyze_table, _get_dependent_views, _swap_table, \
+    _create_view, _lock_table
+from gobapi.dump.sql import delete_staged_entities, _create_checkpoints_table, _save_checkpoint, _get_checkpoint, \
+    _delete_checkpoint
 from gobapi.dump.config import REFERENCE_FIELDS
 
 
@@ -143,6 +148,70 @@ class TestSQL(TestCase):
         result = _create_index('schema', 'collection', 'field', 'method')
         self.assertEqual('\nCREATE INDEX IF NOT EXISTS collection_field ON "schema"."collection" USING method (field)\n', result)
 
+    def test_analyze_table(self):
+        result = _analyze_table('schema', 'collection')
+        self.assertEqual('ANALYZE "schema"."collection"', result)
+
+    def test_lock_table(self):
+        result = _lock_table('schema', 'collection')
+        self.assertEqual('LOCK TABLE "schema"."collection" IN ACCESS EXCLUSIVE MODE', result)
+
+    def test_get_dependent_views(self):
+        result = _get_dependent_views('schema', 'collection')
+        self.assertIn("WITH RECURSIVE dependant(oid, depth) AS", result)
+        self.assertIn("SELECT to_regclass('\"schema\".\"collection\"')::oid, 0", result)
+        self.assertIn("FROM aclexplode(view.relacl) acl", result)
+        self.assertIn("ORDER BY dependants.depth", result)
+
+    def test_create_view(self):
+        result = _create_view('schema', 'v_collection', 'SELECT 1;', 'owner', None, [])
+        self.assertEqual(result, ['CREATE VIEW "schema"."v_collection" AS SELECT 1',
+                                  'ALTER VIEW "schema"."v_collection" OWNER TO "owner"'])
+
+        grants = ['GRANT SELECT ON schema.v_collection TO PUBLIC']
+        result = _create_view('schema', 'v_collection', 'SELECT 1', 'owner', "Any 'comment'", grants)
+        self.assertEqual(result[2:], ['COMMENT ON VIEW "schema"."v_collection" IS \'Any \'\'comment\'\'\'',
+                                      'GRANT SELECT ON schema.v_collection TO PUBLIC'])
+
+    def test_swap_table(self):
+        views = [
+            ('schema', 'v_collection', 'SELECT 1;', 'owner', None, []),
+            ('other schema', 'v_v_collection', 'SELECT 2', 'owner', None, []),
+        ]
+        result = _swap_table('schema', 'tmp_collection', 'collection', ['field'], views)
+        self.assertEqual(result, 'DROP TABLE IF EXISTS "schema"."collection" CASCADE;\n'
+                                 'ALTER TABLE "schema"."tmp_collection" RENAME TO "collection";\n'
+                                 'ALTER INDEX IF EXISTS "schema".tmp_collection_field RENAME TO collection_field;\n'
+                                 'CREATE VIEW "schema"."v_collection" AS SELECT 1;\n'
+                                 'ALTER VIEW "schema"."v_collection" OWNER TO "owner";\n'
+                                 'CREATE VIEW "other schema"."v_v_collection" AS SELECT 2;\n'
+                                 'ALTER VIEW "other schema"."v_v_collection" OWNER TO "owner"')
+
+    def test_delete_staged_entities(self):
+        self.assertEqual(
+            'DELETE FROM "schema"."collection" USING "sync_ids" WHERE "sync_ids".sync_id = ref',
+            delete_staged_entities('schema', 'collection', 'ref')
+        )
+
+    def test_checkpoints(self):
+        self.assertIn('CREATE TABLE IF NOT EXISTS "schema"."dump_checkpoints"', _create_checkpoints_table('schema'))
+
+        result = _save_checkpoint('schema', 'collection', 'tmp_collection', "any definition", 123)
+        self.assertIn('INSERT INTO "schema"."dump_checkpoints" '
+                      '(table_name, staging_table_name, table_definition, last_event)\n'
+                      "VALUES ('collection', 'tmp_collection', 'any definition', 123)\n"
+                      "ON CONFLICT (table_name) DO UPDATE SET", result)
+
+        self.assertEqual(
+            'SELECT staging_table_name, table_definition, last_event FROM "schema"."dump_checkpoints" '
+            "WHERE table_name = 'collection'",
+            _get_checkpoint('schema', 'collection')
+        )
+        self.assertEqual(
+            'DELETE FROM "schema"."dump_checkpoints" WHERE table_name = \'collection\'',
+            _delete_checkpoint('schema', 'collection')
+        )
+
     def test_get_max_eventid(self):
         result = get_max_eventid('schema', 'collection')
         self.assertEqual('SELECT max(_last_event) FROM "schema"."collection"', result)
@@ -151,13 +220,12 @@ class TestSQL(TestCase):
         result = get_count('schema', 'collection')
         self.assertEqual('SELECT count(*) FROM "schema"."collection"', result)
 
-    def test_delete_entities_with_source_ids(self):
-        result = delete_entities_with_source_ids('schema', 'collection', ['source_id_a', 'source_id_b'])
-
-        self.assertEqual(
-            'DELETE FROM "schema"."collection" WHERE _source_id IN (\'source_id_a\',\'source_id_b\')',
-            result
-        )
+    def test_sync_ids_table(self):
+        self.assertIn('CREATE TEMPORARY TABLE "sync_ids" (sync_id character varying)', _create_sync_ids_table())
+        self.assertEqual('COPY "sync_ids" (sync_id) FROM STDIN DELIMITER \';\' CSV HEADER;', _copy_into_sync_ids_table())
+        self.assertEqual('ANALYZE "sync_ids"', _analyze_sync_ids_table())
+        self.assertEqual('DROP TABLE IF EXISTS "sync_ids"', _delete_sync_ids_table())
+        self.assertEqual('NOT EXISTS (SELECT 1 FROM "sync_ids" WHERE "sync_ids".sync_id = ref)', not_in_sync_ids('ref'))
 
     def test_quote_sql_string(self):
         result = to_sql_string_value("test")
@@ -1,11 +1,27 @@
+import itertools
+import queue
 import re
+import threading
 from unittest import TestCase
-from unittest.mock import MagicMock, patch, call, Mock
+from unittest.mock import MagicMock, patch, call, Mock, ANY
 
-from gobapi.dump.to_db import dump_to_db, DbDumper, _dump_relations, FIELD, MAX_SYNC_ITEMS
+from flask import Flask
+
+from gobapi.dump.to_db import dump_to_db, DbDumper, _dump_relations, FIELD, MAX_SYNC_ITEMS, _prefixed_lines, \
+    _LastEvents, _put, _run_dump
 from gobapi.dump.config import UNIQUE_REL_ID
 
 
+def yield_result(generator):
+    """Returns the yielded values and the return value of the given generator"""
+    values = []
+    while True:
+        try:
+            values.append(next(generator))
+        except StopIteration as e:
+            return values, e.value
+
+
 class MockStream():
 
     def __init__(self, *args):
@@ -115,22 +131,72 @@ class TestDbDumper(TestCase):
         db_dumper = self._get_dumper()
         db_dumper._execute = MagicMock()
         db_dumper.schema = 'schema'
-        db_dumper._copy_table_into('src_table', 'dst_table', [])
-        db_dumper._execute.assert_called_with(
+        db_dumper._copy_table_into('src_table', 'dst_table')
+        db_dumper._execute.assert_called_once_with(
             'INSERT INTO "schema"."dst_table" SELECT * FROM "schema"."src_table" '
         )
 
-        db_dumper._copy_table_into('src_table', 'dst_table', ['a', 'b'])
-        db_dumper._execute.assert_called_with(
-            'INSERT INTO "schema"."dst_table" SELECT * FROM "schema"."src_table" WHERE ref NOT IN (\'a\',\'b\')'
-        )
+        db_dumper._copy_table_into('src_table', 'dst_table', skip_sync_ids=True)
+        db_dumper._execute.assert_has_calls([
+            call('INSERT INTO "schema"."dst_table" SELECT * FROM "schema"."src_table" '
+                 'WHERE NOT EXISTS (SELECT 1 FROM "sync_ids" WHERE "sync_ids".sync_id = ref)'),
+            call('DROP TABLE IF EXISTS "sync_ids"'),
+        ])
 
         db_dumper.catalog_name = "rel"
-        db_dumper._copy_table_into('src_table', 'dst_table', ['a', 'b'])
-        db_dumper._execute.assert_called_with(
-            'INSERT INTO "schema"."dst_table" SELECT * FROM "schema"."src_table" WHERE CONCAT(src_ref, \'_\', dst_ref) NOT IN (\'a\',\'b\')'
+        db_dumper._copy_table_into('src_table', 'dst_table', skip_sync_ids=True)
+        db_dumper._execute.assert_any_call(
+            'INSERT INTO "schema"."dst_table" SELECT * FROM "schema"."src_table" '
+            'WHERE NOT EXISTS (SELECT 1 FROM "sync_ids" WHERE "sync_ids".sync_id = CONCAT(src_ref, \'_\', dst_ref))'
         )
 
+    def test_stage_sync_ids(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._execute = MagicMock()
+        mock_cursor = db_dumper.datastore.connection.cursor.return_value.__enter__.return_value
+        data = []
+        mock_cursor.copy_expert.side_effect = lambda sql, file, size: data.append(file.read(size))
+
+        result = db_dumper._stage_sync_ids(iter(['a', 'b"c']), 5)
+
+        mock_cursor.copy_expert.assert_called_once()
+        self.assertEqual(mock_cursor.copy_expert.call_args[1]['sql'],
+                         'COPY "sync_ids" (sync_id) FROM STDIN DELIMITER \';\' CSV HEADER;')
+        self.assertEqual(data, [b'sync_id\n"a"\n"b""c"\n'])
+        self.assertEqual(db_dumper._execute.call_args_list[-1], call('ANALYZE "sync_ids"'))
+        self.assertEqual(result, 2)
+
+        # At most max_count ids are staged
+        data.clear()
+        ids = iter(['a', 'b', 'c', 'd'])
+        result = db_dumper._stage_sync_ids(ids, 2)
+        self.assertEqual(data, [b'sync_id\n"a"\n"b"\n'])
+        self.assertEqual(result, 2)
+
+        # Without max_count all ids are staged
+        data.clear()
+        result = db_dumper._stage_sync_ids(iter(['a', 'b', 'c', 'd']))
+        self.assertEqual(data, [b'sync_id\n"a"\n"b"\n"c"\n"d"\n'])
+        self.assertEqual(result, 4)
+
+    @patch('gobapi.dump.to_db.stream_entity_refs_after')
+    def test_stage_source_ids_to_update(self, mock_stream_refs, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._stage_sync_ids = MagicMock(return_value=3)
+
+        result = db_dumper._stage_source_ids_to_update('any eventid')
+        self.assertEqual(result, 3)
+        mock_stream_refs.assert_called_with(db_dumper.catalog_name, db_dumper.collection_name, 'any eventid')
+        db_dumper._stage_sync_ids.assert_called_with(mock_stream_refs.return_value, MAX_SYNC_ITEMS + 1)
+        mock_stream_refs.return_value.close.assert_called_once()
+
+        # The stream is also closed on failure
+        mock_stream_refs.return_value.close.reset_mock()
+        db_dumper._stage_sync_ids.side_effect = Exception("any error")
+        with self.assertRaises(Exception):
+            db_dumper._stage_source_ids_to_update('any eventid')
+        mock_stream_refs.return_value.close.assert_called_once()
+
     @patch('gobapi.dump.to_db.get_max_eventid')
     def test_get_max_eventid(self, mock_max_eventid, mock_datastore_factory):
         mock_max_eventid.return_value = 'the maxeventid query'
@@ -255,9 +321,155 @@ class TestDbDumper(TestCase):
         db_dumper = self._get_dumper()
         db_dumper._execute = MagicMock()
         db_dumper._delete_table = MagicMock()
+        db_dumper._table_exists = MagicMock(return_value=True)
         db_dumper._delete_tmp_table()
 
         db_dumper._delete_table.assert_called_with(db_dumper.tmp_collection_name)
+        # The checkpoint of the tmp table is deleted
+        db_dumper._table_exists.assert_called_with('dump_checkpoints')
+        db_dumper._execute.assert_called_with(
+            'DELETE FROM "catalog_name"."dump_checkpoints" WHERE table_name = \'collection_name\'')
+
+        # The checkpoints table is not created when it does not exist
+        db_dumper._execute.reset_mock()
+        db_dumper._table_exists.return_value = False
+        db_dumper._delete_tmp_table()
+        db_dumper._execute.assert_not_called()
+
+    @patch('gobapi.dump.to_db._create_table')
+    def test_get_table_definition(self, mock_create_table, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        mock_create_table.return_value = "any definition"
+        self.assertEqual(db_dumper._get_table_definition(), "3d83034d49b4dd6c3d6849ec2047e5a7")
+        mock_create_table.assert_called_with(db_dumper.schema, self.catalog_name, self.collection_name,
+                                             db_dumper.model, tablename=db_dumper.tmp_collection_name)
+
+    def test_create_checkpoints_table(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._execute = MagicMock()
+        db_dumper.create_checkpoints_table()
+        self.assertIn('CREATE TABLE IF NOT EXISTS "catalog_name"."dump_checkpoints"',
+                      db_dumper._execute.call_args[0][0])
+        self.assertTrue(db_dumper.has_checkpoints_table)
+
+    def test_get_resumable_checkpoint(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._execute = MagicMock()
+        db_dumper._get_table_definition = MagicMock(return_value="any definition")
+        db_dumper._table_exists = MagicMock(return_value=True)
+
+        # No checkpoints table
+        db_dumper._table_exists.return_value = False
+        self.assertIsNone(db_dumper._get_resumable_checkpoint())
+        db_dumper._table_exists.assert_called_with('dump_checkpoints')
+        db_dumper._execute.assert_not_called()
+
+        # No checkpoint
+        db_dumper._table_exists.return_value = True
+        db_dumper._query = MagicMock(return_value=iter([]))
+        self.assertIsNone(db_dumper._get_resumable_checkpoint())
+
+        db_dumper._query = MagicMock(side_effect=lambda query: iter([("tmp_collection_name", "any definition", 10)]))
+        self.assertEqual(db_dumper._get_resumable_checkpoint(), 10)
+        db_dumper._table_exists.assert_called_with("tmp_collection_name")
+
+        # The tmp table has been removed
+        db_dumper._table_exists.return_value = False
+        self.assertIsNone(db_dumper._get_resumable_checkpoint())
+
+        # The definition of the tmp table has changed
+        db_dumper._table_exists.return_value = True
+        db_dumper._get_table_definition.return_value = "any other definition"
+        self.assertIsNone(db_dumper._get_resumable_checkpoint())
+
+    @patch('gobapi.dump.to_db.stream_entity_refs_after')
+    def test_resume_dump(self, mock_stream_refs, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._execute = MagicMock()
+        db_dumper._dump_entities = MagicMock()
+        db_dumper._filter_last_events_lambda = MagicMock()
+        db_dumper._stage_sync_ids = MagicMock(return_value=5)
+
+        # Nothing to resume
+        db_dumper._get_resumable_checkpoint = MagicMock(return_value=None)
+        result = yield_result(db_dumper._resume_dump())
+        self.assertEqual(result, (["No dump to resume\n"], None))
+
+        # Resume from the checkpoint
+        db_dumper._get_resumable_checkpoint.return_value = 10
+        result = yield_result(db_dumper._resume_dump())
+        self.assertEqual(result, (["Resume dump from event 10, dump 5 items\n"], db_dumper._dump_entities.return_value))
+        mock_stream_refs.assert_called_with(self.catalog_name, self.collection_name, 9)
+        db_dumper._stage_sync_ids.assert_called_with(mock_stream_refs.return_value)
+        mock_stream_refs.return_value.close.assert_called_once()
+        db_dumper._execute.assert_has_calls([
+            call('DELETE FROM "catalog_name"."tmp_collection_name" USING "sync_ids" WHERE "sync_ids".sync_id = ref'),
+            call('DROP TABLE IF EXISTS "sync_ids"'),
+        ])
+        db_dumper._filter_last_events_lambda.assert_called_with(9)
+        db_dumper._dump_entities.assert_called_with(filter=db_dumper._filter_last_events_lambda.return_value)
+
+    @patch('gobapi.dump.to_db.MAX_SYNC_ITEMS', 2)
+    @patch('gobapi.dump.to_db.stream_entity_refs_after')
+    def test_resume_dump_more_than_max_sync_items(self, mock_stream_refs, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._execute = MagicMock()
+        db_dumper._dump_entities = MagicMock()
+        db_dumper._get_resumable_checkpoint = MagicMock(return_value=10)
+        mock_cursor = db_dumper.datastore.connection.cursor.return_value.__enter__.return_value
+        data = []
+        mock_cursor.copy_expert.side_effect = lambda sql, file, size: data.append(file.read(size))
+        mock_stream_refs.return_value = (ref for ref in ['a', 'b', 'c', 'd', 'e'])
+
+        # All rows that remain to be loaded are staged
+        messages, result = yield_result(db_dumper._resume_dump())
+        self.assertEqual(messages, ["Resume dump from event 10, dump 5 items\n"])
+        self.assertEqual(result, db_dumper._dump_entities.return_value)
+        self.assertEqual(data, [b'sync_id\n"a"\n"b"\n"c"\n"d"\n"e"\n'])
+
+    def test_dump_to_db_resume(self, mock_datastore_factory):
+        def resume_dump():
+            yield "resume"
+            return resumed
+
+        db_dumper = self._get_dumper_for_dump_to_db()
+        db_dumper._resume_dump = MagicMock(side_effect=resume_dump)
+        db_dumper._get_entities = MagicMock(side_effect=lambda full_dump: iter([]))
+        db_dumper._replace_table = MagicMock(return_value="")
+
+        # Resume the dump
+        resumed = ('entities', 'model')
+        list(db_dumper.dump_to_db(resume=True))
+        db_dumper._prepare_destination.assert_not_called()
+        db_dumper._get_entities.assert_not_called()
+        db_dumper._dump_entities_to_table.assert_called_with('entities', 'model')
+        db_dumper._replace_table.assert_called_with('model')
+
+        # No dump to resume
+        resumed = None
+        list(db_dumper.dump_to_db(resume=True))
+        db_dumper._prepare_destination.assert_called_once()
+        db_dumper._get_entities.assert_called_with(False)
+
+        # Resume is not requested
+        db_dumper._resume_dump.reset_mock()
+        list(db_dumper.dump_to_db())
+        db_dumper._resume_dump.assert_not_called()
+
+    def test_last_events(self, mock_datastore_factory):
+        entities = [type('Entity', (), {FIELD.LAST_EVENT: n * 10}) for n in range(1, 6)]
+        last_events = _LastEvents(iter(entities))
+        self.assertIsNone(last_events.get(0))
+
+        read = iter(last_events)
+        for _ in range(3):
+            next(read)
+        self.assertEqual(last_events.get(2), 20)
+        self.assertEqual(last_events.get(2), 20)
+        self.assertEqual(last_events.get(3), 30)
+        self.assertIsNone(last_events.get(4))
+        self.assertEqual(list(read), entities[3:])
+        self.assertEqual(last_events.get(5), 50)
 
     @patch('gobapi.dump.to_db._create_indexes')
     def test_create_indexes(self, mock_indexes, mock_datastore_factory):
@@ -286,9 +498,66 @@ class TestDbDumper(TestCase):
             }
         }
 
-        mock_indexes.return_value = [{'field': 'any field'}, {'field': 'any other field'}]
-        list(db_dumper._create_indexes(model))
-        self.assertEqual(db_dumper._execute.call_count, 2)
+        mock_indexes.return_value = [{'field': 'any field'}, {'field': 'any geo field', 'method': 'gist'}]
+        result = list(db_dumper._create_indexes(model))
+        self.assertEqual(result[0], "Create 2 indexes\n")
+        self.assertEqual(sorted(result[1:]), ["Created index on any field\n", "Created index on any geo field\n"])
+
+        # Every index is built on its own connection
+        datastore = mock_datastore_factory.get_datastore.return_value
+        self.assertEqual(datastore.execute.call_count, 2)
+        self.assertEqual(datastore.disconnect.call_count, 2)
+        db_dumper._execute.assert_not_called()
+
+    @patch('gobapi.dump.to_db.DUMP_INDEX_CONNECTIONS', 1)
+    @patch('gobapi.dump.to_db._create_index', lambda schema, collection, field, method="btree": f"{field} {method}")
+    @patch('gobapi.dump.to_db._create_indexes')
+    def test_create_indexes_order(self, mock_indexes, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        mock_indexes.return_value = [{'field': 'a'}, {'field': 'b', 'method': 'gist'}, {'field': 'c'}]
+
+        list(db_dumper._create_indexes({}))
+
+        # Spatial indexes are built first
+        datastore = mock_datastore_factory.get_datastore.return_value
+        self.assertEqual(datastore.execute.call_args_list, [call("b gist"), call("a btree"), call("c btree")])
+
+        # Any failure ends the index builds
+        datastore.execute.side_effect = Exception("any error")
+        with self.assertRaisesRegex(Exception, "any error"):
+            list(db_dumper._create_indexes({}))
+        datastore.disconnect.assert_called()
+
+    def test_analyze(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._execute = MagicMock()
+
+        list(db_dumper._analyze())
+        db_dumper._execute.assert_called_with('ANALYZE "catalog_name"."collection_name"')
+
+    @patch('gobapi.dump.to_db.Authority', MagicMock())
+    @patch('gobapi.dump.to_db.csv_entities',
+           lambda x, model, cols: itertools.chain(["header\n"], (f"{getattr(e, FIELD.LAST_EVENT)}\n" for e in x)))
+    @patch('gobapi.dump.to_db.STREAM_PER', 2)
+    @patch('gobapi.dump.to_db.COMMIT_PER', 4)
+    def test_dump_entities_to_table_checkpoints(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        db_dumper._get_table_definition = MagicMock(return_value="any definition")
+        mock_connection = db_dumper.datastore.connection
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.copy_expert.side_effect = lambda sql, file, size: file.read()
+
+        entities = [type('Entity', (), {FIELD.LAST_EVENT: n}) for n in range(1, 6)]
+        list(db_dumper._dump_entities_to_table(iter(entities), MagicMock()))
+
+        # The checkpoints table is created once, the checkpoints are saved for the committed rows
+        create_table, *checkpoints = [args[0][0] for args in mock_cursor.execute.call_args_list]
+        self.assertIn('CREATE TABLE IF NOT EXISTS "catalog_name"."dump_checkpoints"', create_table)
+        self.assertTrue(db_dumper.has_checkpoints_table)
+        self.assertEqual(len(checkpoints), 2)
+        self.assertIn("VALUES ('collection_name', 'tmp_collection_name', 'any definition', 4)", checkpoints[0])
+        self.assertIn("VALUES ('collection_name', 'tmp_collection_name', 'any definition', 5)", checkpoints[1])
+        self.assertEqual(mock_connection.commit.call_count, 2)
 
     @patch('gobapi.dump.to_db.CSVStream')
     @patch('gobapi.dump.to_db.Authority', MagicMock())
@@ -314,6 +583,130 @@ class TestDbDumper(TestCase):
             size=99,
         )
 
+    @patch('gobapi.dump.to_db.binary')
+    @patch('gobapi.dump.to_db.CSVStream')
+    @patch('gobapi.dump.to_db.csv_entities')
+    def test_get_copy_stream(self, mock_csv_entities, mock_stream, mock_binary, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        self.assertFalse(db_dumper.binary_copy)
+
+        stream, copy = db_dumper._get_copy_stream('entities', 'model', 'cols')
+        self.assertEqual(stream, mock_stream.return_value)
+        self.assertEqual(copy, "COPY catalog_name.tmp_collection_name FROM STDIN DELIMITER ';' CSV HEADER;")
+        mock_csv_entities.assert_called_with('entities', 'model', 'cols')
+
+        db_dumper = DbDumper(self.catalog_name, self.collection_name, {'db': {'drivername': 'postgres'}})
+        self.assertTrue(db_dumper.binary_copy)
+
+        stream, copy = db_dumper._get_copy_stream('entities', 'model', 'cols')
+        self.assertEqual(stream, mock_binary.BinaryStream.return_value)
+        self.assertEqual(copy, "COPY catalog_name.tmp_collection_name FROM STDIN WITH (FORMAT binary);")
+        mock_binary.binary_entities.assert_called_with('entities', 'model', 'cols')
+        mock_binary.is_supported.assert_called_with('model', 'cols')
+
+        # Fall back to CSV for unsupported models
+        mock_binary.is_supported.return_value = False
+        stream, copy = db_dumper._get_copy_stream('entities', 'model', 'cols')
+        self.assertEqual(stream, mock_stream.return_value)
+
+    def test_replace_table(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        self.assertFalse(db_dumper.table_swap)
+        db_dumper._create_indexes = MagicMock(return_value=iter([]))
+        db_dumper._analyze = MagicMock(return_value=iter([]))
+        db_dumper._copy_tmp_table = MagicMock(return_value=iter([]))
+        db_dumper._swap_tmp_table = MagicMock()
+        db_dumper._delete_checkpoint = MagicMock()
+
+        # Copy the tmp table into the collection table
+        list(db_dumper._replace_table('model'))
+        db_dumper._copy_tmp_table.assert_called_once()
+        db_dumper._create_indexes.assert_called_with('model')
+        db_dumper._analyze.assert_called_with()
+        db_dumper._swap_tmp_table.assert_not_called()
+
+        # Index the tmp table and swap it in to the collection table
+        db_dumper.table_swap = True
+        db_dumper._copy_tmp_table.reset_mock()
+
+        def swap_tmp_table(model):
+            yield "Swap"
+            return swapped
+
+        swapped = True
+        db_dumper._swap_tmp_table = MagicMock(side_effect=swap_tmp_table)
+        self.assertEqual(list(db_dumper._replace_table('model')), ["Swap"])
+        db_dumper._create_indexes.assert_called_with('model', db_dumper.tmp_collection_name)
+        db_dumper._analyze.assert_called_with(db_dumper.tmp_collection_name)
+        db_dumper._swap_tmp_table.assert_called_with('model')
+        db_dumper._delete_checkpoint.assert_called_once()
+        db_dumper._copy_tmp_table.assert_not_called()
+
+        # The collection table cannot be swapped, copy the tmp table
+        swapped = False
+        db_dumper._delete_checkpoint.reset_mock()
+        list(db_dumper._replace_table('model'))
+        db_dumper._copy_tmp_table.assert_called_once()
+        db_dumper._create_indexes.assert_called_with('model')
+        db_dumper._delete_checkpoint.assert_not_called()
+
+        db_dumper = DbDumper(self.catalog_name, self.collection_name, {'db': {'drivername': 'postgres'}})
+        self.assertTrue(db_dumper.table_swap)
+
+        with patch('gobapi.dump.to_db.DUMP_TABLE_SWAP', False):
+            db_dumper = DbDumper(self.catalog_name, self.collection_name, {'db': {'drivername': 'postgres'}})
+            self.assertFalse(db_dumper.table_swap)
+
+    def test_get_swappable_views(self, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        view = ('v', 'catalog_name', 'v_collection_name', ' SELECT 1;', 'owner', None, [])
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [view]
+
+        self.assertEqual(db_dumper._get_swappable_views(cursor), [view[1:]])
+        self.assertIn('to_regclass(\'"catalog_name"."collection_name"\')', cursor.execute.call_args[0][0])
+
+        # Materialized views are not recreated
+        cursor.fetchall.return_value = [view, ('m',) + view[1:]]
+        self.assertIsNone(db_dumper._get_swappable_views(cursor))
+
+    @patch('gobapi.dump.to_db._create_indexes')
+    def test_swap_tmp_table(self, mock_indexes, mock_datastore_factory):
+        db_dumper = self._get_dumper()
+        views = [('catalog_name', 'v_collection_name', ' SELECT 1;', 'owner', None, [])]
+        db_dumper._get_swappable_views = MagicMock(return_value=views)
+        mock_indexes.return_value = [{'field': 'ref'}]
+        mock_connection = db_dumper.datastore.connection
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+
+        result = yield_result(db_dumper._swap_tmp_table('model'))
+        self.assertEqual(result, (["Swap tmp_collection_name in to collection_name\n"], True))
+
+        # The views are read and the table is swapped in the same transaction, after the table has been locked
+        lock, swap = [args[0][0] for args in mock_cursor.execute.call_args_list]
+        self.assertEqual(lock, 'LOCK TABLE "catalog_name"."collection_name" IN ACCESS EXCLUSIVE MODE')
+        db_dumper._get_swappable_views.assert_called_with(mock_cursor)
+        self.assertEqual(swap,
+            'DROP TABLE IF EXISTS "catalog_name"."collection_name" CASCADE;\n'
+            'ALTER TABLE "catalog_name"."tmp_collection_name" RENAME TO "collection_name";\n'
+            'ALTER INDEX IF EXISTS "catalog_name".tmp_collection_name_ref RENAME TO collection_name_ref;\n'
+            'ALTER INDEX IF EXISTS "catalog_name".tmp_collection_name_pkey RENAME TO collection_name_pkey;\n'
+            'CREATE VIEW "catalog_name"."v_collection_name" AS  SELECT 1;\n'
+            'ALTER VIEW "catalog_name"."v_collection_name" OWNER TO "owner"'
+        )
+        mock_connection.commit.assert_called_once()
+        mock_connection.rollback.assert_not_called()
+
+        # Materialized views depend on the table, the lock is released and the table is not swapped
+        mock_cursor.execute.reset_mock()
+        mock_connection.commit.reset_mock()
+        db_dumper._get_swappable_views.return_value = None
+        result = yield_result(db_dumper._swap_tmp_table('model'))
+        self.assertEqual(result, (["Materialized views depend on collection_name, copy instead of swap\n"], False))
+        self.assertEqual(mock_cursor.execute.call_count, 1)
+        mock_connection.rollback.assert_called_once()
+        mock_connection.commit.assert_not_called()
+
     @patch('gobapi.dump.to_db.CSVStream', MockStream)
     @patch('gobapi.dump.to_db.Authority', MagicMock())
     @patch('gobapi.dump.to_db.csv_entities', lambda x, model, cols : x)
@@ -339,7 +732,7 @@ class TestDbDumper(TestCase):
         results = list(db_dumper._dump_entities_to_table(entities, model))
 
         # Suppressed columns are passed to csv entities.
-        mock_csv_entities.assert_called_with(entities, model, mock_authority().get_suppressed_columns())
+        mock_csv_entities.assert_called_with(ANY, model, mock_authority().get_suppressed_columns())
 
     def test_filter_last_events_lambda(self, mock_datastore_factory):
         db_dumper = self._get_dumper()
@@ -355,6 +748,7 @@ class TestDbDumper(TestCase):
         db_dumper._dump_entities_to_table = MagicMock(return_value="")
         db_dumper._copy_tmp_table = MagicMock(return_value="")
         db_dumper._create_indexes = MagicMock(return_value="")
+        db_dumper._analyze = MagicMock(return_value="")
         db_dumper._copy_table_into = MagicMock()
         db_dumper._delete_dst_entities = MagicMock()
         db_dumper._max_eventid_src = MagicMock(return_value=None)
@@ -471,15 +865,14 @@ class TestDbDumper(TestCase):
                                               order_by=FIELD.LAST_EVENT)
 
     @patch('gobapi.dump.to_db.dump_entities')
-    @patch('gobapi.dump.to_db.get_entity_refs_after')
-    def test_dump_to_db_partial(self, mock_get_entity_refs, mock_dump_entities, mock_datastore_factory):
+    def test_dump_to_db_partial(self, mock_dump_entities, mock_datastore_factory):
         mock_dump_entities.return_value = [], {}
 
-        # New entities are available
-        mock_get_entity_refs.return_value = ['ref1', 'ref2', 'ref3']
-
         db_dumper = self._get_dumper_for_dump_to_db()
 
+        # New entities are available
+        db_dumper._stage_source_ids_to_update = MagicMock(return_value=3)
+
         # Database scheme has not changed
         db_dumper._table_columns_equal = MagicMock(return_value=True)
 
@@ -492,20 +885,20 @@ class TestDbDumper(TestCase):
         result = list(db_dumper.dump_to_db())
         # Database scheme is compared
         db_dumper._table_columns_equal.assert_called_with(db_dumper.collection_name, db_dumper.tmp_collection_name)
-        db_dumper._copy_table_into.assert_called_with(db_dumper.collection_name, db_dumper.tmp_collection_name, ['ref1', 'ref2', 'ref3'])
+        db_dumper._stage_source_ids_to_update.assert_called_with(4)
+        db_dumper._copy_table_into.assert_called_with(db_dumper.collection_name, db_dumper.tmp_collection_name,
+                                                      skip_sync_ids=True)
 
         mock_dump_entities.assert_called_with(db_dumper.catalog_name, db_dumper.collection_name,
                                               filter=db_dumper._filter_last_events_lambda.return_value,
                                               order_by=FIELD.LAST_EVENT)
 
     @patch('gobapi.dump.to_db.dump_entities')
-    @patch('gobapi.dump.to_db.get_entity_refs_after')
-    def test_dump_to_db_partial_no_source_ids_to_update(self, mock_get_entity_refs, mock_dump_entities,
-                                                        mock_datastore_factory):
+    def test_dump_to_db_partial_no_source_ids_to_update(self, mock_dump_entities, mock_datastore_factory):
         mock_dump_entities.return_value = [], {}
-        mock_get_entity_refs.return_value = []
 
         db_dumper = self._get_dumper_for_dump_to_db()
+        db_dumper._stage_source_ids_to_update = MagicMock(return_value=0)
         db_dumper._table_columns_equal = MagicMock(return_value=True)
         db_dumper._max_eventid_src = MagicMock(return_value='MAX_EVENTID')
         db_dumper._max_eventid_dst = MagicMock(return_value='MAX_EVENTID')
@@ -646,17 +1039,15 @@ left join (
 
         dst_max_eventid = 'any eventid'
 
-        source_ids_to_update = ['any source id'] * (MAX_SYNC_ITEMS + 1)
-        list(db_dumper._sync_dump(dst_max_eventid, source_ids_to_update))
+        list(db_dumper._sync_dump(dst_max_eventid, MAX_SYNC_ITEMS + 1))
         db_dumper._copy_table_into.assert_not_called()
         db_dumper._dump_entities.assert_called_with(filter=None)
 
-        source_ids_to_update = ['any source id'] * MAX_SYNC_ITEMS
-        list(db_dumper._sync_dump(dst_max_eventid, source_ids_to_update))
+        list(db_dumper._sync_dump(dst_max_eventid, MAX_SYNC_ITEMS))
         db_dumper._copy_table_into.assert_called_with(
             db_dumper.collection_name,
             db_dumper.tmp_collection_name,
-            source_ids_to_update)
+            skip_sync_ids=True)
         db_dumper._dump_entities.assert_called_with(filter=db_dumper._filter_last_events_lambda.return_value)
 
     @patch('gobapi.dump.to_db.get_src_count')
@@ -672,8 +1063,7 @@ left join (
         db_dumper._count_dst()
         mock_get_count.assert_called_with('catalog', 'collection')
 
-    @patch('gobapi.dump.to_db.get_entity_refs_after')
-    def test_dump_scenarios(self, mock_get_entity_refs_after, mock_datastore_factory):
+    def test_dump_scenarios(self, mock_datastore_factory):
         def mock_dump(*args):
             yield "dump"
             return None, None
@@ -686,6 +1076,8 @@ left join (
             db_dumper._dump_entities_to_table = MagicMock()
             db_dumper._copy_tmp_table = MagicMock()
             db_dumper._create_indexes = MagicMock()
+            db_dumper._analyze = MagicMock()
+            db_dumper._stage_source_ids_to_update = MagicMock(return_value=2)
 
         db_dumper = DbDumper('catalog', 'collection', {'db': {}})
         mock_actions()
@@ -743,7 +1135,6 @@ left join (
         db_dumper._max_eventid_src = MagicMock(return_value=10)
         db_dumper._max_eventid_dst = MagicMock(return_value=9)
         db_dumper._table_columns_equal = MagicMock(return_value=True)
-        mock_get_entity_refs_after.return_value = [1, 2]
         list(db_dumper.dump_to_db())
         db_dumper._full_dump.assert_not_called()
         db_dumper._sync_dump.assert_called()
@@ -755,7 +1146,7 @@ left join (
         db_dumper._table_columns_equal = MagicMock(return_value=True)
         db_dumper._count_src = MagicMock(return_value=100)
         db_dumper._count_dst = MagicMock(return_value=90)
-        mock_get_entity_refs_after.return_value = None
+        db_dumper._stage_source_ids_to_update.return_value = 0
         list(db_dumper.dump_to_db())
         db_dumper._full_dump.assert_called()
         db_dumper._sync_dump.assert_not_called()
@@ -767,7 +1158,7 @@ left join (
         db_dumper._table_columns_equal = MagicMock(return_value=True)
         db_dumper._count_src = MagicMock(return_value=100)
         db_dumper._count_dst = MagicMock(return_value=100)
-        mock_get_entity_refs_after.return_value = None
+        db_dumper._stage_source_ids_to_update.return_value = 0
         list(db_dumper.dump_to_db())
         db_dumper._full_dump.assert_not_called()
         db_dumper._sync_dump.assert_not_called()
@@ -798,7 +1189,7 @@ class TestModuleFunctions(TestCase):
         list(_dump_relations('catalog_name', 'collection_name', config))
 
         mock_dumper.assert_called_once_with('rel', 'rel1', config)
-        mock_dumper.return_value.dump_to_db.assert_called_once_with(full_dump=False)
+        mock_dumper.return_value.dump_to_db.assert_called_once_with(full_dump=False, resume=False)
 
         config = {'force_full': True}
         mock_dumper.reset_mock()
@@ -806,7 +1197,92 @@ class TestModuleFunctions(TestCase):
         list(_dump_relations('catalog_name', 'collection_name', config))
 
         mock_dumper.assert_called_once_with('rel', 'rel1', config)
-        mock_dumper.return_value.dump_to_db.assert_called_once_with(full_dump=True)
+        mock_dumper.return_value.dump_to_db.assert_called_once_with(full_dump=True, resume=False)
+
+    @patch('gobapi.dump.to_db.get_table_and_model')
+    @patch('gobapi.dump.to_db.get_relation_name', lambda m, cat, col, rel: rel)
+    @patch('gobapi.dump.to_db.SKIP_RELATIONS', ['rel3'])
+    @patch('gobapi.dump.to_db.DUMP_RELATION_THREADS', 2)
+    def test_dump_relations_concurrently(self, mock_get_table_model, mock_dumper):
+        mock_get_table_model.return_value = 'something', \
+                                            {'references': {'rel1': {}, 'rel2': {}, 'rel3': {}}}
+        mock_dumper.return_value.dump_to_db.side_effect = \
+            lambda full_dump, resume: iter(["Do full dump\n", ".", "\nExported 1 rows\n"])
+
+        with Flask(__name__).test_request_context():
+            result = list(_dump_relations('catalog_name', 'collection_name', {}))
+
+        self.assertEqual(result[0], "Skipping catalog_name collection_name rel3\n")
+        for rel in ['rel1', 'rel2']:
+            lines = [line for line in result if f"{rel}: " in line]
+            self.assertEqual(lines, [
+                f"{rel}: Export catalog_name collection_name {rel}\n",
+                f"{rel}: Do full dump\n",
+                f"{rel}: .",
+                f"\n{rel}: Exported 1 rows\n",
+            ])
+        # The checkpoints table is created once, before the dumps start
+        mock_dumper.return_value.create_checkpoints_table.assert_called_once()
+        mock_dumper.assert_has_calls([call('rel', 'rel1', {'schema': 'catalog_name'}),
+                                      call('rel', 'rel2', {'schema': 'catalog_name'})], any_order=True)
+
+        # An exception in any relation dump ends the dump
+        mock_dumper.return_value.dump_to_db.side_effect = Exception("any error")
+        with self.assertRaisesRegex(Exception, "any error"):
+            list(_dump_relations('catalog_name', 'collection_name', {}))
+
+        # The dumps are stopped when the output is no longer read
+        mock_dumper.return_value.dump_to_db.side_effect = lambda full_dump, resume: itertools.repeat("line\n")
+        with patch('gobapi.dump.to_db.OUTPUT_QUEUE_SIZE', 1), patch('gobapi.dump.to_db.OUTPUT_PUT_TIMEOUT', 0.01):
+            result = _dump_relations('catalog_name', 'collection_name', {})
+            self.assertEqual(next(result), "Skipping catalog_name collection_name rel3\n")
+            next(result)
+            result.close()
+
+    @patch('gobapi.dump.to_db.OUTPUT_PUT_TIMEOUT', 0)
+    def test_put(self, mock_dumper):
+        output = queue.Queue(maxsize=1)
+        stop = threading.Event()
+        self.assertTrue(_put(output, "a", stop))
+        self.assertEqual(output.get(), "a")
+
+        # Wait while the queue is full
+        output.put("b")
+        stop.is_set = MagicMock(side_effect=[False, False, True])
+        self.assertFalse(_put(output, "c", stop))
+        self.assertEqual(stop.is_set.call_count, 3)
+
+        # Stop
+        stop = threading.Event()
+        stop.set()
+        self.assertFalse(_put(queue.Queue(), "a", stop))
+
+    @patch('gobapi.dump.to_db._put')
+    def test_run_dump(self, mock_put, mock_dumper):
+        mock_put.return_value = True
+        _run_dump("x", iter(["a\n", "b\n"]), "output", "stop")
+        mock_put.assert_has_calls([call("output", "x: a\n", "stop"),
+                                   call("output", "x: b\n", "stop"),
+                                   call("output", None, "stop")])
+
+        # The dump ends when its output is no longer read
+        mock_put.reset_mock()
+        mock_put.return_value = False
+        _run_dump("x", iter(["a\n", "b\n"]), "output", "stop")
+        mock_put.assert_has_calls([call("output", "x: a\n", "stop"), call("output", None, "stop")])
+        self.assertEqual(mock_put.call_count, 2)
+
+    def test_prefixed_lines(self, mock_dumper):
+        results = ["Export data", "...", "\nx: 100,000", "..", "\n", "a\nb", "c\n\nd\n", ""]
+        self.assertEqual(list(_prefixed_lines(iter(results), "x: ")), [
+            "x: Export data",
+            "...",
+            "\nx: 100,000",
+            "..",
+            "\n",
+            "x: a\nx: b",
+            "c\n\nx: d\n",
+        ])
 
     @patch('gobapi.dump.to_db._dump_relations')
     def test_dump_to_db(self, mock_dump_relations, mock_dumper):
@@ -816,7 +1292,7 @@ class TestModuleFunctions(TestCase):
         list(dump_to_db('catalog_name', 'collection_name', config))
 
         mock_dumper.assert_called_with('catalog_name', 'collection_name', config)
-        mock_dumper().dump_to_db.assert_called_with(full_dump=False)
+        mock_dumper().dump_to_db.assert_called_with(full_dump=False, resume=False)
         mock_dump_relations.assert_called_with('catalog_name', 'collection_name', config)
         mock_dumper.return_value.create_utility_view.assert_called_once()
 
@@ -824,7 +1300,7 @@ class TestModuleFunctions(TestCase):
         config['include_relations'] = False
         config['force_full'] = True
         list(dump_to_db('catalog_name', 'collection_name', config))
-        mock_dumper().dump_to_db.assert_called_with(full_dump=True)
+        mock_dumper().dump_to_db.assert_called_with(full_dump=True, resume=False)
         mock_dump_relations.assert_not_called()
 
         # Assert create_utility_view not called for 'rel' dumps
@@ -527,6 +527,7 @@ class TestGraphQLStreamingResponseBuilder(TestCase):
         }, builder._get_requested_sourcevalues())
 
     @patch("gobapi.graphql_streaming.response.dict_to_camelcase", lambda x: x)
+    @patch("gobapi.utils.STREAM_CHUNK_SIZE", 0)
     @patch("gobapi.graphql_streaming.response.stream_response", lambda x: 'streamed_' + x)
     def test_iter(self):
         builder = self.get_instance()
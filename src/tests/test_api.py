@@ -7,7 +7,7 @@ As it is a unit test all external dependencies are mocked
 import importlib
 import json
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 from gobapi.api import _collection, _reference_collection, _clear_tests
 
@@ -89,7 +89,8 @@ class MockGOBModel:
         return {}
 
 
-def mock_entities(catalog, collection, offset, limit, view=None, reference_name=None, src_id=None):
+def mock_entities(catalog, collection, offset, limit, view=None, reference_name=None, src_id=None, count='true',
+                  fields=None):
     global entities
 
     return entities, len(entities)
@@ -141,7 +142,8 @@ def before_each_api_test(monkeypatch):
 
     monkeypatch.setattr(gobapi.storage, 'connect', noop)
     monkeypatch.setattr(gobapi.storage, 'get_entities', mock_entities)
-    monkeypatch.setattr(gobapi.storage, 'get_entity', lambda catalog, collection, id, view=None: entity)
+    monkeypatch.setattr(gobapi.storage, 'get_entity', lambda catalog, collection, id, view=None, fields=None: entity)
+    monkeypatch.setattr(gobapi.storage, 'entity_exists', lambda catalog, collection, id: entity is not None)
 
     monkeypatch.setattr(gobapi.states, 'get_states', lambda collections, offset, limit: ([{'id': '1', 'attribute': 'attribute'}], 1))
 
@@ -234,6 +236,25 @@ def test_entities(monkeypatch):
     assert(_entities('catalog', 'collection', 1, 1) == ({'page_size': 1, 'pages': 0, 'results': [], 'total_count': 0}, {'next': None, 'previous': None}))
 
 
+def test_entities_without_count(monkeypatch):
+    global collection
+
+    before_each_api_test(monkeypatch)
+
+    import gobapi.api
+    monkeypatch.setattr(gobapi.api, 'get_entities', lambda *args, **kwargs: ([{'id': 1}], None))
+    monkeypatch.setattr(gobapi.api, 'get_page_ref',
+                        lambda page, num_pages: f'path?page={page}' if 1 <= page <= num_pages else None)
+
+    from gobapi.api import _entities
+    collection = 'collection'
+    mockRequest.args = {}
+    # Without count always show next page unless no results are returned
+    assert(_entities('catalog', 'collection', 1, 1, count='false') == (
+        {'page_size': 1, 'pages': 2, 'results': [{'id': 1}], 'total_count': None},
+        {'next': 'path?page=2', 'previous': None}))
+
+
 def test_entities_with_view(monkeypatch):
     global collection, views
 
@@ -244,6 +265,25 @@ def test_entities_with_view(monkeypatch):
     assert(_entities('catalog', 'collection', 1, 1, 'enhanced') == ({'page_size': 1, 'pages': 1, 'results': [], 'total_count': 0}, {'next': None, 'previous': None}))
 
 
+def test_entities_after(monkeypatch):
+    global collection
+
+    before_each_api_test(monkeypatch)
+
+    import gobapi.api
+    monkeypatch.setattr(gobapi.api, 'get_entities_after',
+                        lambda catalog, collection, after, limit, fields: ([{'id': 1}], 7))
+    monkeypatch.setattr(gobapi.api, 'get_cursor_ref', lambda cursor: f'after={cursor}')
+
+    from gobapi.api import _entities_after
+    from gobapi.response import encode_cursor
+
+    collection = 'collection'
+    assert(_entities_after('catalog', 'collection', None, 1) == (
+        {'page_size': 1, 'results': [{'id': 1}]},
+        {'next': f'after={encode_cursor(7)}'}))
+
+
 def test_reference_entities(monkeypatch):
     global collection
 
@@ -347,6 +387,109 @@ def test_collection(monkeypatch):
         ), 200, {'Content-Type': 'application/json'}))
 
 
+@patch('gobapi.api.hal_response', lambda data, links: (data, links))
+@patch('gobapi.api.bad_request', lambda msg: msg)
+class TestCollectionAfter(TestCase):
+
+    @patch('gobapi.api._entities_after')
+    def test_collection_after(self, mock_entities_after):
+        from gobapi.api import _collection_after
+        from gobapi.response import encode_cursor
+
+        mock_entities_after.return_value = 'result', 'links'
+        self.assertEqual(('result', 'links'), _collection_after('cat', 'col', encode_cursor(10), 5, None))
+        mock_entities_after.assert_called_with('cat', 'col', 10, 5, None)
+
+        # Empty cursor, start at first entity
+        _collection_after('cat', 'col', '', 5, None, ['naam'])
+        mock_entities_after.assert_called_with('cat', 'col', None, 5, ['naam'])
+
+        self.assertEqual("Invalid cursor 'abc'", _collection_after('cat', 'col', 'abc', 5, None))
+        self.assertEqual('Cursor pagination is not supported for views',
+                         _collection_after('cat', 'col', 'abc', 5, 'view'))
+
+    @patch('gobapi.api.request', mockRequest)
+    @patch('gobapi.api.GOBModel')
+    @patch('gobapi.api._collection_after')
+    def test_collection(self, mock_collection_after, mock_gobmodel):
+        mockRequest.args = {'after': 'cursor', 'page_size': 10}
+        self.assertEqual(mock_collection_after.return_value, _collection('cat', 'col'))
+        mock_collection_after.assert_called_with('cat', 'col', 'cursor', 10, None, None)
+        mockRequest.args = {}
+
+    @patch('gobapi.api.request', mockRequest)
+    @patch('gobapi.api.GOBModel')
+    @patch('gobapi.api._entities')
+    def test_collection_count(self, mock_entities, mock_gobmodel):
+        mockRequest.args = {'count': 'any count'}
+        self.assertEqual("Invalid count 'any count', use one of true, estimate, false", _collection('cat', 'col'))
+        mock_entities.assert_not_called()
+
+        mock_entities.return_value = 'result', 'links'
+        mockRequest.args = {'count': 'estimate'}
+        self.assertEqual(('result', 'links'), _collection('cat', 'col'))
+        mock_entities.assert_called_with('cat', 'col', 1, 100, None, 'estimate', None)
+        mockRequest.args = {}
+
+
+@patch('gobapi.api.request', mockRequest)
+@patch('gobapi.api.bad_request', lambda msg: msg)
+class TestFields(TestCase):
+
+    @patch('gobapi.api.get_response_fields')
+    def test_fields(self, mock_get_response_fields):
+        from gobapi.api import _fields
+
+        mock_get_response_fields.return_value = {'identificatie', 'ligt_in_buurt'}
+
+        mockRequest.args = {}
+        self.assertIsNone(_fields('cat', 'col'))
+
+        mockRequest.args = {'fields': 'identificatie, ligtInBuurt,'}
+        self.assertEqual(['identificatie', 'ligt_in_buurt'], _fields('cat', 'col'))
+        mock_get_response_fields.assert_called_with('cat', 'col', False)
+
+        self.assertEqual(['identificatie', 'ligt_in_buurt'], _fields('cat', 'col', entity=True))
+        mock_get_response_fields.assert_called_with('cat', 'col', True)
+
+        with self.assertRaisesRegex(ValueError, 'Unknown field\\(s\\) naam'):
+            mockRequest.args = {'fields': 'identificatie,naam'}
+            _fields('cat', 'col')
+
+        with self.assertRaisesRegex(ValueError, 'not supported for views'):
+            _fields('cat', 'col', 'view')
+
+        mockRequest.args = {}
+
+    @patch('gobapi.api.GOBModel')
+    @patch('gobapi.api._fields')
+    @patch('gobapi.api._paged_collection')
+    def test_collection(self, mock_paged_collection, mock_fields, mock_gobmodel):
+        mockRequest.args = {}
+        mock_fields.return_value = ['identificatie']
+        self.assertEqual(mock_paged_collection.return_value, _collection('cat', 'col'))
+        mock_paged_collection.assert_called_with('cat', 'col', None, ['identificatie'])
+
+        mock_fields.side_effect = ValueError('Unknown field(s) naam')
+        self.assertEqual('Unknown field(s) naam', _collection('cat', 'col'))
+
+    @patch('gobapi.api.GOBModel')
+    @patch('gobapi.api._fields')
+    @patch('gobapi.api.get_entity')
+    def test_entity(self, mock_get_entity, mock_fields, mock_gobmodel):
+        from gobapi.api import _entity
+
+        mockRequest.args = {}
+        mock_fields.return_value = ['identificatie']
+        mock_get_entity.return_value = None
+        _entity('cat', 'col', '1')
+        mock_get_entity.assert_called_with('cat', 'col', '1', None, ['identificatie'])
+        mock_fields.assert_called_with('cat', 'col', None, entity=True)
+
+        mock_fields.side_effect = ValueError('Unknown field(s) naam')
+        self.assertEqual('Unknown field(s) naam', _entity('cat', 'col', '1'))
+
+
 def test_collection_with_view(monkeypatch):
     global mockRequest
     global catalog, collection
@@ -420,6 +563,14 @@ def test_reference_collection(monkeypatch):
              'previous': None}
         ), 200, {'Content-Type': 'application/json'}))
 
+    # Cursor pagination is not available for references
+    import gobapi.api
+    monkeypatch.setattr(gobapi.api, 'bad_request', lambda msg: msg)
+    mockRequest.args = {'after': ''}
+    assert(_reference_collection('catalog', 'collection', '1234', 'reference') ==
+           'Cursor pagination is not supported for reference collections')
+    mockRequest.args = {}
+
 
 def test_states(monkeypatch):
     global mockRequest
@@ -464,6 +615,7 @@ def test_wsgi(monkeypatch):
 
 
 @patch('gobapi.api.WorkerResponse.stream_with_context', lambda f, mimetype: f)
+@patch('gobapi.api.streaming_query', lambda query: ('streaming', query))
 class TestStreams(TestCase):
 
     @patch('gobapi.api.request', mockRequest)
@@ -473,13 +625,14 @@ class TestStreams(TestCase):
     @patch('gobapi.api.GOBModel')
     def test_collection(self, mock_gobmodel, mock_query, mock_stream, mock_ndjson):
         mock_gobmodel = MockGOBModel
-        mock_query.side_effect = lambda cat, col, view: ([], lambda e: e)
+        mock_query.side_effect = lambda cat, col, view, fields: ([], lambda e: e)
 
         mockRequest.args = {
             'stream': 'true'
         }
         result = _collection('catalog', 'collection')
         mock_stream.assert_called()
+        self.assertEqual(('streaming', []), mock_stream.call_args[0][0])
 
         mockRequest.args = {
             'ndjson': 'true'
@@ -491,7 +644,7 @@ class TestStreams(TestCase):
     @patch('gobapi.api.ndjson_entities')
     @patch('gobapi.api.stream_entities')
     @patch('gobapi.api.query_reference_entities')
-    @patch('gobapi.api.get_entity')
+    @patch('gobapi.api.entity_exists')
     @patch('gobapi.api.GOBModel')
     def test_reference_collection(self, mock_gobmodel, mock_entity, mock_query, mock_stream, mock_ndjson):
         mock_gobmodel = MockGOBModel
@@ -504,6 +657,7 @@ class TestStreams(TestCase):
         }
         result = _reference_collection('catalog', 'collection', 'reference', '1234')
         mock_stream.assert_called()
+        self.assertEqual(('streaming', []), mock_stream.call_args[0][0])
 
         mockRequest.args = {
             'ndjson': 'true'
@@ -511,6 +665,74 @@ class TestStreams(TestCase):
         result = _reference_collection('catalog', 'collection', 'reference', '1234')
         mock_ndjson.assert_called()
 
+@patch('gobapi.api.request', mockRequest)
+@patch('gobapi.api.WorkerResponse.is_worker_request', lambda: False)
+class TestETagRoute(TestCase):
+
+    @patch('gobapi.api.GOBModel')
+    @patch('gobapi.api.get_version')
+    @patch('gobapi.api.get_etag')
+    @patch('gobapi.api.is_not_modified')
+    @patch('gobapi.api.add_etag')
+    @patch('gobapi.api.response_cache')
+    def test_etag_route(self, mock_cache, mock_add_etag, mock_is_not_modified, mock_get_etag, mock_get_version,
+                        mock_gobmodel):
+        from gobapi.api import _etag_route
+
+        func = MagicMock()
+        func.__name__ = 'func'
+        wrapped = _etag_route(func)
+        self.assertEqual('func', wrapped.__name__)
+
+        mockRequest.args = {}
+        mock_is_not_modified.return_value = False
+        mock_cache.get.return_value = None
+        result = wrapped(catalog_name='cat', collection_name='col')
+        self.assertEqual(mock_add_etag.return_value, result)
+        mock_get_version.assert_called_with('cat', 'col')
+        mock_get_etag.assert_called_with(mock_get_version.return_value)
+        func.assert_called_with(catalog_name='cat', collection_name='col')
+        mock_add_etag.assert_called_with(func.return_value, mock_get_etag.return_value)
+        mock_cache.get.assert_called_with('cat', 'col', mock_get_version.return_value, mock_get_etag.return_value)
+        mock_cache.put.assert_called_with('cat', 'col', mock_get_etag.return_value, func.return_value)
+
+        # Cached response, the endpoint is not executed
+        func.reset_mock()
+        mock_cache.get.return_value = 'cached response'
+        wrapped(catalog_name='cat', collection_name='col')
+        mock_add_etag.assert_called_with('cached response', mock_get_etag.return_value)
+        func.assert_not_called()
+
+        # Not modified, the endpoint is not executed
+        func.reset_mock()
+        mock_is_not_modified.return_value = True
+        result = wrapped(catalog_name='cat', collection_name='col')
+        self.assertEqual(('', 304, {'ETag': f'W/"{mock_get_etag.return_value}"'}), result)
+        func.assert_not_called()
+
+        # Views are not validated
+        mockRequest.args = {'view': 'any view'}
+        self.assertEqual(func.return_value, wrapped(catalog_name='cat', collection_name='col'))
+
+        # Neither are unknown collections
+        mockRequest.args = {}
+        mock_gobmodel.return_value.get_collection.return_value = None
+        self.assertEqual(func.return_value, wrapped(catalog_name='cat', collection_name='col'))
+
+
+class TestAttributeNames(TestCase):
+
+    @patch('gobapi.api.GOBModel')
+    def test_attribute_names(self, mock_gobmodel):
+        from gobapi.api import _attribute_names
+
+        mock_gobmodel.return_value.get_catalogs.return_value = {'cat1': {}, 'cat2': {}}
+        mock_gobmodel.return_value.get_collections.side_effect = lambda catalog_name: {
+            'col': {'fields': {f'{catalog_name}_attr': {}, 'attr': {}}}
+        }
+        self.assertEqual({'cat1_attr', 'cat2_attr', 'attr'}, _attribute_names())
+
+
 class TestClearTest(TestCase):
 
     @patch("gobapi.api.clear_test_dbs")
@@ -0,0 +1,90 @@
+import gzip
+import os
+import tempfile
+import zlib
+
+from unittest import TestCase, mock
+
+from flask import Flask
+
+from gobapi import compression
+
+app = Flask(__name__)
+
+
+class TestCompression(TestCase):
+
+    @mock.patch("gobapi.compression.zstandard", None)
+    def test_get_encoding(self):
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip, deflate, zstd'}):
+            self.assertEqual(compression.get_encoding(), 'gzip')
+
+            with mock.patch("gobapi.compression.STREAM_COMPRESSION_LEVEL", 0):
+                self.assertIsNone(compression.get_encoding())
+
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip;q=0'}):
+            self.assertIsNone(compression.get_encoding())
+
+        with app.test_request_context():
+            self.assertIsNone(compression.get_encoding())
+
+    @mock.patch("gobapi.compression.zstandard", mock.MagicMock())
+    def test_get_encodings(self):
+        self.assertEqual(compression.get_encodings(), ['zstd', 'gzip'])
+
+    def test_accepts(self):
+        with app.test_request_context(headers={'Accept-Encoding': 'gzip, zstd;q=0'}):
+            self.assertTrue(compression.accepts('gzip'))
+            self.assertFalse(compression.accepts('zstd'))
+
+    def test_compress(self):
+        result = b"".join(compression.compress(["abc", b"def", "\n"], compression.GZIP))
+        self.assertEqual(gzip.decompress(result), b"abcdef\n")
+
+    def test_compress_flush(self):
+        result = compression.compress(iter(["abc", "", "progress\n"]), compression.GZIP)
+
+        # Each chunk can be decompressed as soon as it is received
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(next(result)), b"abc")
+        self.assertEqual(decompressor.decompress(next(result)), b"progress\n")
+        self.assertEqual(decompressor.decompress(next(result)), b"")
+        self.assertTrue(decompressor.eof)
+
+    def test_compress_exception(self):
+        def chunks():
+            yield "abc"
+            yield "GOB_API_ERROR\n"
+            raise Exception()
+
+        result = []
+        with self.assertRaises(Exception):
+            for chunk in compression.compress(chunks(), compression.GZIP):
+                result.append(chunk)
+
+        # The compressed data is flushed before the Exception is re-raised
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(b"".join(result)), b"abcGOB_API_ERROR\n")
+
+    @mock.patch("gobapi.compression.zstandard")
+    def test_compress_zstd(self, mock_zstandard):
+        compressor = mock_zstandard.ZstdCompressor.return_value.compressobj.return_value
+        compressor.compress.side_effect = lambda data: data
+        compressor.flush.side_effect = lambda mode=None: b" block" if mode else b" end"
+        result = list(compression.compress(["abc", ""], compression.ZSTD))
+        self.assertEqual(result, [b"abc block", b" end"])
+        mock_zstandard.ZstdCompressor.assert_called_with(level=compression.STREAM_COMPRESSION_LEVEL)
+        compressor.flush.assert_any_call(mock_zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as dir:
+            filename = os.path.join(dir, "any file")
+
+            with compression.open_file(filename, False) as f:
+                f.write(b"abc\n")
+            self.assertFalse(compression.is_compressed_file(filename))
+
+            with compression.open_file(filename, True) as f:
+                f.write(b"abc\n")
+            self.assertTrue(compression.is_compressed_file(filename))
+            self.assertEqual(list(compression.decompress_file(filename)), [b"abc\n"])
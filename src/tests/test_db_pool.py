@@ -0,0 +1,72 @@
+from unittest import TestCase, mock
+
+from flask import Flask
+
+from gobapi.db_pool import activate, get_route_class, get_statement_timeout, _set_statement_timeout, get_status, \
+    INTERACTIVE, STREAMING, DUMP
+
+app = Flask(__name__)
+
+
+class TestDBPool(TestCase):
+
+    @mock.patch("gobapi.db_pool.event")
+    @mock.patch("gobapi.db_pool._set_statement_timeout")
+    @mock.patch("gobapi.db_pool.get_statement_timeout", lambda: 100)
+    def test_activate(self, mock_set_statement_timeout, mock_event):
+        listeners = {}
+        mock_event.listens_for.side_effect = lambda engine, name: lambda f: listeners.setdefault(name, f)
+
+        activate('any engine')
+        mock_event.listens_for.assert_called_with('any engine', 'checkout')
+
+        record = type('MockRecord', (), {'info': {}})
+        listeners['checkout']('any connection', record, 'any proxy')
+        mock_set_statement_timeout.assert_called_with('any connection', record.info, 100)
+
+    def test_get_route_class(self):
+        self.assertIsNone(get_route_class())
+
+        for path, expected_class in [
+            ('/gob/meetbouten/metingen/', INTERACTIVE),
+            ('/gob/meetbouten/metingen/?stream=true', STREAMING),
+            ('/gob/meetbouten/metingen/?ndjson=true', STREAMING),
+            ('/gob/graphql/streaming/', STREAMING),
+            ('/gob/dump/meetbouten/metingen/?format=csv', DUMP),
+        ]:
+            with app.test_request_context(path):
+                self.assertEqual(expected_class, get_route_class())
+
+    @mock.patch("gobapi.db_pool.STATEMENT_TIMEOUTS", {INTERACTIVE: 100, DUMP: 200})
+    def test_get_statement_timeout(self):
+        self.assertEqual(0, get_statement_timeout())
+
+        with app.test_request_context('/gob/meetbouten/metingen/'):
+            self.assertEqual(100, get_statement_timeout())
+
+        with app.test_request_context('/gob/graphql/streaming/'):
+            self.assertEqual(0, get_statement_timeout())
+
+    def test_set_statement_timeout(self):
+        connection = mock.MagicMock()
+        info = {}
+
+        _set_statement_timeout(connection, info, 100)
+        connection.cursor.return_value.execute.assert_called_with("SET statement_timeout = 100")
+        connection.commit.assert_called()
+        self.assertEqual(100, info['statement_timeout'])
+
+        # Only set when changed
+        connection.reset_mock()
+        _set_statement_timeout(connection, info, 100)
+        connection.cursor.assert_not_called()
+
+        _set_statement_timeout(connection, info, 0)
+        connection.cursor.return_value.execute.assert_called_with("SET statement_timeout = 0")
+
+    def test_get_status(self):
+        engine = mock.MagicMock()
+        engine.pool.size.return_value = 5
+        status = get_status(engine)
+        self.assertEqual(5, status['size'])
+        self.assertEqual(engine.pool.status.return_value, status['status'])
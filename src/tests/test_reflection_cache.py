@@ -0,0 +1,226 @@
+import os
+import pickle
+import tempfile
+
+from unittest import TestCase, mock
+
+from gobapi.reflection_cache import get_metadata, _get_fingerprint, _get_filename, _load, _build, _lock, \
+    _is_stale, _is_running, _remove, _wait, _write, _reflect, _SCHEMA_FINGERPRINT
+
+
+class TestReflectionCache(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.dir.name, "cache.pickle")
+        self.lock_filename = f"{self.filename}.lock"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    @mock.patch("gobapi.reflection_cache._get_fingerprint", lambda engine: "fingerprint")
+    @mock.patch("gobapi.reflection_cache._get_filename", lambda fingerprint: f"filename_{fingerprint}")
+    @mock.patch("gobapi.reflection_cache._wait")
+    @mock.patch("gobapi.reflection_cache._build")
+    @mock.patch("gobapi.reflection_cache._lock")
+    @mock.patch("gobapi.reflection_cache._load")
+    def test_get_metadata(self, mock_load, mock_lock, mock_build, mock_wait):
+        engine = mock.MagicMock()
+
+        # Cache file exists
+        metadata = get_metadata(engine)
+        mock_load.assert_called_with("filename_fingerprint")
+        self.assertEqual(mock_load.return_value, metadata)
+        self.assertEqual(engine, metadata.bind)
+        mock_lock.assert_not_called()
+
+        # Cache file does not exist, build it
+        mock_load.return_value = None
+        mock_lock.return_value = True
+        metadata = get_metadata(engine)
+        self.assertEqual(mock_build.return_value, metadata)
+        self.assertEqual(engine, metadata.bind)
+        mock_build.assert_called_with(engine, "filename_fingerprint")
+        mock_wait.assert_not_called()
+
+        # Cache file is being built by another process, wait for it
+        mock_lock.return_value = False
+        metadata = get_metadata(engine)
+        self.assertEqual(mock_wait.return_value, metadata)
+        mock_wait.assert_called_with("filename_fingerprint")
+
+        # The other process failed, build it
+        mock_build.reset_mock()
+        mock_lock.side_effect = [False, True]
+        mock_wait.return_value = None
+        metadata = get_metadata(engine)
+        self.assertEqual(mock_build.return_value, metadata)
+
+    @mock.patch("gobapi.reflection_cache._get_fingerprint", lambda engine: "fingerprint")
+    @mock.patch("gobapi.reflection_cache.REFLECTION_CACHE_DIR", "/proc/any/dir")
+    @mock.patch("gobapi.reflection_cache._reflect")
+    def test_get_metadata_without_cache(self, mock_reflect):
+        # An unusable cache directory falls back to plain reflection
+        engine = mock.MagicMock()
+        metadata = get_metadata(engine)
+        self.assertEqual(mock_reflect.return_value, metadata)
+        self.assertEqual(engine, metadata.bind)
+        mock_reflect.assert_called_with(engine)
+
+    def test_get_fingerprint(self):
+        engine = mock.MagicMock()
+        engine.execute.return_value.scalar.return_value = "schema fingerprint"
+        fingerprint = _get_fingerprint(engine)
+        self.assertEqual(fingerprint, _get_fingerprint(engine))
+
+        engine.execute.return_value.scalar.return_value = "other schema fingerprint"
+        self.assertNotEqual(fingerprint, _get_fingerprint(engine))
+
+        # Constraints and indexes are part of the fingerprint
+        for source in ["information_schema.columns", "information_schema.table_constraints",
+                       "information_schema.key_column_usage", "pg_indexes"]:
+            self.assertIn(source, _SCHEMA_FINGERPRINT)
+
+    @mock.patch("gobapi.reflection_cache.REFLECTION_CACHE_DIR", "/dir")
+    def test_get_filename(self):
+        self.assertEqual("/dir/gobapi_reflection_abc.pickle", _get_filename("abc"))
+
+    def test_load(self):
+        self.assertIsNone(_load(self.filename))
+
+        with open(self.filename, "wb") as f:
+            pickle.dump({"any": "metadata"}, f)
+        os.chmod(self.filename, 0o600)
+        self.assertEqual({"any": "metadata"}, _load(self.filename))
+
+        # Files that can be written by others are not read
+        os.chmod(self.filename, 0o666)
+        self.assertIsNone(_load(self.filename))
+
+        with mock.patch("gobapi.reflection_cache.os.getuid", lambda: -1):
+            os.chmod(self.filename, 0o600)
+            self.assertIsNone(_load(self.filename))
+
+        with open(self.filename, "w") as f:
+            f.write("corrupt")
+        self.assertIsNone(_load(self.filename))
+
+    def test_remove(self):
+        open(self.filename, "w").close()
+        _remove(self.filename)
+        self.assertFalse(os.path.exists(self.filename))
+
+        # Missing files are ignored
+        _remove(self.filename)
+
+    @mock.patch("gobapi.reflection_cache.os.kill")
+    def test_is_running(self, mock_kill):
+        self.assertTrue(_is_running(123))
+        mock_kill.assert_called_with(123, 0)
+
+        mock_kill.side_effect = PermissionError
+        self.assertTrue(_is_running(123))
+
+        mock_kill.side_effect = ProcessLookupError
+        self.assertFalse(_is_running(123))
+
+    @mock.patch("gobapi.reflection_cache._is_running")
+    def test_is_stale(self, mock_is_running):
+        self.assertFalse(_is_stale(self.lock_filename))
+
+        with open(self.lock_filename, "w") as f:
+            f.write("123")
+        mock_is_running.return_value = True
+        self.assertFalse(_is_stale(self.lock_filename))
+        mock_is_running.assert_called_with(123)
+
+        # Process has gone
+        mock_is_running.return_value = False
+        self.assertTrue(_is_stale(self.lock_filename))
+
+        # Lock without pid
+        open(self.lock_filename, "w").close()
+        self.assertFalse(_is_stale(self.lock_filename))
+
+        # Lock held for too long
+        os.utime(self.lock_filename, (0, 0))
+        self.assertTrue(_is_stale(self.lock_filename))
+
+    @mock.patch("gobapi.reflection_cache._is_stale")
+    def test_lock(self, mock_is_stale):
+        mock_is_stale.return_value = False
+        with mock.patch("gobapi.reflection_cache.REFLECTION_CACHE_DIR", self.dir.name):
+            self.assertTrue(_lock(self.filename))
+            with open(self.lock_filename) as f:
+                self.assertEqual(str(os.getpid()), f.read())
+
+            # Already locked
+            self.assertFalse(_lock(self.filename))
+
+            # Stale lock is removed
+            mock_is_stale.return_value = True
+            self.assertTrue(_lock(self.filename))
+
+    @mock.patch("gobapi.reflection_cache._LOCK_POLL_INTERVAL", 0)
+    @mock.patch("gobapi.reflection_cache._load")
+    @mock.patch("gobapi.reflection_cache._is_stale")
+    @mock.patch("gobapi.reflection_cache.time.sleep")
+    def test_wait(self, mock_sleep, mock_is_stale, mock_load):
+        mock_is_stale.return_value = False
+
+        # No lock
+        self.assertEqual(mock_load.return_value, _wait(self.filename))
+        mock_load.assert_called_with(self.filename)
+        mock_sleep.assert_not_called()
+
+        # Wait until the lock is released
+        open(self.lock_filename, "w").close()
+        mock_sleep.side_effect = lambda seconds: os.remove(self.lock_filename)
+        self.assertEqual(mock_load.return_value, _wait(self.filename))
+        self.assertEqual(1, mock_sleep.call_count)
+
+        # Stale lock
+        open(self.lock_filename, "w").close()
+        mock_is_stale.return_value = True
+        self.assertEqual(mock_load.return_value, _wait(self.filename))
+        self.assertEqual(1, mock_sleep.call_count)
+
+    @mock.patch("gobapi.reflection_cache.pickle")
+    def test_write(self, mock_pickle):
+        mock_pickle.dump.side_effect = lambda metadata, f: f.write(b"metadata")
+
+        _write("any metadata", self.filename)
+        with open(self.filename, "rb") as f:
+            self.assertEqual(b"metadata", f.read())
+        self.assertEqual(0o600, os.stat(self.filename).st_mode & 0o777)
+        self.assertEqual(["cache.pickle"], os.listdir(self.dir.name))
+
+        # Failure removes the temporary file
+        os.remove(self.filename)
+        mock_pickle.dump.side_effect = Exception("any error")
+        _write("any metadata", self.filename)
+        self.assertEqual([], os.listdir(self.dir.name))
+
+    @mock.patch("gobapi.reflection_cache._write")
+    @mock.patch("gobapi.reflection_cache._reflect")
+    def test_build(self, mock_reflect, mock_write):
+        engine = mock.MagicMock()
+        open(self.lock_filename, "w").close()
+
+        self.assertEqual(mock_reflect.return_value, _build(engine, self.filename))
+        mock_reflect.assert_called_with(engine)
+        mock_write.assert_called_with(mock_reflect.return_value, self.filename)
+        self.assertFalse(os.path.exists(self.lock_filename))
+
+        # Failure releases the lock
+        open(self.lock_filename, "w").close()
+        mock_reflect.side_effect = Exception("any error")
+        with self.assertRaises(Exception):
+            _build(engine, self.filename)
+        self.assertFalse(os.path.exists(self.lock_filename))
+
+    @mock.patch("gobapi.reflection_cache.MetaData")
+    def test_reflect(self, mock_metadata):
+        engine = mock.MagicMock()
+        self.assertEqual(mock_metadata.return_value, _reflect(engine))
+        mock_metadata.return_value.reflect.assert_called_with(engine)
@@ -53,6 +53,96 @@ def test_page_ref(monkeypatch):
     assert(get_page_ref(1, 10) == 'path?arg=value&page=1')
 
 
+def test_cursor_ref(monkeypatch):
+    before_each_response_test(monkeypatch)
+
+    from gobapi.response import get_cursor_ref
+    MockRequest.args = {'arg': 'value', 'page': 2}
+    assert(get_cursor_ref(None) == None)
+    assert(get_cursor_ref('cursor') == 'path?arg=value&after=cursor')
+    MockRequest.args = {'arg': 'value'}
+
+
+def test_encode_decode_cursor():
+    from gobapi.response import encode_cursor, decode_cursor
+    assert(encode_cursor(None) == None)
+    assert(decode_cursor(None) == None)
+    assert(decode_cursor('') == None)
+    assert(decode_cursor(encode_cursor(12345)) == 12345)
+
+    for invalid_cursor in ['abc', encode_cursor('abc')]:
+        try:
+            decode_cursor(invalid_cursor)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_bad_request(monkeypatch):
+    before_each_response_test(monkeypatch)
+
+    from gobapi.response import bad_request
+
+    assert(bad_request('msg') == ('{"error": 400, "text": "msg"}', 400, {'Content-Type': 'application/json'}))
+
+
+def test_etag(monkeypatch):
+    before_each_response_test(monkeypatch)
+
+    from gobapi.response import get_etag, REQUEST_ROLES
+    MockRequest.args = {'b': '2', 'a': '1'}
+    MockRequest.headers = {REQUEST_ROLES: 'role1,role2'}
+    etag = get_etag((1, 2))
+    assert(etag == get_etag([1, 2]))
+
+    # Equal for any order of arguments and roles
+    MockRequest.args = {'a': '1', 'b': '2'}
+    MockRequest.headers = {REQUEST_ROLES: 'role2,role1'}
+    assert(etag == get_etag((1, 2)))
+
+    # Different for any other version, arguments, roles or path
+    assert(etag != get_etag((1, 3)))
+    MockRequest.headers = {}
+    assert(etag != get_etag((1, 2)))
+    MockRequest.args = {'a': '1'}
+    assert(etag != get_etag((1, 2)))
+
+    MockRequest.args = {'arg': 'value'}
+    del MockRequest.headers
+
+
+def test_not_modified(monkeypatch):
+    before_each_response_test(monkeypatch)
+
+    from gobapi.response import not_modified, is_not_modified
+    assert(not_modified('etag') == ('', 304, {'ETag': 'W/"etag"'}))
+
+    MockRequest.if_none_match = type('MockETags', (), {'contains_weak': lambda self, etag: etag == 'etag'})()
+    assert(is_not_modified('etag'))
+    assert(not is_not_modified('other etag'))
+    del MockRequest.if_none_match
+
+
+def test_add_etag():
+    from gobapi.response import add_etag
+
+    assert(add_etag(('body', 200, {'h': 'v'}), 'etag') == ('body', 200, {'h': 'v', 'ETag': 'W/"etag"'}))
+    assert(add_etag(('body', 404, {'h': 'v'}), 'etag') == ('body', 404, {'h': 'v'}))
+
+    class MockResponse:
+        status_code = 200
+        set_etag = lambda self, etag, weak: setattr(self, 'etag', (etag, weak))
+
+    response = MockResponse()
+    assert(add_etag(response, 'etag') == response)
+    assert(response.etag == ('etag', True))
+
+    response = MockResponse()
+    response.status_code = 400
+    add_etag(response, 'etag')
+    assert(not hasattr(response, 'etag'))
+
+
 def test_hal_response(monkeypatch):
     before_each_response_test(monkeypatch)
 
@@ -189,6 +279,7 @@ class TestStream(TestCase):
         result = stream_response({"some_key1": "some_data1", "some_key2": [JSON('{"some_key3": "some_data3"}')]})
         self.assertEqual(result, '{"someKey1": "some_data1", "someKey2": [{"someKey3": "some_data3"}]}')
 
+    @patch('gobapi.utils.STREAM_CHUNK_SIZE', 0)
     @patch('gobapi.response.stream_response')
     def test_stream_entities(self, mock_response):
         mock_response.side_effect = lambda r: str(r)
@@ -200,6 +291,7 @@ class TestStream(TestCase):
         expected_result = ['['] + [json.dumps(entities[0])] + [',' + json.dumps(ent) for ent in entities[1:]] + [']\n', '\n']
         self.assertEqual(expected_result, result)
 
+    @patch('gobapi.utils.STREAM_CHUNK_SIZE', 0)
     @patch('gobapi.response.stream_response')
     def test_ndjson_entities(self, mock_response):
         mock_response.side_effect = lambda r: str(r)
@@ -0,0 +1,80 @@
+from unittest import TestCase, mock
+
+import gobapi.response_cache as response_cache
+
+
+def response(body, status=200):
+    return body, status, {'Content-Type': 'application/json'}
+
+
+@mock.patch("gobapi.response_cache.RESPONSE_CACHE_SIZE", 10)
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        response_cache.clear()
+
+    def test_get_put(self):
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag'))
+
+        response_cache.put('cat', 'col', 'etag', response('abc'))
+        self.assertEqual(response('abc'), response_cache.get('cat', 'col', 1, 'etag'))
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'other etag'))
+        self.assertIsNone(response_cache.get('cat', 'other col', 1, 'etag'))
+
+    def test_put_unsuccessful_or_large(self):
+        response_cache.get('cat', 'col', 1, 'etag')
+
+        response_cache.put('cat', 'col', 'etag', response('abc', 404))
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag'))
+
+        response_cache.put('cat', 'col', 'etag', 'any streaming response')
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag'))
+
+        response_cache.put('cat', 'col', 'etag', response('abcdefghijk'))
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag'))
+
+        # The size is the encoded size of the body
+        response_cache.put('cat', 'col', 'etag', response('€€€€'))
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag'))
+
+        response_cache.put('cat', 'col', 'etag', response('€€€'))
+        self.assertEqual(9, response_cache._size)
+
+        response_cache.put('cat', 'col', 'etag', response(b'abc'))
+        self.assertEqual(3, response_cache._size)
+
+    def test_invalidate(self):
+        response_cache.get('cat', 'col', 1, 'etag')
+        response_cache.put('cat', 'col', 'etag', response('abc'))
+        response_cache.get('cat', 'col2', 1, 'etag')
+        response_cache.put('cat', 'col2', 'etag', response('def'))
+
+        # New version, all responses for the collection are removed
+        self.assertIsNone(response_cache.get('cat', 'col', 2, 'etag'))
+        self.assertEqual(3, response_cache._size)
+        self.assertEqual(response('def'), response_cache.get('cat', 'col2', 1, 'etag'))
+
+        # Responses that are put after invalidation are not cached
+        response_cache._collections.pop(('cat', 'col'))
+        response_cache.put('cat', 'col', 'etag', response('abc'))
+        self.assertEqual(3, response_cache._size)
+
+    def test_lru(self):
+        for etag in ['etag1', 'etag2', 'etag3']:
+            response_cache.get('cat', 'col', 1, etag)
+            response_cache.put('cat', 'col', etag, response('abcd'))
+
+        # etag1 is least recently used
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag1'))
+        self.assertEqual(8, response_cache._size)
+
+        # Use etag2, etag3 is least recently used
+        response_cache.get('cat', 'col', 1, 'etag2')
+        response_cache.put('cat', 'col', 'etag1', response('abcd'))
+        self.assertIsNone(response_cache.get('cat', 'col', 1, 'etag3'))
+        self.assertIsNotNone(response_cache.get('cat', 'col', 1, 'etag2'))
+        self.assertIsNotNone(response_cache.get('cat', 'col', 1, 'etag1'))
+
+        # Replace a cached response
+        response_cache.put('cat', 'col', 'etag1', response('ab'))
+        self.assertEqual(6, response_cache._size)
@@ -13,9 +13,12 @@ from unittest.mock import MagicMock
 
 from gobapi.storage import _get_convert_for_state, filter_deleted, connect, _format_reference, _get_table, \
     _to_gob_value, _add_resolve_attrs_to_columns, _get_convert_for_table, _add_relation_dates_to_manyreference, \
-    _flatten_join_result, get_entity_refs_after, dump_entities, get_max_eventid, exec_statement, \
-    _create_reference_link, _create_reference_view, _create_reference, _add_relations, _apply_filters, \
-    get_id_columns, clear_test_dbs, get_count
+    _flatten_join_result, stream_entity_refs_after, dump_entities, get_max_eventid, _get_convert_for_model, \
+    exec_statement, _create_reference_link, _create_reference_view, _add_relations, _apply_filters, \
+    get_id_columns, clear_test_dbs, get_count, get_entities_after, _get_convert_plan, _get_join_reference_names, \
+    _get_reference_formatter, _get_gobid, _get_total_count, _get_cached_count, _add_page_relations, \
+    _get_estimated_count, _load_fields, _get_relation_tables, _add_entity_relations, entity_exists, get_version, \
+    _query_relation, get_pool_status, streaming_query, get_response_fields, COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE
 from gobapi.auth.auth_query import AuthorizedQuery
 from gobcore.model import GOBModel
 from gobcore.model.metadata import FIELD
@@ -77,7 +80,7 @@ class MockClasses:
 
 
 class MockBase:
-    def prepare(self, engine, reflect):
+    def prepare(self, *args, **kwargs):
         return None
 
     classes = MockClasses()
@@ -169,7 +172,7 @@ class MockSession:
     def remove(self):
         self._remove = True
 
-def mock_create_engine(url):
+def mock_create_engine(url, **kwargs):
     return 'engine'
 
 
@@ -178,7 +181,7 @@ def mock_scoped_session(func=None):
     return MockSession(engine)
 
 
-def mock_automap_base():
+def mock_automap_base(**kwargs):
     return MockBase()
 
 
@@ -393,13 +396,22 @@ def before_each_storage_test(monkeypatch):
 
     monkeypatch.setattr(gobcore.model.relations, 'get_relation_name', lambda m, a, o, r: 'relation_name')
 
+    import gobapi.reflection_cache
+    monkeypatch.setattr(gobapi.reflection_cache, 'get_metadata', lambda engine: 'metadata')
+
+    import gobapi.db_pool
+    monkeypatch.setattr(gobapi.db_pool, 'activate', lambda engine: None)
+
     import gobapi.storage
     importlib.reload(gobapi.storage)
 
     monkeypatch.setattr(gobapi.storage, 'models', mock_models)
     monkeypatch.setattr(gobapi.storage, '_apply_filters', lambda e, f, t: e)
-    monkeypatch.setattr(gobapi.storage, '_format_reference', lambda ref, cat, col, spec: {'reference': ref})
-    monkeypatch.setattr(gobapi.storage, '_add_relations', lambda q, cat, col: q)
+    monkeypatch.setattr(gobapi.storage, '_format_reference', lambda ref, cat, col, spec, base_path=None: {'reference': ref})
+    monkeypatch.setattr(gobapi.storage, '_add_relations', lambda q, cat, col, fields=None: q)
+    monkeypatch.setattr(gobapi.storage, '_add_entity_relations', lambda e, cat, col, fields=None: e)
+    monkeypatch.setattr(gobapi.storage, '_add_page_relations', lambda es, cat, col, fields=None: es)
+    monkeypatch.setattr(gobapi.storage, '_get_cached_count', lambda q, cat, col: q.count())
 
     from gobapi.storage import connect
     connect()
@@ -626,12 +638,23 @@ class TestStorage(TestCase):
     @mock.patch("gobapi.storage.URL", mock.MagicMock())
     @mock.patch("gobapi.storage.scoped_session", mock.MagicMock())
     @mock.patch("gobapi.storage.sessionmaker")
-    @mock.patch("gobapi.storage.automap_base", mock.MagicMock())
-    @mock.patch("gobapi.storage.MetaData", mock.MagicMock())
+    @mock.patch("gobapi.storage.automap_base")
+    @mock.patch("gobapi.storage.reflection_cache")
+    @mock.patch("gobapi.storage.db_pool")
     @mock.patch("gobapi.storage.set_session", mock.MagicMock())
-    def test_connect_autocommit(self, mock_sessionmaker, mock_create_engine):
+    @mock.patch("gobapi.storage.GOB_DB_POOL", {'pool_size': 3})
+    def test_connect_autocommit(self, mock_db_pool, mock_reflection_cache, mock_automap_base, mock_sessionmaker,
+                                mock_create_engine):
         connect()
 
+        # The connection pool is configurable and statement timeouts are activated
+        mock_create_engine.assert_called_with(mock.ANY, pool_size=3)
+        mock_db_pool.activate.assert_called_with(mock_create_engine.return_value)
+
+        # Automap the cached reflection of the database
+        mock_reflection_cache.get_metadata.assert_called_with(mock_create_engine.return_value)
+        mock_automap_base.assert_called_with(metadata=mock_reflection_cache.get_metadata.return_value)
+
         # Autocommit should always be set to True, to avoid problems with auto-creation of transactions that block
         # other processes.
         mock_sessionmaker.assert_called_with(autocommit=True, autoflush=False, bind=mock_create_engine.return_value, query_cls=AuthorizedQuery)
@@ -843,10 +866,8 @@ class TestStorage(TestCase):
 
         self.assertEqual(result, expected_result)
 
-    @mock.patch("gobapi.storage.Base", MockEntity)
     def test_flatten_join_result(self):
         mock_entity = MockEntity()
-        mock_entity.some_attr = 'some value'
 
         result_dict = {
             'catalog_collection1': mock_entity,
@@ -854,60 +875,151 @@ class TestStorage(TestCase):
             'ref:relation_attr_name2': 'the bronwaardes list2',
         }
 
-        class MockResult():
-
-            def __getitem__(self, key):
-                return mock_entity
+        class MockResult(tuple):
 
             def _asdict(self):
                 return result_dict
 
-        mock_result = MockResult()
+        mock_result = MockResult(result_dict.values())
 
-        result = _flatten_join_result(mock_result)
+        reference_names = _get_join_reference_names(mock_result)
+        self.assertEqual([(1, 'relation_attr_name1'), (2, 'relation_attr_name2')], reference_names)
 
+        result = _flatten_join_result(mock_result, reference_names)
         self.assertEqual('the bronwaardes list1', getattr(result, 'relation_attr_name1'))
         self.assertEqual('the bronwaardes list2', getattr(result, 'relation_attr_name2'))
-        self.assertEqual('some value', getattr(result, 'some_attr'))
+
+    @mock.patch("gobapi.storage._convert_plans", new_callable=dict)
+    @mock.patch("gobapi.storage.get_gob_type_from_info")
+    def test_get_convert_plan(self, mock_get_gob_type, convert_plans):
+        model = {
+            'fields': {
+                'attr': {'type': 'GOB.String'},
+                '_private_attr': {'type': 'GOB.String'},
+                'hidden_attr': {'type': 'GOB.String', 'hidden': True},
+                'ref': {'type': 'GOB.Reference', 'ref': 'cat:col'},
+                'very_many_ref': {'type': 'GOB.VeryManyReference', 'ref': 'cat:col'},
+            },
+            'references': {
+                'ref': {'type': 'GOB.Reference', 'ref': 'cat:col'},
+                '_private_ref': {'type': 'GOB.Reference', 'ref': 'cat:col'},
+                'very_many_ref': {'type': 'GOB.ManyReference', 'ref': 'cat:col'},
+            },
+            'very_many_references': {
+                'very_many_ref': {'type': 'GOB.ManyReference', 'ref': 'cat:col'},
+            }
+        }
+        mock_get_gob_type.side_effect = lambda spec: spec['type']
+
+        plan = _get_convert_plan('catalog', 'collection', model)
+        self.assertEqual((('attr', 'GOB.String', {'type': 'GOB.String'}),), plan['attributes'])
+        self.assertEqual(['ref'], [k for k, _ in plan['references']])
+        self.assertEqual((('very_many_ref', 'very-many-ref'),), plan['very_many_references'])
+        self.assertEqual('/gob/catalog/collection/', plan['href'])
+
+        # Plans are cached
+        self.assertIs(plan, _get_convert_plan('catalog', 'collection', model))
+        mock_get_gob_type.reset_mock()
+        _get_convert_plan('catalog', 'collection', model)
+        mock_get_gob_type.assert_not_called()
+
+        plan = _get_convert_plan('catalog', 'collection', model, meta={'meta': {'type': 'GOB.Integer'}},
+                                 private_attributes=True)
+        self.assertEqual(['attr', '_private_attr', 'meta'], [k for k, _, _ in plan['attributes']])
+        self.assertEqual(['ref', '_private_ref'], [k for k, _ in plan['references']])
+
+        # Only the requested fields are converted
+        plan = _get_convert_plan('catalog', 'collection', model, fields=['ref', 'attr'])
+        self.assertEqual(['attr'], [k for k, _, _ in plan['attributes']])
+        self.assertEqual(['ref'], [k for k, _ in plan['references']])
+        self.assertEqual((), plan['very_many_references'])
+        self.assertEqual(plan, _get_convert_plan('catalog', 'collection', model, fields=['attr', 'ref']))
+
+        # Fields are selected from the cached plan
+        mock_get_gob_type.reset_mock()
+        _get_convert_plan('catalog', 'collection', model, fields=['attr'])
+        mock_get_gob_type.assert_not_called()
+        self.assertEqual(2, len(convert_plans))
+
+    @mock.patch("gobapi.storage.PUBLIC_META_FIELDS", {'_meta': {'type': 'GOB.Integer'}})
+    @mock.patch("gobapi.storage.GOBModel")
+    def test_get_response_fields(self, mock_gobmodel):
+        mock_gobmodel.return_value.get_collection.return_value = {
+            'fields': {
+                'attr': {'type': 'GOB.String'},
+                '_private_attr': {'type': 'GOB.String'},
+                'hidden_attr': {'type': 'GOB.String', 'hidden': True},
+                'ref': {'type': 'GOB.Reference', 'ref': 'cat:col'},
+                'very_many_ref': {'type': 'GOB.VeryManyReference', 'ref': 'cat:col'},
+            },
+            'references': {
+                'ref': {'type': 'GOB.Reference', 'ref': 'cat:col'},
+                '_private_ref': {'type': 'GOB.Reference', 'ref': 'cat:col'},
+                'very_many_ref': {'type': 'GOB.ManyReference', 'ref': 'cat:col'},
+            },
+            'very_many_references': {
+                'very_many_ref': {'type': 'GOB.ManyReference', 'ref': 'cat:col'},
+            }
+        }
+
+        self.assertEqual({'attr', 'ref', 'very_many_ref'}, get_response_fields('cat', 'col'))
+        mock_gobmodel.return_value.get_collection.assert_called_with('cat', 'col')
+
+        # Single entities also contain the private attributes and the public metadata
+        self.assertEqual({'attr', '_private_attr', 'ref', '_private_ref', 'very_many_ref', '_meta'},
+                         get_response_fields('cat', 'col', entity=True))
+
+    @mock.patch("gobapi.storage.load_only")
+    def test_load_fields(self, mock_load_only):
+        query = MagicMock()
+        self.assertEqual(query, _load_fields(query, 'any table', None))
+
+        table = type('MockTable', (), {'__table__': MagicMock()})
+        table.__table__.columns.keys.return_value = ['_id', '_gobid', 'attr', 'other_attr']
+        result = _load_fields(query, table, ['attr', 'ref'])
+        self.assertEqual(query.options.return_value, result)
+        query.options.assert_called_with(mock_load_only.return_value)
+        self.assertEqual(['_gobid', '_id', 'attr'], sorted(mock_load_only.call_args[0]))
+        result.set_loaded_columns.assert_called_with(list(mock_load_only.call_args[0]))
+
+    @mock.patch("gobapi.storage._format_reference")
+    def test_get_reference_formatter(self, mock_format_reference):
+        mock_format_reference.side_effect = lambda ref, cat, col, spec, base_path: (ref, cat, col, base_path)
+
+        self.assertEqual({}, _get_reference_formatter({'ref': None})('any value'))
+
+        format_references = _get_reference_formatter({'ref': 'cat:col'}, '/base')
+        self.assertEqual([], format_references(None))
+        self.assertEqual([('a', 'cat', 'col', '/base')], format_references(['a']))
+        self.assertEqual([({'a': 1}, 'cat', 'col', '/base')], format_references({'a': 1}))
 
     @mock.patch("gobapi.storage._Base", mock.MagicMock())
     @mock.patch("gobapi.storage.get_table_and_model")
     @mock.patch("gobapi.storage.get_session")
+    @mock.patch("gobapi.storage.streaming_query")
     @mock.patch("gobapi.storage.functions.concat", lambda *args: "".join(args))
-    def test_get_entity_refs_after(self, mock_get_session, mock_get_table_and_model):
-
-        table_no_seqnr = type('MockTableNoSeqnr', (object,), {'_id': '230', '_last_event': 2000})
-        table_seqnr = type('MockTableWithSeqnr', (object,), {'_id': '230', '_last_event': 2000, 'volgnummer': '2'})
-        mock_get_session.return_value.query.return_value.filter.return_value.all.return_value = [
-            ('id1',),
-            ('id2',),
-            ('id3',),
-        ]
+    def test_stream_entity_refs_after(self, mock_streaming_query, mock_get_session, mock_get_table_and_model):
+        table = type('MockTable', (object,), {'_id': '230', '_last_event': 2000})
+        mock_get_table_and_model.return_value = table, 'model'
+        mock_streaming_query.return_value = iter([('id1',), ('id2',)])
 
-        # First check query selection without volgnummer
-        mock_get_table_and_model.return_value = table_no_seqnr, 'model'
-        get_entity_refs_after('catalog', 'collection', 2920)
+        result = stream_entity_refs_after('catalog', 'collection', 1900)
+        # The refs are not queried before they are requested
+        mock_streaming_query.assert_not_called()
 
+        self.assertEqual(['id1', 'id2'], list(result))
+        query = mock_get_session.return_value.query.return_value.filter.return_value
+        mock_streaming_query.assert_called_with(query)
         mock_get_session.return_value.query.assert_called_with('230')
-
-        # Test query selection with volgnummer
-        mock_get_table_and_model.return_value = table_seqnr, 'model'
-        result = get_entity_refs_after('catalog', 'collection', 2920)
-
-        mock_get_session.return_value.query.assert_called_with('230_2')
-        self.assertEqual(['id1', 'id2', 'id3'], result)
-
-        # Test filter
-        mock_get_session.return_value.query.return_value.filter.assert_called_with(False)
-
-        get_entity_refs_after('catalog', 'collection', 1900)
         mock_get_session.return_value.query.return_value.filter.assert_called_with(True)
+        query.set_catalog_collection.assert_called_with('catalog', 'collection')
 
-        get_entity_refs_after('catalog', 'collection', 2000)
+        # Entities with states are referred to by id and volgnummer
+        table.volgnummer = '2'
+        list(stream_entity_refs_after('catalog', 'collection', 2000))
+        mock_get_session.return_value.query.assert_called_with('230_2')
         mock_get_session.return_value.query.return_value.filter.assert_called_with(False)
 
-        mock_get_table_and_model.assert_called_with('catalog', 'collection')
-
     @mock.patch("gobapi.storage._Base", mock.MagicMock())
     @mock.patch("gobapi.storage.get_table_and_model")
     @mock.patch("gobapi.storage.get_session")
@@ -1004,6 +1116,18 @@ class TestStorage(TestCase):
         mock_Authority.get_secure_type.assert_called_with("secure type", spec, None)
         mock_Authority.get_secured_value.assert_called_with("secure GOB type")
 
+    @mock.patch("gobapi.storage.STREAM_FETCH_SIZE", 123)
+    def test_streaming_query(self):
+        query = MagicMock()
+        self.assertEqual(query.yield_per.return_value, streaming_query(query))
+        query.yield_per.assert_called_with(123)
+
+    @mock.patch("gobapi.storage.session")
+    @mock.patch("gobapi.storage.db_pool")
+    def test_get_pool_status(self, mock_db_pool, mock_session):
+        self.assertEqual(mock_db_pool.get_status.return_value, get_pool_status())
+        mock_db_pool.get_status.assert_called_with(mock_session.get_bind.return_value)
+
     @mock.patch("gobapi.storage.session")
     def test_exec_statement(self, mock_session):
         mock_engine = mock.MagicMock()
@@ -1027,8 +1151,21 @@ class TestStorage(TestCase):
         mock_to_gob_value.assert_called_with('entity', 'field', {'ref': 'cat:col', 'type': 'GOB.ManyReference'})
         mock_format_reference.assert_called_with('c', 'cat', 'col', {})
 
-    def test_create_reference_nonref(self):
-        self.assertEqual({}, _create_reference({}, 'field', {'ref': None}))
+    @mock.patch("gobapi.storage._get_convert_plan")
+    @mock.patch("gobapi.storage._get_join_reference_names")
+    @mock.patch("gobapi.storage._flatten_join_result")
+    def test_get_convert_for_model_join_result(self, mock_flatten, mock_reference_names, mock_plan):
+        mock_plan.return_value = {'attributes': (), 'references': (), 'very_many_references': (), 'href': '/cat/col/'}
+        mock_reference_names.return_value = ['ref1']
+        mock_flatten.return_value = type('MockEntity', (), {'_id': 'id1'})
+
+        convert = _get_convert_for_model('cat', 'col', {})
+        self.assertEqual({'_links': {'self': {'href': '/cat/col/id1/'}}}, convert(('entity', 'ref1 value')))
+        convert(('entity', 'ref1 value'))
+
+        # The reference names are determined once
+        mock_reference_names.assert_called_once_with(('entity', 'ref1 value'))
+        mock_flatten.assert_called_with(('entity', 'ref1 value'), ['ref1'])
 
     @mock.patch("gobapi.storage.GOBModel")
     @mock.patch("gobapi.storage.get_table_and_model")
@@ -1102,7 +1239,8 @@ class TestStorage(TestCase):
         )
 
         # Filtered by _date_deleted
-        mock_session.query.return_value.filter.assert_called_with('(is_date_deleted_None AND (is_expiration_date_None OR greater than now))')
+        mock_session.query.return_value.filter.assert_called_with(
+            '(is_date_deleted_None AND (is_expiration_date_None OR greater than now))')
 
         # Grouped by rel table src id
         mock_session.query.return_value.filter.return_value.group_by.assert_called_with('rel table src id')
@@ -1117,6 +1255,140 @@ class TestStorage(TestCase):
         # Check the correct label is assigned for further processing in calling function
         mocked_subquery.c.source_values.label.assert_called_with('ref:reference1')
 
+        # With states the relations are grouped and joined by src id and volgnummer
+        mock_model.return_value.get_collection.return_value['has_states'] = True
+        _add_relations(mock_query, 'cat', 'col')
+        mock_session.query.return_value.filter.return_value.group_by.assert_called_with(
+            'rel table src id', 'rel table src volgnummer')
+        mock_query.join.assert_called_with(mocked_subquery, '(False AND False)', isouter=True)
+
+        # Only the relations for the requested fields are added
+        mock_query.reset_mock()
+        self.assertEqual(mock_query, _add_relations(mock_query, 'cat', 'col', fields=['attr']))
+        mock_query.join.assert_not_called()
+
+    @mock.patch("gobapi.storage.GOBModel")
+    @mock.patch("gobapi.storage._query_relations")
+    @mock.patch("gobapi.storage._get_relation_tables")
+    def test_add_page_relations(self, mock_get_relation_tables, mock_query_relations, mock_model):
+        rel_table = MagicMock()
+        entities = [type('MockEntity', (), {'_id': id, 'volgnummer': '1'})() for id in ['id1', 'id2']]
+
+        mock_model.return_value.get_collection.return_value = {'has_states': True}
+        mock_get_relation_tables.return_value = iter([('ref1', rel_table)])
+        query = mock_query_relations.return_value.filter.return_value
+        query.all.return_value = [('id1', '1', 'value1'), ('id2', '2', 'other value')]
+
+        self.assertEqual(entities, _add_page_relations(entities, 'cat', 'col', ['ref1']))
+        mock_get_relation_tables.assert_called_with('cat', 'col', ['ref1'])
+        mock_query_relations.assert_called_with(rel_table, True)
+        rel_table.src_id.in_.assert_called_with({'id1', 'id2'})
+        mock_query_relations.return_value.filter.assert_called_with(rel_table.src_id.in_.return_value)
+        query.set_catalog_collection.assert_called_with('cat', 'col')
+        self.assertEqual('value1', entities[0].ref1)
+        self.assertIsNone(entities[1].ref1)
+
+        # Without states the relations are matched on id only
+        mock_model.return_value.get_collection.return_value = {}
+        mock_get_relation_tables.return_value = iter([('ref1', rel_table)])
+        query.all.return_value = [('id2', 'value2')]
+        _add_page_relations(entities, 'cat', 'col')
+        mock_query_relations.assert_called_with(rel_table, False)
+        self.assertIsNone(entities[0].ref1)
+        self.assertEqual('value2', entities[1].ref1)
+
+        # No relations are queried for an empty page
+        mock_query_relations.reset_mock()
+        self.assertEqual([], _add_page_relations([], 'cat', 'col'))
+        mock_query_relations.assert_not_called()
+
+    @mock.patch("gobapi.storage._Base", mock.MagicMock())
+    @mock.patch("gobapi.storage.func.max", lambda column: f'max({column})')
+    @mock.patch("gobapi.storage.get_session")
+    @mock.patch("gobapi.storage.get_table_and_model")
+    def test_get_version(self, mock_get_table_and_model, mock_get_session):
+        table = type('MockTable', (), {'_last_event': 'table last event'})
+        rel_table = type('MockTable', (), {'_last_event': 'rel table last event'})
+        mock_get_table_and_model.return_value = table, None
+        mock_session = mock_get_session.return_value
+        mock_session.query.return_value.one.return_value = [10, None]
+
+        with mock.patch("gobapi.storage._get_relation_tables", lambda cat, col: iter([('ref', rel_table)])):
+            self.assertEqual((10, None), get_version('cat', 'col'))
+
+        mock_session.query.assert_any_call('max(table last event)')
+        mock_session.query.assert_any_call('max(rel table last event)')
+        mock_session.query.return_value.set_catalog_collection.assert_called_with('cat', 'col')
+
+    @mock.patch("gobapi.storage.GOBModel")
+    @mock.patch("gobapi.storage.get_table_and_model", lambda cat, col: (f'{cat} {col} table', None))
+    @mock.patch("gobapi.storage.get_relation_name", lambda m, cat, col, ref: None if ref is None else f'{cat}_{col}_{ref}')
+    def test_get_relation_tables(self, mock_model):
+        mock_model.return_value.get_collection.return_value = {
+            'references': ['reference1', None, 'reference2'],
+        }
+        self.assertEqual([('reference1', 'rel cat_col_reference1 table'), ('reference2', 'rel cat_col_reference2 table')],
+                         list(_get_relation_tables('cat', 'col')))
+        self.assertEqual([('reference2', 'rel cat_col_reference2 table')],
+                         list(_get_relation_tables('cat', 'col', fields=['reference2'])))
+
+    @mock.patch("gobapi.storage.GOBModel")
+    @mock.patch("gobapi.storage.session")
+    @mock.patch("gobapi.storage._query_relation")
+    @mock.patch("gobapi.storage._get_relation_tables")
+    def test_add_entity_relations(self, mock_get_relation_tables, mock_query_relation, mock_session, mock_model):
+        entity = type('MockEntity', (), {'_id': 'the id', 'volgnummer': 'the volgnummer'})()
+
+        mock_model.return_value.get_collection.return_value = {'has_states': True}
+        mock_get_relation_tables.return_value = iter([])
+        self.assertEqual(entity, _add_entity_relations(entity, 'cat', 'col'))
+        mock_session.query.assert_not_called()
+
+        mock_get_relation_tables.return_value = iter([('ref1', 'rel table1'), ('ref2', 'rel table2')])
+        mock_session.query.return_value.one.return_value = ['value1', None]
+        self.assertEqual(entity, _add_entity_relations(entity, 'cat', 'col', ['ref1', 'ref2']))
+        mock_get_relation_tables.assert_called_with('cat', 'col', ['ref1', 'ref2'])
+        mock_query_relation.assert_any_call('rel table1', 'the id', 'the volgnummer')
+        mock_query_relation.assert_any_call('rel table2', 'the id', 'the volgnummer')
+        mock_query_relation.return_value.as_scalar.return_value.label.assert_any_call('ref:ref1')
+        mock_session.query.return_value.set_catalog_collection.assert_called_with('cat', 'col')
+        self.assertEqual('value1', entity.ref1)
+        self.assertIsNone(entity.ref2)
+
+        # Without states the volgnummer is not used
+        mock_model.return_value.get_collection.return_value = {}
+        mock_get_relation_tables.return_value = iter([('ref1', 'rel table1')])
+        _add_entity_relations(entity, 'cat', 'col')
+        mock_query_relation.assert_called_with('rel table1', 'the id', None)
+
+    @mock.patch("gobapi.storage.session")
+    @mock.patch("gobapi.storage._source_values", lambda rel_table: 'source values')
+    @mock.patch("gobapi.storage._is_active_relation", lambda rel_table: 'is active')
+    @mock.patch("gobapi.storage.and_", lambda *args: list(args))
+    def test_query_relation(self, mock_session):
+        rel_table = type('MockRelTable', (), {'src_id': 'the id', 'src_volgnummer': 'the volgnummer'})
+
+        query = _query_relation(rel_table, 'the id')
+        mock_session.query.assert_called_with('source values')
+        mock_session.query.return_value.filter.assert_called_with([True, 'is active'])
+        self.assertEqual(mock_session.query.return_value.filter.return_value, query)
+
+        # With states the relations are selected on id and volgnummer
+        _query_relation(rel_table, 'the id', 'other volgnummer')
+        mock_session.query.return_value.filter.assert_called_with([True, False, 'is active'])
+
+    @mock.patch("gobapi.storage.get_session")
+    @mock.patch("gobapi.storage._query_entity")
+    def test_entity_exists(self, mock_query_entity, mock_get_session):
+        query = MagicMock()
+        mock_query_entity.return_value = query, 'table', 'model'
+        exists_query = mock_get_session.return_value.query.return_value
+
+        self.assertEqual(exists_query.scalar.return_value, entity_exists('cat', 'col', 'id'))
+        mock_query_entity.assert_called_with('cat', 'col', 'id')
+        mock_get_session.return_value.query.assert_called_with(query.exists.return_value)
+        exists_query.set_catalog_collection.assert_called_with('cat', 'col')
+
     def test_apply_filters(self):
         query = MagicMock()
         model = type('MockModel', (), {
@@ -1189,3 +1461,96 @@ WHERE catalogue = 'rel'
 -- Commit all changes
 COMMIT;
 """)
+
+    @mock.patch("gobapi.storage._add_page_relations", lambda entities, cat, col, fields: entities)
+    @mock.patch("gobapi.storage._query_page_entities")
+    def test_get_entities_after(self, mock_query_page_entities):
+        table = MagicMock()
+        table._gobid.__gt__.return_value = 'gobid > after'
+        query = MagicMock()
+        query.column_descriptions = [{'entity': table}]
+        mock_query_page_entities.return_value = query, lambda e: {'gobid': e._gobid}
+
+        page = query.filter.return_value.order_by.return_value.limit.return_value
+        page.all.return_value = [type('MockEntity', (), {'_gobid': gobid}) for gobid in [4, 5, 6]]
+
+        # More entities than requested, the last returned entity is the cursor for the next page
+        result = get_entities_after('cat', 'col', 3, 2)
+        self.assertEqual(([{'gobid': 4}, {'gobid': 5}], 5), result)
+        mock_query_page_entities.assert_called_with('cat', 'col', None, None, None, None)
+        query.filter.assert_called_with('gobid > after')
+        table._gobid.__gt__.assert_called_with(3)
+        query.filter.return_value.order_by.assert_called_with(table._gobid)
+        query.filter.return_value.order_by.return_value.limit.assert_called_with(3)
+        query.count.assert_not_called()
+
+        # No more entities, no next page
+        result = get_entities_after('cat', 'col', 3, 3)
+        self.assertEqual(([{'gobid': 4}, {'gobid': 5}, {'gobid': 6}], None), result)
+
+        # Start at the first entity
+        query.order_by.return_value.limit.return_value.all.return_value = []
+        result = get_entities_after('cat', 'col', None, 3, ['naam'])
+        self.assertEqual(([], None), result)
+        mock_query_page_entities.assert_called_with('cat', 'col', None, None, None, ['naam'])
+
+    def test_get_gobid(self):
+        entity = type('MockEntity', (), {'_gobid': 123})
+        self.assertEqual(123, _get_gobid(entity))
+        self.assertEqual(123, _get_gobid((entity, 'any relation')))
+
+    @mock.patch("gobapi.storage._get_cached_count")
+    @mock.patch("gobapi.storage._get_estimated_count")
+    def test_get_total_count(self, mock_estimated_count, mock_cached_count):
+        query = MagicMock()
+
+        self.assertIsNone(_get_total_count(query, 'cat', 'col', None, COUNT_NONE))
+        query.count.assert_not_called()
+
+        self.assertEqual(mock_estimated_count.return_value, _get_total_count(query, 'cat', 'col', None, COUNT_ESTIMATE))
+        mock_estimated_count.assert_called_with(query)
+
+        # Counts for relations are not cached
+        self.assertEqual(query.count.return_value, _get_total_count(query, 'cat', 'col', 'ref', COUNT_EXACT))
+        mock_cached_count.assert_not_called()
+
+        self.assertEqual(mock_cached_count.return_value, _get_total_count(query, 'cat', 'col', None, COUNT_EXACT))
+        mock_cached_count.assert_called_with(query, 'cat', 'col')
+
+    @mock.patch("gobapi.storage._count_cache", {})
+    @mock.patch("gobapi.storage.get_max_eventid")
+    @mock.patch("gobapi.storage.Authority")
+    def test_get_cached_count(self, mock_authority, mock_max_eventid):
+        query = MagicMock()
+        query.count.return_value = 10
+        mock_authority.return_value.get_roles.return_value = ['b', 'a']
+        mock_max_eventid.return_value = 1
+
+        self.assertEqual(10, _get_cached_count(query, 'cat', 'col'))
+        mock_max_eventid.assert_called_with('cat', 'col')
+
+        # Count is cached as long as the max eventid does not change
+        query.count.return_value = 20
+        self.assertEqual(10, _get_cached_count(query, 'cat', 'col'))
+        self.assertEqual(1, query.count.call_count)
+
+        # Count is cached per set of roles
+        mock_authority.return_value.get_roles.return_value = ['a']
+        self.assertEqual(20, _get_cached_count(query, 'cat', 'col'))
+        mock_authority.return_value.get_roles.return_value = ['a', 'b']
+        self.assertEqual(10, _get_cached_count(query, 'cat', 'col'))
+
+        # Count is renewed when the max eventid changes
+        mock_max_eventid.return_value = 2
+        self.assertEqual(20, _get_cached_count(query, 'cat', 'col'))
+
+    def test_get_estimated_count(self):
+        query = MagicMock()
+        statement = query.statement.compile.return_value
+        statement.__str__.return_value = "SELECT any"
+        execute = query.session.connection.return_value.execute
+        execute.return_value.scalar.return_value = [{'Plan': {'Plan Rows': 100}}]
+
+        self.assertEqual(100, _get_estimated_count(query))
+        query.statement.compile.assert_called_with(dialect=query.session.bind.dialect)
+        execute.assert_called_with("EXPLAIN (FORMAT JSON) SELECT any", statement.params)
@@ -1,6 +1,6 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
-from gobapi.utils import streaming_gob_response
+from gobapi.utils import streaming_gob_response, coalesce_chunks, to_camelcase, prepopulate_camelcase, dict_to_camelcase
 
 
 class TestUtils(TestCase):
@@ -34,3 +34,61 @@ class TestUtils(TestCase):
                 result.append(i)
 
         self.assertEqual(expected_result, result)
+
+    @mock.patch("gobapi.utils.STREAM_CHUNK_SIZE", 4)
+    def test_coalesce_chunks(self):
+        wrapped_generator = lambda: iter(["a", "bc", "def", "g", "h"])
+        f = coalesce_chunks(streaming_gob_response(wrapped_generator))
+
+        # Chunks of at least 4 characters, the last chunk ends with the success trailer
+        self.assertEqual(["abcdef", "gh\n"], list(f()))
+
+    def test_coalesce_chunks_wraps(self):
+        def any_generator():
+            yield "any item"
+
+        self.assertEqual('any_generator', coalesce_chunks(any_generator).__name__)
+
+    @mock.patch("gobapi.utils.STREAM_CHUNK_SIZE", 4)
+    def test_coalesce_chunks_exception(self):
+        def wrapped_generator():
+            yield "abcd"
+            yield "e"
+            raise Exception()
+
+        result = []
+        with self.assertRaises(Exception):
+            for chunk in coalesce_chunks(streaming_gob_response(wrapped_generator))():
+                result.append(chunk)
+
+        # The collected items and the error trailer are yielded before the Exception is re-raised
+        self.assertEqual(["abcd", "eGOB_API_ERROR. Caught Exception. Response aborted. See logs.\n"], result)
+
+        # Without error trailer the remaining items are yielded before the Exception is re-raised
+        result = []
+        with self.assertRaises(Exception):
+            for chunk in coalesce_chunks(wrapped_generator)():
+                result.append(chunk)
+        self.assertEqual(["abcd", "e"], result)
+
+    @mock.patch("gobapi.utils._camelcase_memo", {})
+    @mock.patch("gobapi.utils._CAMELCASE_MEMO_SIZE", 2)
+    def test_to_camelcase_memo(self):
+        from gobapi.utils import _camelcase_memo
+
+        self.assertEqual("snakeCase", to_camelcase("snake_case"))
+        self.assertEqual({"snake_case": "snakeCase"}, _camelcase_memo)
+
+        _camelcase_memo["snake_case"] = "memoized"
+        self.assertEqual("memoized", to_camelcase("snake_case"))
+
+        # The memo is bounded
+        prepopulate_camelcase(["first_name", "second_name"])
+        self.assertEqual({"snake_case": "memoized", "first_name": "firstName"}, _camelcase_memo)
+        self.assertEqual("secondName", to_camelcase("second_name"))
+
+    def test_dict_to_camelcase_values(self):
+        value = object()
+        self.assertIs(value, dict_to_camelcase({"a_b": value})["aB"])
+        self.assertEqual({"aB": [{"cD": 1}], "eF": {"gH": None}},
+                         dict_to_camelcase({"a_b": [{"c_d": 1}], "e_f": {"g_h": None}}))
@@ -1,6 +1,6 @@
 from unittest import TestCase, mock
 
-from gobapi.worker.api import worker_result, worker_end, worker_status, _worker_not_found
+from gobapi.worker.api import worker_result, worker_end, worker_status, _worker_not_found, _send_worker_file
 
 
 @mock.patch("gobapi.worker.api.sleep", lambda n: None)
@@ -9,9 +9,11 @@ class TestAPI(TestCase):
     def setUp(self) -> None:
         pass
 
+    @mock.patch("gobapi.worker.api.compression")
     @mock.patch("gobapi.worker.api.WorkerResponse")
     @mock.patch("gobapi.worker.api.send_file")
-    def test_result(self, mock_send_file, mock_worker_response):
+    def test_result(self, mock_send_file, mock_worker_response, mock_compression):
+        mock_compression.is_compressed_file.return_value = False
         mock_worker_response.get_response_file.return_value = None
         mock_worker_response.is_working.return_value = False
         result = worker_result('any id')
@@ -27,6 +29,36 @@ class TestAPI(TestCase):
         result = worker_result('any id')
         self.assertEqual(result, mock_send_file.return_value)
 
+    @mock.patch("gobapi.worker.api.Response")
+    @mock.patch("gobapi.worker.api.compression")
+    @mock.patch("gobapi.worker.api.send_file")
+    def test_send_worker_file(self, mock_send_file, mock_compression, mock_response):
+        mock_compression.is_compressed_file.return_value = False
+        self.assertEqual(_send_worker_file('any file'), mock_send_file.return_value)
+
+        # Compressed file, client accepts gzip
+        mock_compression.is_compressed_file.return_value = True
+        mock_compression.accepts.return_value = True
+        mock_send_file.return_value.headers = {}
+        result = _send_worker_file('any file')
+        self.assertEqual(result, mock_send_file.return_value)
+        self.assertEqual(result.headers['Content-Encoding'], mock_compression.GZIP)
+        self.assertEqual(result.headers['Vary'], 'Accept-Encoding')
+
+        # Compressed file, client does not accept gzip
+        mock_compression.accepts.return_value = False
+        mock_response.return_value.headers = {}
+        result = _send_worker_file('any file')
+        self.assertEqual(result, mock_response.return_value)
+        self.assertEqual(result.headers, {'Vary': 'Accept-Encoding'})
+        mock_response.assert_called_with(mock_compression.decompress_file.return_value,
+                                         mimetype='application/octet-stream')
+        mock_compression.decompress_file.assert_called_with('any file')
+
+        # The mimetype is derived from the filename, like send_file does
+        _send_worker_file('any file.csv')
+        mock_response.assert_called_with(mock_compression.decompress_file.return_value, mimetype='text/csv')
+
     @mock.patch("gobapi.worker.api.WorkerResponse")
     def test_worker_end(self, mock_worker_response):
         mock_worker_response.get_status.return_value = None
@@ -2,6 +2,8 @@ from time import sleep
 
 from unittest import TestCase, mock
 
+from flask import Flask
+
 from gobapi.worker.response import WorkerResponse
 
 class TestResponse(TestCase):
@@ -22,6 +24,7 @@ class TestResponse(TestCase):
         result = [r for r in worker_response.write_response([])]
         self.assertTrue("OK" in result)
 
+    @mock.patch("gobapi.worker.response.compression.get_encoding", lambda: None)
     @mock.patch("gobapi.worker.response.request")
     @mock.patch("gobapi.worker.response.Response")
     @mock.patch("gobapi.worker.response.stream_with_context")
@@ -38,6 +41,18 @@ class TestResponse(TestCase):
         self.assertEqual(result, mock_response.return_value)
         mock_response.assert_called_with(mock_stream_with_context.return_value, mimetype='text/plain')
 
+    @mock.patch("gobapi.worker.response.compression")
+    @mock.patch("gobapi.worker.response.Response")
+    @mock.patch("gobapi.worker.response.stream_with_context")
+    def test_stream_with_context_compressed(self, mock_stream_with_context, mock_response, mock_compression):
+        mock_response.return_value.headers = {}
+        mock_compression.get_encoding.return_value = 'gzip'
+        with Flask(__name__).test_request_context():
+            result = WorkerResponse.stream_with_context(['any row'], 'any mimetype')
+        mock_compression.compress.assert_called_with(['any row'], 'gzip')
+        mock_stream_with_context.assert_called_with(mock_compression.compress.return_value)
+        self.assertEqual(result.headers, {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+
     @mock.patch("gobapi.worker.response.os.path.isfile")
     def test_isWorking(self, mock_isfile):
         mock_isfile.side_effect = [True, False]